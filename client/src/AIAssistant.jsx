@@ -27,7 +27,8 @@ function AIAssistant({ resumeData }) {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ text: resumeText }),
+                // The structured data lets the server re-analyze only the sections that changed
+                body: JSON.stringify({ text: resumeText, resume: resumeData }),
             });
 
             if (!response.ok) {
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { Hexagon, FileText, Calendar, Star, Trash2, Eye } from 'lucide-react';
+import { Hexagon, FileText, Calendar, Star, Trash2, Eye, Download } from 'lucide-react';
 import './App.css';
 
 function ResumeList() {
@@ -27,6 +27,14 @@ function ResumeList() {
             });
     }, []);
 
+    // The list only carries metadata; fetch the full parsed data on demand
+    const viewResume = (id) => {
+        fetch(`http://localhost:8000/api/resumes/${id}?fields=parsed_data`)
+            .then(res => res.json())
+            .then(data => alert(JSON.stringify(data.parsed_data, null, 2)))
+            .catch(err => console.error("Error fetching resume:", err));
+    };
+
     return (
         <div className="page-container">
             {/* Header */}
@@ -80,9 +88,15 @@ function ResumeList() {
 
                                 <div className="card-actions">
                                     {/* In a real app, we would have a view page. For now, just showing data. */}
-                                    <button className="action-btn view-btn" onClick={() => alert(JSON.stringify(resume.parsed_data, null, 2))}>
+                                    <button className="action-btn view-btn" onClick={() => viewResume(resume.id)}>
                                         <Eye size={16} /> View Data
                                     </button>
+                                    <a className="action-btn view-btn" href={`http://localhost:8000/api/resumes/${resume.id}/export?format=pdf`}>
+                                        <Download size={16} /> PDF
+                                    </a>
+                                    <a className="action-btn view-btn" href={`http://localhost:8000/api/resumes/${resume.id}/export?format=docx`}>
+                                        <Download size={16} /> DOCX
+                                    </a>
                                 </div>
                             </div>
                         ))}
@@ -201,6 +215,7 @@ function ResumeList() {
                     cursor: pointer;
                     font-weight: 500;
                     font-size: 0.875rem;
+                    text-decoration: none;
                     transition: background 0.2s;
                 }
                 .view-btn {
@@ -21,6 +21,8 @@ function StartScratch() {
     const [user, setUser] = useState(null);
     const [pendingAction, setPendingAction] = useState(null); // 'download' or 'save'
     const [isSaving, setIsSaving] = useState(false);
+    // After the first save, later saves update the same resume and add a version
+    const [savedResumeId, setSavedResumeId] = useState(null);
 
     // --- State for Resume Content ---
     const [resumeData, setResumeData] = useState({
@@ -216,6 +218,7 @@ function StartScratch() {
                 },
                 body: JSON.stringify({
                     user_id: user.id,
+                    resume_id: savedResumeId,
                     ...resumeData
                 }),
             });
@@ -225,6 +228,8 @@ function StartScratch() {
                 throw new Error(errorData.detail || 'Failed to save');
             }
 
+            const data = await response.json();
+            setSavedResumeId(data.id);
             alert('Resume saved successfully!');
         } catch (error) {
             console.error("Save error:", error);
@@ -2,6 +2,10 @@ import { useState, useEffect } from 'react';
 import { CloudUpload, CheckCircle, AlertTriangle, XCircle, ArrowRight, Hexagon } from 'lucide-react';
 import { Link, useNavigate } from 'react-router-dom';
 
+const JOB_POLL_MS = 1000;
+const MAX_POLL_FAILURES = 5;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
 function UploadOptimize() {
     const [data, setData] = useState(null);
     const [loading, setLoading] = useState(false);
@@ -18,18 +22,8 @@ function UploadOptimize() {
 
     const handleUpload = async (selectedFile) => {
         setUploading(true);
-        const formData = new FormData();
-        formData.append('file', selectedFile);
-
         try {
-            const response = await fetch('http://localhost:8000/api/upload-optimize', {
-                method: 'POST',
-                body: formData,
-            });
-
-            if (!response.ok) throw new Error('Upload failed');
-
-            const result = await response.json();
+            const result = await analyzeResume(selectedFile);
             setData(result);
             setUploading(false);
         } catch (error) {
@@ -39,6 +33,69 @@ function UploadOptimize() {
         }
     };
 
+    const postResume = (selectedFile, query = '') => {
+        const formData = new FormData();
+        formData.append('file', selectedFile);
+        return fetch(`http://localhost:8000/api/upload-optimize${query}`, {
+            method: 'POST',
+            body: formData,
+        });
+    };
+
+    const analyzeResume = async (selectedFile) => {
+        // Queued as a background job so a slow analysis doesn't hold the request open
+        let response = await postResume(selectedFile, '?mode=async');
+        if (response.status === 503) {
+            // Job queue unavailable (e.g. database down): the direct path still analyzes the file
+            response = await postResume(selectedFile);
+        }
+        if (!response.ok) throw new Error('Upload failed');
+        if (response.status !== 202) return response.json();
+        return waitForJob(await response.json());
+    };
+
+    const waitForJob = (job) => new Promise((resolve, reject) => {
+        const events = new EventSource(`http://localhost:8000${job.eventsUrl}`);
+        events.addEventListener('done', (e) => {
+            events.close();
+            resolve(JSON.parse(e.data).result);
+        });
+        events.addEventListener('failed', (e) => {
+            events.close();
+            reject(new Error(JSON.parse(e.data).error));
+        });
+        events.addEventListener('gone', () => {
+            events.close();
+            reject(new Error('Job expired'));
+        });
+        // The browser would reconnect forever (a 404, a restarting server);
+        // the status URL answers the same question with bounded retries
+        events.onerror = () => {
+            events.close();
+            pollJob(job.statusUrl).then(resolve, reject);
+        };
+    });
+
+    const pollJob = async (statusUrl) => {
+        const deadline = Date.now() + JOB_TIMEOUT_MS;
+        let failures = 0;
+        while (Date.now() < deadline) {
+            let job = null;
+            try {
+                const response = await fetch(`http://localhost:8000${statusUrl}`);
+                if (response.ok) job = await response.json();
+            } catch (error) {
+                console.error("Job status error:", error);
+            }
+            if (job && job.status === 'done') return job.result;
+            if (job && job.status === 'failed') throw new Error(job.error);
+            failures = job ? 0 : failures + 1;
+            if (failures >= MAX_POLL_FAILURES) throw new Error('Lost track of the analysis job');
+            await new Promise((wake) => setTimeout(wake, JOB_POLL_MS));
+        }
+        throw new Error('Analysis timed out');
+    };
+
     const handleOptimizeClick = () => {
         if (data && data.parsedData) {
             navigate('/browse-samples', { state: { resumeData: data.parsedData } });
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Cache Keys ---
+_whitespace_re = re.compile(r'\s+')
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def normalize_text(text):
+    # Re-exports of the same CV (new PDF producer, different line wrapping)
+    # only differ in whitespace, so collapse it before hashing.
+    return _whitespace_re.sub(" ", text).strip()
+
+def hash_text(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+# --- Backends ---
+class MemoryCacheBackend:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries=512, ttl_seconds=86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                self.evictions += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteCacheBackend:
+    """Persistent tier so cached analyses survive restarts."""
+
+    def __init__(self, path, max_entries=10000, ttl_seconds=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                return None
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl_seconds),
+            )
+            self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        cur = self._conn.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+        self.evictions += cur.rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        if count > self.max_entries:
+            cur = self._conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN ("
+                "SELECT key FROM analysis_cache ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            self.evictions += cur.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+class SharedCacheBackend:
+    """Entries in the node's shared state (shared_state.py), so every worker process sees one cache."""
+
+    def __init__(self, state, namespace, ttl_seconds=86400):
+        self.state = state
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0  # expiry is the store's job
+
+    def get(self, key):
+        return self.state.get(self.namespace + key)
+
+    def set(self, key, value):
+        self.state.set(self.namespace + key, value, ttl=self.ttl_seconds)
+
+    def __len__(self):
+        return self.state.count(self.namespace)
+
+class TieredCache:
+    """
+    A process-local LRU in front of an optional second tier (shared or on
+    disk); second-tier hits are copied into the LRU. The second tier is
+    blocking I/O (SQLite, Redis), so it is reached from a worker thread and
+    a busy store never stalls the event loop.
+    """
+
+    def __init__(self, memory, second=None):
+        self.memory = memory
+        self.second = second
+
+    async def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.second is not None:
+            value = await asyncio.to_thread(self.second.get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def set(self, key, value):
+        self.memory.set(key, value)
+        if self.second is not None:
+            await asyncio.to_thread(self.second.set, key, value)
+
+    def __len__(self):
+        return len(self.memory)
+
+def tiered_cache(max_entries, ttl_seconds, state=None, namespace="", persistent_path=None):
+    """The second tier is a SQLite file of its own if `persistent_path` is given, else `state` if it is shared between processes."""
+    if persistent_path:
+        second = SQLiteCacheBackend(persistent_path, ttl_seconds=ttl_seconds)
+    elif state is not None and state.shared:
+        second = SharedCacheBackend(state, namespace, ttl_seconds)
+    else:
+        second = None
+    return TieredCache(MemoryCacheBackend(max_entries, ttl_seconds), second)
+
+# --- Analysis Cache ---
+class AnalysisCache:
+    """
+    Two-level lookup for upload analyses: the SHA-256 of the uploaded bytes
+    (skips extraction entirely) and the SHA-256 of the normalized extracted
+    text (catches the same CV exported to a new file). The bytes key is
+    stored as an alias of the text key so both share one entry. The second
+    tier is a SQLite file of its own, or else the workers' shared state.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=86400, persistent_path=None, state=None):
+        self.cache = tiered_cache(max_entries, ttl_seconds, state, "analysis:", persistent_path)
+        self._lock = threading.Lock()
+        self._counters = {
+            "bytes_hits": 0,
+            "text_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "model_calls_saved": 0,
+            "seconds_saved": 0.0,
+        }
+
+    def _record_hit(self, kind, entry):
+        with self._lock:
+            self._counters[kind] += 1
+            self._counters["seconds_saved"] += entry.get("elapsed", 0.0)
+            if entry.get("source") == "gemini":
+                self._counters["model_calls_saved"] += 1
+
+    async def get_by_bytes(self, file_digest):
+        alias = await self.cache.get("b:" + file_digest)
+        entry = await self.cache.get(alias["text_key"]) if alias else None
+        if entry is not None:
+            self._record_hit("bytes_hits", entry)
+        return entry
+
+    async def get_by_text(self, text_digest, file_digest=None):
+        entry = await self.cache.get("t:" + text_digest)
+        if entry is None:
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        self._record_hit("text_hits", entry)
+        if file_digest:
+            await self.cache.set("b:" + file_digest, {"text_key": "t:" + text_digest})
+        return entry
+
+    async def put(self, file_digest, text_digest, text, result, source, elapsed):
+        entry = {
+            "text": text,
+            "atsScore": result.get("atsScore", 0),
+            "suggestions": result.get("suggestions", []),
+            "parsedData": result.get("parsedData", {}),
+            "source": source,
+            "elapsed": elapsed,
+        }
+        await self.cache.set("t:" + text_digest, entry)
+        await self.cache.set("b:" + file_digest, {"text_key": "t:" + text_digest})
+        with self._lock:
+            self._counters["stores"] += 1
+        return entry
+
+    def stats(self):
+        """Blocking when the second tier is shared state (it counts entries there)."""
+        with self._lock:
+            stats = dict(self._counters)
+        hits = stats["bytes_hits"] + stats["text_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["seconds_saved"] = round(stats["seconds_saved"], 3)
+        stats["memory_entries"] = len(self.cache.memory)
+        stats["evictions"] = self.cache.memory.evictions
+        if self.cache.second is not None:
+            stats["persistent_entries"] = len(self.cache.second)
+            stats["persistent_evictions"] = self.cache.second.evictions
+        return stats
+
+def cache_from_env(state=None):
+    return AnalysisCache(
+        max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "512")),
+        ttl_seconds=int(os.getenv("ANALYSIS_CACHE_TTL", "86400")),
+        persistent_path=os.getenv("ANALYSIS_CACHE_PATH") or None,
+        state=state,
+    )
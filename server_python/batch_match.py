@@ -0,0 +1,48 @@
+import json
+
+# Batch versions of LocalATSAnalyzer.match_job. The shared side (the job's
+# keywords, or the resume's word set) is computed once, and each item on the
+# other side is reduced to its overlap with the keyword set before scoring,
+# so a batch score is always identical to the single /api/job-match score.
+
+def _resume_scorer(analyzer, job_description):
+    keywords = analyzer.job_keywords(job_description)
+    keyword_set = set(keywords)
+
+    def score(text):
+        return analyzer.match_keywords(keywords, keyword_set & analyzer.resume_words(text or ""))
+
+    return score
+
+def _best_first(scored, limit):
+    scored.sort(key=lambda item: item[1]["matchScore"], reverse=True)
+    return scored[:limit] if limit else scored
+
+def batch_rank_resumes(analyzer, job_description, resumes, limit=None):
+    """resumes: iterable of (key, text), key being a dict like {"resumeId": 7}. Returns [(key, result)] best first."""
+    score = _resume_scorer(analyzer, job_description)
+    return _best_first([(key, score(text)) for key, text in resumes], limit)
+
+async def batch_rank_resume_chunks(analyzer, job_description, chunks, limit=None):
+    """Same as batch_rank_resumes, fed by an async iterator of [(key, text)] chunks (e.g. DB pages)."""
+    score = _resume_scorer(analyzer, job_description)
+    scored = []
+    async for chunk in chunks:
+        scored.extend((key, score(text)) for key, text in chunk)
+    return _best_first(scored, limit)
+
+def batch_rank_jobs(analyzer, resume_text, job_descriptions, limit=None):
+    """Returns [({"jobIndex": i}, result)] best first."""
+    resume_words = analyzer.resume_words(resume_text or "")
+    scored = [
+        ({"jobIndex": i}, analyzer.match_keywords(keywords, resume_words))
+        for i, keywords in enumerate(analyzer.job_keywords(jd) for jd in job_descriptions)
+    ]
+    return _best_first(scored, limit)
+
+def ndjson_lines(ranked, errors=()):
+    """Ranked results, then one {**key, "error": ...} line per item that couldn't be scored."""
+    for rank, (key, result) in enumerate(ranked, start=1):
+        yield json.dumps({"rank": rank, **key, **result}) + "\n"
+    for key, error in errors:
+        yield json.dumps({**key, "error": error}) + "\n"
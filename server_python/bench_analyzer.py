@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+from local_analyzer import LocalATSAnalyzer
+
+# Throughput benchmark for the local engine on synthetic resumes.
+# Usage: python bench_analyzer.py --count 2000 --sizes 150 600 2500
+
+VOCAB = (
+    "led developed managed created designed implemented optimized achieved improved launched "
+    "python java sql cloud data pipeline customer revenue team platform api latency budget "
+    "the and of to in for with on a an as is"
+).split()
+SECTIONS = ["Summary", "Experience", "Education", "Skills", "Projects"]
+
+def synthetic_resume(rng, words):
+    lines = [
+        f"Candidate {rng.randint(1, 10**6)}",
+        f"candidate{rng.randint(1, 10**6)}@example.com | (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+    ]
+    per_section = max(1, words // len(SECTIONS))
+    for section in SECTIONS:
+        lines.append(section)
+        remaining = per_section
+        while remaining > 0:
+            n = min(remaining, rng.randint(6, 18))
+            lines.append(" ".join(rng.choice(VOCAB) for _ in range(n)))
+            remaining -= n
+    return "\n".join(lines)
+
+def corpus(count, words, seed=42):
+    rng = random.Random(seed)
+    return [synthetic_resume(rng, words) for _ in range(count)]
+
+def run(label, fn, texts):
+    started = time.perf_counter()
+    for text in texts:
+        fn(text)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {len(texts) / elapsed:>10.0f} resumes/s  ({elapsed * 1000:.0f} ms)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[150, 600, 2500], help="words per resume")
+    args = parser.parse_args()
+
+    analyzer = LocalATSAnalyzer()
+    for words in args.sizes:
+        texts = corpus(args.count, words)
+        print(f"{args.count} resumes x ~{words} words")
+        run("analyze + parse_resume", lambda t: (analyzer.analyze(t), analyzer.parse_resume(t)), texts)
+        run("analyze_upload (one pass)", analyzer.analyze_upload, texts)
+        run("match_job", lambda t: analyzer.match_job(t, texts[0]), texts)
+
+if __name__ == "__main__":
+    main()
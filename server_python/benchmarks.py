@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from bench_analyzer import synthetic_resume
+
+# Reproducible benchmark suite: micro-benchmarks of extraction and the local
+# analyzer on seeded synthetic PDF/DOCX resumes, cold starts of a uvicorn
+# worker, then an in-process load run of the FastAPI app against a throwaway
+# SQLite database and the fake model. Results go to JSON so a later run can
+# be compared against them.
+#   python benchmarks.py --output bench/base.json
+#   python benchmarks.py --compare bench/base.json          (exit 1 on regressions)
+#   python benchmarks.py --only micro --repeat 50
+#   python benchmarks.py --only startup --startup-budget 1.0 (exit 1 over budget)
+
+DOCUMENT_SIZES = {"small": 150, "medium": 600, "large": 2500}  # words
+JOB_DESCRIPTION = (
+    "We are hiring a senior backend engineer to design and build python and sql data pipelines, "
+    "own api latency and cloud costs, and lead a small platform team shipping customer features."
+)
+
+# --- Synthetic Documents ---
+def synthetic_pdf(text):
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf)
+    pdf.setFont("Helvetica", 9)
+    y = 800
+    for line in text.split("\n"):
+        pdf.drawString(40, y, line)
+        y -= 12
+        if y < 40:
+            pdf.showPage()
+            pdf.setFont("Helvetica", 9)
+            y = 800
+    pdf.save()
+    return buf.getvalue()
+
+def synthetic_docx(text):
+    from docx import Document
+
+    document = Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+def documents(seed):
+    rng = random.Random(seed)
+    out = {}
+    for size, words in DOCUMENT_SIZES.items():
+        text = synthetic_resume(rng, words)
+        out[size] = {"text": text, "pdf": synthetic_pdf(text), "docx": synthetic_docx(text)}
+    return out
+
+# --- Measurement ---
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+def summarize_ms(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "mean": round(statistics.mean(values), 3),
+        "max": round(values[-1], 3),
+    }
+
+def time_op(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "repeat": repeat,
+        "min_ms": round(timings[0] * 1000, 4),
+        "median_ms": round(median * 1000, 4),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 4),
+        "ops_per_sec": round(1 / median, 1) if median else None,
+    }
+
+# --- Micro-benchmarks ---
+def run_micro(docs, repeat):
+    from extraction import extract_text_from_docx, extract_text_from_pdf
+    from job_titles import normalizer_from_env
+    from local_analyzer import LocalATSAnalyzer
+
+    analyzer = LocalATSAnalyzer()
+    titles = normalizer_from_env()
+    results = {}
+    for size, doc in docs.items():
+        text = doc["text"]
+        ops = {
+            "extract_text_from_pdf": lambda: extract_text_from_pdf(doc["pdf"]),
+            "extract_text_from_docx": lambda: extract_text_from_docx(doc["docx"]),
+            "analyze": lambda: analyzer.analyze(text),
+            "parse_resume": lambda: analyzer.parse_resume(text),
+            "analyze_upload": lambda: analyzer.analyze_upload(text),
+            "match_job": lambda: analyzer.match_job(text, JOB_DESCRIPTION),
+        }
+        for name, fn in ops.items():
+            key = f"{name}[{size}]"
+            results[key] = time_op(fn, repeat)
+            print(f"  {key:<36} median {results[key]['median_ms']:>9.3f} ms  p95 {results[key]['p95_ms']:>9.3f} ms")
+    for query in ("soft", "sofware enginer"):
+        key = f"classify_job_title[{query}]"
+        results[key] = time_op(lambda: titles.classify(query), repeat * 10)
+        print(f"  {key:<36} median {results[key]['median_ms']:>9.3f} ms  p95 {results[key]['p95_ms']:>9.3f} ms")
+    return results
+
+# --- Cold Start ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def cold_start(workdir):
+    """Spawns a uvicorn worker on a fresh SQLite database; returns (seconds until /api/ready, its report)."""
+    import httpx
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, f'cold-{port}.db')}",
+               BULK_UPLOAD_DIR=os.path.join(workdir, "bulk"), LLM_FAKE_MODEL="1")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < 60:
+            # A bare connect until the port is open: an HTTP client per poll
+            # would take CPU from the server it is timing
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with {server.returncode} before becoming ready")
+                time.sleep(0.01)
+                continue
+            response = httpx.get(f"http://127.0.0.1:{port}/api/ready", timeout=5)
+            if response.status_code == 200:
+                return time.perf_counter() - started, response.json()
+            time.sleep(0.01)
+        raise RuntimeError("Server not ready after 60s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def run_startup(runs):
+    workdir = tempfile.mkdtemp(prefix="resume-bench-cold-")
+    spawn, imported, ready = [], [], []
+    for _ in range(runs):
+        seconds, report = cold_start(workdir)
+        spawn.append(seconds)
+        imported.append(report["bootSeconds"]["import"])
+        ready.append(report["bootSeconds"]["ready"])
+    result = {
+        "runs": runs,
+        # Process spawn (interpreter + uvicorn) until /api/ready answers 200
+        "spawn_to_ready_s": round(statistics.median(spawn), 3),
+        # main.py's own clock: its imports, then through the lifespan to ready
+        "import_s": round(statistics.median(imported), 3),
+        "ready_s": round(statistics.median(ready), 3),
+    }
+    print(f"  spawn to ready {result['spawn_to_ready_s']:.3f}s  import {result['import_s']:.3f}s  "
+          f"ready {result['ready_s']:.3f}s  (medians of {runs})")
+    return result
+
+# --- In-process Load ---
+def configure_app_env(workdir):
+    # Must run before main is imported; explicit settings in the environment win
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("LLM_FAKE_MODEL", "1")
+    # The fake model answers instantly; lift the Gemini rate limit so it isn't what gets measured
+    os.environ.setdefault("LLM_RATE", "1000000")
+    os.environ.setdefault("LLM_BURST", "1000000")
+    os.environ.setdefault("BULK_UPLOAD_DIR", os.path.join(workdir, "bulk"))
+    os.environ.setdefault("AUTH_MAX_ATTEMPTS_PER_IP", "1000000")
+    os.environ.setdefault("PDF_POOL_QUEUE", "1024")
+    os.environ.pop("ANALYSIS_CACHE_PATH", None)
+    os.environ.pop("SEARCH_INDEX_DIR", None)
+
+async def drive(client, requests, concurrency):
+    """Runs (method, url, kwargs) requests with `concurrency` workers; returns the scenario's numbers."""
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+    latencies = []
+    statuses = {}
+
+    async def worker():
+        while not queue.empty():
+            method, url, kwargs = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(requests),
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 1),
+        "latency_ms": summarize_ms(latencies),
+        "statuses": statuses,
+    }
+
+def scenarios(docs, total, seed, user_id):
+    rng = random.Random(seed)
+    medium = docs["medium"]
+    resume = {
+        "fullName": "Bench Candidate", "email": "bench@example.com", "phone": "(555) 123-4567",
+        "summary": "Backend engineer who led and developed high-throughput services.",
+        "experience": [
+            {"title": f"Engineer {i}", "company": "Acme Corp", "date": "2020 - Present",
+             "description": "Led a team of 5 engineers and improved latency by 30%.\nBuilt and launched a platform."}
+            for i in range(4)
+        ],
+        "education": [{"degree": "B.S. Computer Science", "school": "State University", "date": "2017"}],
+        "skills": ["Python", "SQL", "FastAPI", "Docker", "AWS"],
+        "projects": [],
+    }
+
+    def edited(i):
+        # One changed entry per request, the builder's typical edit
+        data = json.loads(json.dumps(resume))
+        data["experience"][i % 4]["description"] += f"\nShipped change {i}."
+        return data
+
+    # Unique PDFs miss the analysis cache; the repeated one hits it
+    unique_pdfs = [synthetic_pdf(medium["text"] + f"\nReference {uuid.UUID(int=rng.getrandbits(128))}") for _ in range(total)]
+    queries = [rng.choice(("so", "soft", "software en", "data sc", "sofware enginer", "senior pro", "mark", "nurs"))
+               for _ in range(total)]
+    return {
+        "upload_pdf": [("POST", "/api/upload-optimize", {"files": {"file": ("resume.pdf", pdf, "application/pdf")}})
+                       for pdf in unique_pdfs],
+        "upload_pdf_cached": [("POST", "/api/upload-optimize", {"files": {"file": ("resume.pdf", medium["pdf"], "application/pdf")}})
+                              for _ in range(total)],
+        "analyze_content": [("POST", "/api/analyze-content", {"json": {"resume": edited(i)}}) for i in range(total)],
+        "classify_job_title": [("POST", "/api/classify-job-title", {"json": {"query": q}}) for q in queries],
+        "save_resume": [("POST", "/api/resumes/save", {"json": {"user_id": user_id, **edited(i)}}) for i in range(total)],
+        "list_resumes": [("GET", "/api/resumes", {"params": {"limit": 50}}) for _ in range(total)],
+    }
+
+async def run_load(docs, total, concurrency, seed, verbose=False):
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    configure_app_env(workdir)
+    from main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            signup = await client.post("/api/auth/signup", json={
+                "email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password", "full_name": "Bench",
+            })
+            user_id = signup.json()["id"]
+            for name, requests in scenarios(docs, total, seed, user_id).items():
+                # The handlers print per request; keep that out of the report unless asked for
+                with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+                    await drive(client, requests[:max(1, total // 10)], concurrency)  # warm-up
+                    results[name] = await drive(client, requests, concurrency)
+                r = results[name]
+                print(f"  {name:<22} {r['throughput_rps']:>8.1f} req/s  p50 {r['latency_ms']['p50']:>8.2f} ms  "
+                      f"p95 {r['latency_ms']['p95']:>8.2f} ms  {r['statuses']}")
+    return results
+
+# --- Results ---
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+
+def comparable(results):
+    """Flat {metric: (value, higher_is_better)} for the numbers worth comparing."""
+    flat = {}
+    for name, r in results.get("micro", {}).items():
+        flat[f"micro.{name}.median_ms"] = (r["median_ms"], False)
+    for name in ("spawn_to_ready_s", "import_s", "ready_s"):
+        if name in results.get("startup", {}):
+            flat[f"startup.{name}"] = (results["startup"][name], False)
+    for name, r in results.get("load", {}).items():
+        flat[f"load.{name}.throughput_rps"] = (r["throughput_rps"], True)
+        flat[f"load.{name}.p95_ms"] = (r["latency_ms"]["p95"], False)
+    return flat
+
+def compare(baseline, current, tolerance):
+    """Prints the changes per metric; returns the regressions beyond `tolerance` (a fraction)."""
+    before, after = comparable(baseline), comparable(current)
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('timestamp')}):")
+    for metric in sorted(before.keys() & after.keys()):
+        (old, higher_is_better), (new, _) = before[metric], after[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > tolerance else ("improved" if worse < -tolerance else "")
+        print(f"  {metric:<52} {old:>10.3f} -> {new:>10.3f}  {change * 100:+6.1f}%  {flag}")
+        if worse > tolerance:
+            regressions.append(metric)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction, the local analyzer and the API in-process.")
+    parser.add_argument("--only", choices=["micro", "startup", "load"], help="run one part only")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per micro-benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="requests per load scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--startup-runs", type=int, default=5, help="cold starts to take the median of")
+    parser.add_argument("--startup-budget", type=float, help="fail if the app takes longer than this many seconds to become ready")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output during the load run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before a metric counts as regressed")
+    args = parser.parse_args()
+
+    docs = documents(args.seed)
+    results = {"meta": metadata(args)}
+    if args.only in (None, "micro"):
+        print("Micro-benchmarks")
+        results["micro"] = run_micro(docs, args.repeat)
+    if args.only in (None, "startup"):
+        print("Cold start")
+        results["startup"] = run_startup(args.startup_runs)
+    if args.only in (None, "load"):
+        print(f"In-process load: {args.requests} requests per scenario, concurrency {args.concurrency}")
+        results["load"] = asyncio.run(run_load(docs, args.requests, args.concurrency, args.seed, args.verbose))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    failed = False
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            failed = True
+    if args.startup_budget is not None and "startup" in results:
+        if results["startup"]["ready_s"] > args.startup_budget:
+            print(f"\nStartup took {results['startup']['ready_s']:.3f}s, over the {args.startup_budget:g}s budget")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
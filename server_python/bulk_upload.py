@@ -0,0 +1,371 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+
+from workers import PoolSaturated
+
+# Bulk resume intake: uploaded files (or the members of uploaded ZIPs) are
+# spooled into a per-job directory, processed straight from disk with bounded concurrency, and
+# their results streamed back as they complete. Jobs outlive the request, so
+# a client that disconnects can poll or re-attach to the stream later. With
+# shared state, progress is published there too, so any worker process can
+# answer for a job another one is running.
+
+RESUME_EXTENSIONS = (".pdf", ".docx")
+_job_id_re = re.compile(r"[0-9a-f]{32}")
+CHUNK_SIZE = 1024 * 1024
+BULK_MAX_TOTAL_BYTES = int(float(os.getenv("BULK_MAX_TOTAL_MB", "500")) * 1024 * 1024)
+
+class BulkLimitExceeded(ValueError):
+    pass
+
+# --- Spooling ---
+def _safe_name(index, name):
+    base = os.path.basename(name.replace("\\", "/")) or "file"
+    return f"{index:05d}_{re.sub(r'[^A-Za-z0-9._-]+', '_', base)[-120:]}"
+
+def _copy_limited(src, dest_path, max_bytes):
+    """Copies in chunks, counting real bytes (ZIP headers can lie about sizes)."""
+    written = 0
+    with open(dest_path, "wb") as dest:
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                return written
+            written += len(chunk)
+            if written > max_bytes:
+                raise BulkLimitExceeded(f"exceeds {max_bytes / (1024 * 1024):g}MB")
+            dest.write(chunk)
+
+class BulkJob:
+    def __init__(self, job_id, directory, user_id=None):
+        self.id = job_id
+        self.directory = directory
+        self.user_id = user_id
+        self.files = []  # (index, display name, path)
+        self.results = []  # in completion order
+        self.status = "spooling"
+        self.created = time.time()
+        self.finished = None
+        self.publish = None  # async publish(job, first new result index), set by the registry
+        self._changed = asyncio.Condition()
+
+    # Runs in a worker thread: blocking file I/O only
+    def spool(self, name, fileobj, max_files, max_file_bytes, max_total_bytes):
+        if name.lower().endswith(".zip"):
+            zip_path = os.path.join(self.directory, _safe_name(len(self.files), name))
+            _copy_limited(fileobj, zip_path, max_total_bytes)
+            try:
+                self._expand_zip(zip_path, max_files, max_file_bytes, max_total_bytes)
+            finally:
+                os.remove(zip_path)
+            return
+        self._add_file(name, fileobj, max_files, max_file_bytes)
+
+    def _reject(self, name, status_code, error):
+        index = len(self.files)
+        self.files.append((index, name, None))
+        self.results.append({"index": index, "filename": name, "status": "error", "statusCode": status_code, "error": error})
+
+    def _add_file(self, name, fileobj, max_files, max_file_bytes):
+        index = len(self.files)
+        if index >= max_files:
+            raise BulkLimitExceeded(f"More than {max_files} files in one job")
+        if not name.lower().endswith(RESUME_EXTENSIONS):
+            self._reject(name, 400, "Unsupported file type")
+            return
+        path = os.path.join(self.directory, _safe_name(index, name))
+        try:
+            _copy_limited(fileobj, path, max_file_bytes)
+        except BulkLimitExceeded as e:
+            if os.path.exists(path):
+                os.remove(path)
+            self._reject(name, 413, f"File {e}")
+            return
+        self.files.append((index, name, path))
+
+    def _expand_zip(self, zip_path, max_files, max_file_bytes, max_total_bytes):
+        try:
+            archive = zipfile.ZipFile(zip_path)
+        except zipfile.BadZipFile:
+            raise BulkLimitExceeded("Not a valid ZIP archive")
+        with archive:
+            declared = 0
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                    continue
+                if name.lower().endswith(RESUME_EXTENSIONS):
+                    declared += info.file_size
+                    if declared > max_total_bytes:
+                        raise BulkLimitExceeded(f"ZIP expands past {max_total_bytes / (1024 * 1024):g}MB")
+                # Other members are recorded as unsupported by _add_file, without being read
+                with archive.open(info) as member:
+                    self._add_file(name, member, max_files, max_file_bytes)
+
+    @property
+    def total(self):
+        return len(self.files)
+
+    @property
+    def processable(self):
+        return sum(1 for _, _, path in self.files if path is not None)
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    async def add_result(self, result):
+        async with self._changed:
+            self.results.append(result)
+            self._changed.notify_all()
+        if self.publish is not None:
+            await self.publish(self, len(self.results) - 1)
+
+    async def finish(self, status="done"):
+        async with self._changed:
+            self.status = status
+            self.finished = time.time()
+            self._changed.notify_all()
+        if self.publish is not None:
+            # Everything again, so early results live as long as the summary
+            await self.publish(self, 0)
+
+    async def result_at(self, index):
+        """The index-th completed result, waiting for it; None once the job has no more."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: index < len(self.results) or self.done)
+            return self.results[index] if index < len(self.results) else None
+
+    async def results_since(self, since):
+        return self.results[since:]
+
+    def record(self):
+        """What other workers need to answer for this job."""
+        return {"status": self.status, "total": self.total, "completed": len(self.results),
+                "succeeded": sum(1 for r in self.results if r["status"] == "ok"),
+                "created": self.created, "finished": self.finished}
+
+    def summary(self):
+        ok = sum(1 for r in self.results if r["status"] == "ok")
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": len(self.results),
+            "succeeded": ok,
+            "failed": len(self.results) - ok,
+            "elapsedSeconds": round((self.finished or time.time()) - self.created, 3),
+        }
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class RemoteBulkJob:
+    """A job running in another worker process, read back from shared state; enough of BulkJob for the status and event endpoints."""
+
+    poll_interval = 0.5
+
+    def __init__(self, state, job_id, record):
+        self.state = state
+        self.id = job_id
+        self._record = record
+
+    @property
+    def status(self):
+        return self._record["status"]
+
+    @property
+    def total(self):
+        return self._record["total"]
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def _result(self, index):
+        return self.state.get(f"bulk:{self.id}:{index}")
+
+    def _results_since(self, since):
+        results = (self._result(index) for index in range(since, self._record["completed"]))
+        return [r for r in results if r is not None]
+
+    async def results_since(self, since):
+        return await asyncio.to_thread(self._results_since, since)
+
+    async def result_at(self, index):
+        while True:
+            if index < self._record["completed"]:
+                return await asyncio.to_thread(self._result, index)
+            if self.done:
+                return None
+            await asyncio.sleep(self.poll_interval)
+            record = await asyncio.to_thread(self.state.get, f"bulk:{self.id}")
+            if record is None:
+                return None  # expired
+            self._record = record
+
+    def summary(self):
+        record = self._record
+        return {
+            "jobId": self.id,
+            "status": record["status"],
+            "total": record["total"],
+            "completed": record["completed"],
+            "succeeded": record["succeeded"],
+            "failed": record["completed"] - record["succeeded"],
+            "elapsedSeconds": round((record["finished"] or time.time()) - record["created"], 3),
+        }
+
+# --- Processing ---
+async def run_job(job, process, concurrency=4, max_pool_retries=20):
+    """
+    process(filename, path, user_id) -> result dict, raising on failure.
+    Failures become per-file error results; a saturated pool means waiting
+    our turn, not failing the file.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index, name, path):
+        if path is None:
+            return  # rejected while spooling, result already recorded
+        async with semaphore:
+            result = {"index": index, "filename": name}
+            try:
+                for attempt in range(max_pool_retries + 1):
+                    try:
+                        outcome = await process(name, path, job.user_id)
+                        break
+                    except PoolSaturated as e:
+                        if attempt == max_pool_retries:
+                            raise
+                        await asyncio.sleep(min(e.retry_after, 5))
+                result.update(status="ok", **outcome)
+            except Exception as e:
+                result.update(status="error", statusCode=getattr(e, "status_code", 500), error=getattr(e, "message", str(e)))
+            finally:
+                os.remove(path)
+            await job.add_result(result)
+
+    try:
+        await asyncio.gather(*(one(*entry) for entry in job.files))
+        await job.finish("done")
+    except Exception as e:
+        print(f"Bulk job {job.id} failed: {e}")
+        await job.finish("failed")
+    finally:
+        job.cleanup()
+
+# --- Streaming ---
+async def iter_events(job, since=0, fmt="ndjson"):
+    """Results from `since` on as they complete, then the job summary. SSE ids are result positions, for Last-Event-ID."""
+    def encode(event, payload, event_id=None):
+        if fmt == "sse":
+            head = f"id: {event_id}\n" if event_id is not None else ""
+            return f"{head}event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"event": event, **payload}) + "\n"
+
+    yield encode("job", {"jobId": job.id, "total": job.total, "status": job.status})
+    position = since
+    while True:
+        result = await job.result_at(position)
+        if result is None:
+            break
+        yield encode("result", result, position)
+        position += 1
+    yield encode("done", job.summary())
+
+# --- Registry ---
+class BulkJobRegistry:
+    def __init__(self, root=None, ttl=3600, max_files=500, max_file_bytes=10 * 1024 * 1024,
+                 max_total_bytes=500 * 1024 * 1024, concurrency=4, state=None):
+        self.root = root or os.path.join(tempfile.gettempdir(), "resume-bulk")
+        self.ttl = ttl
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.concurrency = concurrency
+        self.state = state if state is not None and state.shared else None
+        self._jobs = {}
+        self._tasks = set()
+        self._publish_lock = asyncio.Lock()
+
+    async def _publish(self, job, since):
+        # Snapshot on the event loop, write from a thread (the store blocks),
+        # one publish at a time and results before the summary, so a reader
+        # never sees a count it can't fetch
+        items = [(f"bulk:{job.id}:{index}", job.results[index]) for index in range(since, len(job.results))]
+        items.append((f"bulk:{job.id}", job.record()))
+        async with self._publish_lock:
+            await asyncio.to_thread(self._write, items)
+
+    def _write(self, items):
+        for key, value in items:
+            self.state.set(key, value, ttl=self.ttl)
+
+    def create(self, user_id=None):
+        self.prune()
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.root, job_id)
+        os.makedirs(directory, exist_ok=True)
+        job = BulkJob(job_id, directory, user_id=user_id)
+        self._jobs[job_id] = job
+        return job
+
+    def spool(self, job, name, fileobj):
+        job.spool(name, fileobj, self.max_files, self.max_file_bytes, self.max_total_bytes)
+
+    async def start(self, job, process):
+        job.status = "running"
+        if self.state is not None:
+            job.publish = self._publish
+            await self._publish(job, 0)  # files rejected while spooling
+        task = asyncio.create_task(run_job(job, process, self.concurrency), name=f"bulk-{job.id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def discard(self, job):
+        self._jobs.pop(job.id, None)
+        job.cleanup()
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None and self.state is not None and _job_id_re.fullmatch(job_id):
+            record = await asyncio.to_thread(self.state.get, f"bulk:{job_id}")
+            if record is not None:
+                return RemoteBulkJob(self.state, job_id, record)
+        return job
+
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.done and job.finished < cutoff:
+                del self._jobs[job_id]
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.cleanup()
+
+    def stats(self):
+        running = sum(1 for job in self._jobs.values() if not job.done)
+        return {"jobs": len(self._jobs), "running": running, "concurrency": self.concurrency}
+
+def registry_from_env(concurrency, state=None):
+    return BulkJobRegistry(
+        root=os.getenv("BULK_UPLOAD_DIR"),
+        ttl=float(os.getenv("BULK_JOB_TTL", "3600")),
+        max_files=int(os.getenv("BULK_MAX_FILES", "500")),
+        max_file_bytes=int(float(os.getenv("BULK_MAX_FILE_MB", "10")) * 1024 * 1024),
+        max_total_bytes=BULK_MAX_TOTAL_BYTES,
+        concurrency=int(os.getenv("BULK_CONCURRENCY", concurrency)),
+        state=state,
+    )
@@ -1,40 +1,178 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, JSON, DateTime
+import os
+from sqlalchemy import create_engine, event, Column, ForeignKey, Index, Integer, LargeBinary, String, Text, JSON, DateTime
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime
 
 # DATABASE_URL = "sqlite:///./resumes.db"
-DATABASE_URL = "mysql+pymysql://root:@localhost/resume_builder"
+DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost/resume_builder")
 
-engine = create_engine(DATABASE_URL)
+def engine_options(url):
+    if url.startswith("sqlite"):
+        # Threads share connections under uvicorn; WAL lets readers run alongside the writer
+        options = {"connect_args": {"check_same_thread": False, "timeout": 30}}
+        if ":memory:" not in url:
+            options.update(
+                pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+                max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            )
+        return options
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        # MySQL drops idle connections after wait_timeout (8h by default)
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+def configure_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async Access ---
+# Same database through an asyncio driver (aiomysql / aiosqlite) for the
+# request handlers. Created on first use so scripts that only need the sync
+# engine don't require the async drivers.
+ASYNC_DRIVERS = {"mysql+pymysql": "mysql+aiomysql", "mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        options = engine_options(ASYNC_DATABASE_URL)
+        if ASYNC_DATABASE_URL.startswith("sqlite") and "pool_size" in options and not os.getenv("DB_POOL_SIZE"):
+            # SQLite has a single writer; extra aiosqlite connections only take
+            # turns through the busy handler's sleeps, which shows up as tail latency
+            options.update(pool_size=1, max_overflow=0)
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **options)
+        if _async_engine.dialect.name == "sqlite":
+            configure_sqlite(_async_engine.sync_engine)
+        # expire_on_commit=False: handlers read ids/fields after commit without a lazy reload
+        _async_sessionmaker = async_sessionmaker(_async_engine, class_=AsyncSession, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_sessionmaker()
+
 Base = declarative_base()
 
+def _payload_property(name):
+    # Keeps resume.parsed_data & co. readable/assignable on instances while the
+    # data itself lives in resume_payloads. Queries use ResumePayload columns.
+    def getter(self):
+        return getattr(self.payload, name) if self.payload is not None else None
+
+    def setter(self, value):
+        if self.payload is None:
+            self.payload = ResumePayload()
+        setattr(self.payload, name, value)
+
+    return property(getter, setter)
+
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        # Per-user listings: WHERE user_id = ? ORDER BY upload_date DESC
+        Index("ix_resumes_user_upload", "user_id", "upload_date"),
+        Index("ix_resumes_upload_id", "upload_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), index=True)
     upload_date = Column(DateTime, default=datetime.utcnow)
-    
+
     # Extracted Basic Info
     full_name = Column(String(255), nullable=True)
     email = Column(String(255), nullable=True)
     phone = Column(String(50), nullable=True)
-    
-    # Full Parsed Data (stored as JSON)
-    parsed_data = Column(JSON, nullable=True)
-    
+
     # Analysis Results
     ats_score = Column(Integer, nullable=True)
+
+    # User Link
+    user_id = Column(Integer, nullable=True) # For now nullable to support guest uploads
+
+    # Heavy columns live in a side table, loaded only when touched
+    payload = relationship("ResumePayload", uselist=False, lazy="select", cascade="all, delete-orphan", back_populates="resume")
+    parsed_data = _payload_property("parsed_data")
+    suggestions = _payload_property("suggestions")
+    extracted_text = _payload_property("extracted_text")
+
+class ResumePayload(Base):
+    __tablename__ = "resume_payloads"
+
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+
+    # Full Parsed Data (stored as JSON)
+    parsed_data = Column(JSON, nullable=True)
     suggestions = Column(JSON, nullable=True)
-    
+
     # Raw Text
     extracted_text = Column(Text, nullable=True)
-    
-    # User Link
-    user_id = Column(Integer, nullable=True) # For now nullable to support guest uploads
+
+    resume = relationship("Resume", back_populates="payload")
+
+class ResumeVersion(Base):
+    # Save history written by resume_versions: zlib-compressed JSON, a full
+    # snapshot every few versions and diffs against the previous one between
+    __tablename__ = "resume_versions"
+
+    resume_id = Column(Integer, ForeignKey("resumes.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    kind = Column(String(8), nullable=False)  # "snapshot" or "delta"
+    data = Column(LargeBinary(length=2 ** 24), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class IdSequence(Base):
+    # Hi/lo id blocks handed out by id_allocator, so a resume's id is known
+    # before its row is written
+    __tablename__ = "id_sequences"
+
+    name = Column(String(64), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+class AnalysisJob(Base):
+    # Background analyses run by job_queue; this table is the queue itself
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # Claiming: WHERE status = 'queued' ORDER BY priority DESC, created_at
+        Index("ix_analysis_jobs_claim", "status", "priority", "created_at"),
+    )
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, handed to the client
+    kind = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done, failed
+    priority = Column(Integer, nullable=False, default=0)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    status_code = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(64), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 class User(Base):
     __tablename__ = "users"
@@ -54,3 +192,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
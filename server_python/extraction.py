@@ -0,0 +1,101 @@
+import io
+import os
+import time
+from contextlib import contextmanager
+
+# Kept free of app/DB imports: these functions are pickled by reference and
+# run inside worker processes, which import this module on their own.
+# pypdf and python-docx are imported on first use, so importing the app (and
+# booting each worker) doesn't pay for them.
+# A `source` is either the file's bytes or a path to a spooled copy; paths
+# are read through an open file so large uploads never sit in memory whole.
+
+# The Gemini prompt only sends the first 10k characters and the local analyzer
+# tops out at ~1500 words, so there is no point parsing pages past this.
+PDF_CHAR_BUDGET = int(os.getenv("PDF_CHAR_BUDGET", "20000"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_SLOW_SECONDS = float(os.getenv("PDF_SLOW_SECONDS", "2.0"))
+
+class PdfTooLarge(ValueError):
+    pass
+
+def source_size(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return os.path.getsize(source)
+
+@contextmanager
+def open_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        # An open file rather than the path: pypdf slurps paths into memory
+        with open(source, "rb") as f:
+            yield f
+
+@contextmanager
+def _open_pdf(source, max_bytes):
+    size = source_size(source)
+    if max_bytes and size > max_bytes:
+        raise PdfTooLarge(f"PDF is {size} bytes, limit is {max_bytes}")
+    from pypdf import PdfReader
+
+    with open_source(source) as stream:
+        yield PdfReader(stream)
+
+def _iter_pages(reader, max_pages):
+    for index, page in enumerate(reader.pages):
+        if max_pages and index >= max_pages:
+            return
+        started = time.perf_counter()
+        text = page.extract_text() or ""
+        yield index, text, time.perf_counter() - started
+
+def iter_pdf_pages(source, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES):
+    """Yield (page_index, text, seconds) lazily, one page at a time."""
+    with _open_pdf(source, max_bytes) as reader:
+        yield from _iter_pages(reader, max_pages)
+
+def extract_pdf(source, char_budget=PDF_CHAR_BUDGET, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES):
+    chunks = []
+    page_timings = []
+    total_chars = 0
+    with _open_pdf(source, max_bytes) as reader:
+        page_count = len(reader.pages)
+        for index, text, seconds in _iter_pages(reader, max_pages):
+            chunks.append(text)
+            page_timings.append(round(seconds, 4))
+            total_chars += len(text)
+            if char_budget and total_chars >= char_budget:
+                break
+
+    return {
+        "text": "\n".join(chunks),
+        "pages": len(page_timings),
+        "page_count": page_count,
+        "truncated": len(page_timings) < page_count,
+        "seconds": round(sum(page_timings), 4),
+        "page_timings": page_timings,
+    }
+
+def extract_text_from_pdf(source):
+    try:
+        return extract_pdf(source)["text"]
+    except PdfTooLarge:
+        raise
+    except Exception as e:
+        print(f"PDF Error: {e}")
+        return ""
+
+def extract_text_from_docx(source):
+    from docx import Document
+
+    try:
+        with open_source(source) as stream:
+            doc = Document(stream)
+        text = "\n".join([para.text for para in doc.paragraphs])
+        return text
+    except Exception as e:
+        print(f"DOCX Error: {e}")
+        return ""
@@ -0,0 +1,67 @@
+import asyncio
+import os
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import AsyncSessionLocal, IdSequence
+
+# Hi/lo id allocation: each process reserves a block of ids with one UPDATE
+# and hands them out from memory. Every insert into the table has to take its
+# id from here, since autoincrement doesn't know about reserved blocks.
+# Reserving a block opens its own session, so take ids before the caller's
+# session is holding a pooled connection.
+
+class IdAllocator:
+    def __init__(self, name, column, block_size=100, session_factory=AsyncSessionLocal):
+        self.name = name
+        self.column = column  # e.g. Resume.id, to stay clear of rows written by other means
+        self.block_size = block_size
+        self.session_factory = session_factory
+        self._next = 0
+        self._limit = 0  # exclusive
+        self._lock = asyncio.Lock()
+        self._counters = {"issued": 0, "blocks": 0}
+
+    async def next_id(self):
+        async with self._lock:
+            if self._next >= self._limit:
+                self._next, self._limit = await self._reserve_block()
+                self._counters["blocks"] += 1
+            value = self._next
+            self._next += 1
+            self._counters["issued"] += 1
+            return value
+
+    async def _reserve_block(self):
+        n = self.block_size
+        for attempt in range(2):
+            async with self.session_factory() as db:
+                # UPDATE first so the row (or the SQLite write lock) is held
+                # while we look at the current maximum
+                bumped = await db.execute(
+                    update(IdSequence).where(IdSequence.name == self.name).values(next_id=IdSequence.next_id + n)
+                )
+                max_id = (await db.execute(select(func.max(self.column)))).scalar() or 0
+                if bumped.rowcount:
+                    start = (await db.execute(select(IdSequence.next_id).where(IdSequence.name == self.name))).scalar() - n
+                    if start <= max_id:
+                        start = max_id + 1
+                        await db.execute(update(IdSequence).where(IdSequence.name == self.name).values(next_id=start + n))
+                else:
+                    start = max_id + 1
+                    await db.execute(insert(IdSequence).values(name=self.name, next_id=start + n))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Another worker created the row first; take the UPDATE path
+                    if attempt:
+                        raise
+                    continue
+                return start, start + n
+
+    def stats(self):
+        return {**self._counters, "block_size": self.block_size, "remaining": self._limit - self._next}
+
+def allocator_from_env(name, column):
+    return IdAllocator(name, column, block_size=int(os.getenv("ID_BLOCK_SIZE", "100")))
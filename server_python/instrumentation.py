@@ -0,0 +1,235 @@
+import asyncio
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Request metrics, stage timing and an opt-in slow-request profiler. The
+# middleware times every request by route template; `with stage("llm"):`
+# blocks inside handlers charge time to a named stage of the current request
+# (a context variable that follows the request into the tasks it spawns).
+# Both feed histograms rendered in Prometheus text format for /metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+# --- Histograms ---
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    def __init__(self, name, help, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {cumulative}")
+        return lines
+
+def render_family(name, kind, help, samples):
+    """Prometheus text for a counter or gauge family; samples are (labels dict, value)."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {value}")
+    return lines
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("request_stage_duration_seconds", "Time spent in named stages of request handling.", ("route", "stage"))
+
+# --- Stages ---
+class RequestTiming:
+    __slots__ = ("scope", "stages")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.stages = {}
+
+    @property
+    def route(self):
+        # Set by the router once matched; templates keep label cardinality bounded
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        timing = _current.get()
+        if timing is not None:
+            timing.stages[name] = timing.stages.get(name, 0.0) + elapsed
+        STAGE_SECONDS.observe((timing.route if timing is not None else "background", name), elapsed)
+
+# --- Middleware ---
+class RequestMetrics:
+    """ASGI middleware: latency per route and status, plus a Server-Timing header with the stages seen so far."""
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope)
+        token = _current.set(timing)
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timing.stages:
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", timing.server_timing().encode("latin-1"))]}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            REQUEST_SECONDS.observe((scope["method"], timing.route, str(status)), elapsed)
+            if self.profiler is not None and elapsed >= self.profiler.threshold:
+                await asyncio.to_thread(self.profiler.dump, scope["method"], timing.route, elapsed)
+
+# --- Slow Request Profiler ---
+# Frames that mean a thread is parked, not working: blocking waits, and pool
+# worker loops, which are only the top frame while blocked on their queue
+IDLE_FRAMES = {"select", "poll", "epoll", "wait", "_wait_for_tstate_lock", "accept", "sleep",
+               "_worker", "_connection_worker_thread"}
+
+class SlowRequestProfiler:
+    """
+    Samples every thread's stack on an interval into a short ring buffer.
+    When a request takes longer than `threshold` seconds, the samples from
+    its time window are written to `directory` as folded stacks (input for
+    flamegraph.pl or speedscope). The window covers the whole process, so
+    requests interleaved on the event loop show up too.
+    """
+
+    def __init__(self, threshold, directory, interval=0.01, window=120.0, max_files=200):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self.window = window
+        self.max_files = max_files
+        self.dumps = 0
+        self._samples = deque()  # (monotonic time, folded stack)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self._samples.extend((now, folded) for folded in stacks)
+                while self._samples and self._samples[0][0] < now - self.window:
+                    self._samples.popleft()
+
+    def dump(self, method, route, elapsed):
+        end = time.monotonic()
+        with self._lock:
+            counts = Counter(folded for at, folded in self._samples if end - elapsed <= at <= end)
+        if not counts:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{int(elapsed * 1000)}ms.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{folded} {count}\n" for folded, count in counts.most_common())
+        self.dumps += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        files = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".folded")),
+            key=os.path.getmtime,
+        )
+        for path in files[:-self.max_files]:
+            os.remove(path)
+
+    def stats(self):
+        with self._lock:
+            buffered = len(self._samples)
+        return {"threshold_ms": int(self.threshold * 1000), "buffered_samples": buffered, "dumps": self.dumps}
+
+def profiler_from_env():
+    """None unless PROFILE_SLOW_MS is set."""
+    threshold_ms = os.getenv("PROFILE_SLOW_MS")
+    if not threshold_ms:
+        return None
+    return SlowRequestProfiler(
+        threshold=float(threshold_ms) / 1000,
+        directory=os.getenv("PROFILE_DIR") or os.path.join(os.getcwd(), "profiles"),
+        interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000,
+        max_files=int(os.getenv("PROFILE_MAX_FILES", "200")),
+    )
@@ -0,0 +1,381 @@
+import asyncio
+import json
+import os
+import re
+import socket
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, or_, select, update
+
+from database import AnalysisJob, AsyncSessionLocal
+from upload_spool import spool_upload
+from workers import PoolSaturated, WorkTimeout
+
+# Background analyses. Endpoints called with ?mode=async insert a row into
+# analysis_jobs and answer 202 with its id straight away; a dispatcher in
+# every server process claims queued rows, highest priority first, and runs
+# them under a per-kind concurrency cap. The table is the queue, so jobs
+# survive restarts and any process can answer for any job: clients poll
+# GET /api/jobs/{id} or follow /api/jobs/{id}/events. A claim is a lease the
+# running process keeps renewing; if the process dies, the job is queued
+# again once the lease runs out.
+
+TERMINAL = ("done", "failed")
+_job_id_re = re.compile(r"[0-9a-f]{32}")
+CLAIM_BATCH = 5  # candidates per claim attempt, in case other processes take the first ones
+MAX_POOL_RETRIES = 20
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def describe(job, ahead=None):
+    """What the status endpoints return for one row."""
+    body = {
+        "jobId": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "createdAt": _isoformat(job.created_at),
+        "startedAt": _isoformat(job.started_at),
+        "finishedAt": _isoformat(job.finished_at),
+        "elapsedSeconds": round(((job.finished_at or datetime.utcnow()) - job.created_at).total_seconds(), 3),
+    }
+    if job.status == "queued":
+        body["ahead"] = ahead
+    elif job.status == "done":
+        body["result"] = job.result
+    elif job.status == "failed":
+        body.update(statusCode=job.status_code, error=job.error)
+    return body
+
+def _encode(fmt, event, payload):
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": event, **payload}) + "\n"
+
+class JobQueue:
+    """
+    Handlers are registered per kind: handler(payload) -> JSON-able result.
+    An exception with a `status_code` (a bad upload) fails the job for good;
+    other errors are retried up to `max_attempts` times. A saturated worker
+    pool means waiting for room, not failing. `payload["path"]`, if set, is a
+    spooled input file the queue deletes once the job is finished.
+    """
+
+    def __init__(self, workers=8, lease_seconds=60, poll_interval=1.0, ttl=86400, max_attempts=3,
+                 drain_seconds=10, spool_dir=None, session_factory=AsyncSessionLocal):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.drain_seconds = drain_seconds
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "resume-jobs")
+        self.session_factory = session_factory
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"[-64:]
+        self._kinds = {}  # kind -> {"handler", "concurrency", "priority"}
+        self._active = Counter()
+        self._tasks = {}  # job id -> task
+        self._dispatcher = None
+        self._wake = None
+        self._changed = None  # replaced by a fresh Event on every change; waiters hold the old one
+        self._counters = Counter({"submitted": 0, "claimed": 0, "done": 0, "failed": 0, "retried": 0, "requeued": 0, "lost": 0})
+
+    def register(self, kind, handler, concurrency, priority=0):
+        self._kinds[kind] = {"handler": handler, "concurrency": concurrency, "priority": priority}
+
+    def start(self):
+        if self._dispatcher is None:
+            self._wake = asyncio.Event()
+            self._changed = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="job-dispatcher")
+
+    def _notify(self):
+        if self._dispatcher is not None:
+            self._wake.set()
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    # --- Submitting ---
+    def spool(self, fileobj, suffix=""):
+        """Blocking: run in a thread. The upload always goes to disk, where whichever process claims the job can read it."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        return spool_upload(fileobj, suffix, threshold=0, directory=self.spool_dir)
+
+    async def submit(self, kind, payload):
+        job = AnalysisJob(id=uuid.uuid4().hex, kind=kind, status="queued", priority=self._kinds[kind]["priority"],
+                          payload=payload, attempts=0, created_at=datetime.utcnow())
+        async with self.session_factory() as db:
+            db.add(job)
+            await db.commit()
+        self._counters["submitted"] += 1
+        self._notify()
+        return job.id
+
+    # --- Reading ---
+    async def get(self, job_id):
+        if not _job_id_re.fullmatch(job_id):
+            return None
+        async with self.session_factory() as db:
+            job = await db.get(AnalysisJob, job_id)
+            if job is None:
+                return None
+            ahead = None
+            if job.status == "queued":
+                ahead = await db.scalar(
+                    select(func.count()).select_from(AnalysisJob).where(
+                        AnalysisJob.status == "queued",
+                        or_(AnalysisJob.priority > job.priority,
+                            and_(AnalysisJob.priority == job.priority, AnalysisJob.created_at < job.created_at)),
+                    )
+                )
+            return describe(job, ahead)
+
+    async def iter_events(self, job_id, fmt="sse", keepalive=15.0):
+        """
+        A `status` event whenever the job moves, then `done` (with the result)
+        or `failed` (with the error). Changes made in this process arrive at
+        once; ones made by other processes within `poll_interval`. SSE streams
+        get a comment line every `keepalive` seconds so proxies keep them open.
+        """
+        last = None
+        quiet_since = time.monotonic()
+        while True:
+            changed = self._changed
+            job = await self.get(job_id)
+            if job is None:
+                yield _encode(fmt, "gone", {"jobId": job_id})
+                return
+            state = (job["status"], job["attempts"], job.get("ahead"))
+            if state != last:
+                last = state
+                quiet_since = time.monotonic()
+                yield _encode(fmt, job["status"] if job["status"] in TERMINAL else "status", job)
+                if job["status"] in TERMINAL:
+                    return
+            elif fmt == "sse" and time.monotonic() - quiet_since >= keepalive:
+                quiet_since = time.monotonic()
+                yield ": keepalive\n\n"
+            if changed is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Dispatching ---
+    async def _dispatch(self):
+        next_sweep = 0.0
+        while True:
+            self._wake.clear()
+            if time.monotonic() >= next_sweep:
+                await self._sweep()
+                next_sweep = time.monotonic() + self.lease_seconds / 3
+            job = None
+            open_kinds = [kind for kind, settings in self._kinds.items() if self._active[kind] < settings["concurrency"]]
+            if len(self._tasks) < self.workers and open_kinds:
+                try:
+                    job = await self._claim(open_kinds)
+                except Exception as e:
+                    print(f"Job queue: claim failed ({(str(e).splitlines() or [type(e).__name__])[0][:300]})")
+            if job is not None:
+                self._start(job)
+                continue
+            # Woken early by a local submit or a finished job
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, kinds):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            candidates = (await db.execute(
+                select(AnalysisJob.id, AnalysisJob.kind, AnalysisJob.payload, AnalysisJob.attempts)
+                .where(AnalysisJob.status == "queued", AnalysisJob.kind.in_(kinds))
+                .order_by(AnalysisJob.priority.desc(), AnalysisJob.created_at, AnalysisJob.id)
+                .limit(CLAIM_BATCH)
+            )).all()
+            for row in candidates:
+                # Another process may have taken it since the SELECT; whoever flips the status owns it
+                claimed = await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id == row.id, AnalysisJob.status == "queued")
+                    .values(status="running", worker=self.worker_id, attempts=row.attempts + 1,
+                            started_at=now, lease_until=now + timedelta(seconds=self.lease_seconds))
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    return {"id": row.id, "kind": row.kind, "payload": row.payload or {}, "attempts": row.attempts + 1}
+        return None
+
+    def _start(self, job):
+        self._active[job["kind"]] += 1
+        self._counters["claimed"] += 1
+        task = asyncio.create_task(self._run(job), name=f"job-{job['id']}")
+        self._tasks[job["id"]] = task
+
+        def finished(_):
+            self._tasks.pop(job["id"], None)
+            self._active[job["kind"]] -= 1
+            self._notify()
+
+        task.add_done_callback(finished)
+        self._notify()
+
+    async def _run(self, job):
+        handler = self._kinds[job["kind"]]["handler"]
+        try:
+            for attempt in range(MAX_POOL_RETRIES + 1):
+                try:
+                    result = await handler(job["payload"])
+                    break
+                except PoolSaturated as e:
+                    if attempt == MAX_POOL_RETRIES:
+                        raise
+                    await asyncio.sleep(min(e.retry_after, 5))
+        except WorkTimeout:
+            await self._finish(job, "failed", status_code=504, error="Processing took too long. Please try a smaller file.")
+        except Exception as e:
+            status_code = getattr(e, "status_code", None)
+            if status_code is None and job["attempts"] < self.max_attempts:
+                print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed, retrying: {e}")
+                await asyncio.sleep(min(2 ** job["attempts"], 30))
+                self._counters["retried"] += 1
+                await self._finish(job, "queued")
+            else:
+                await self._finish(job, "failed", status_code=status_code or 500, error=getattr(e, "message", None) or str(e))
+        else:
+            await self._finish(job, "done", result=result)
+
+    async def _finish(self, job, status, result=None, status_code=None, error=None):
+        values = {"status": status, "lease_until": None}
+        if status == "queued":
+            values["worker"] = None
+        else:
+            values.update(result=result, status_code=status_code, error=error, finished_at=datetime.utcnow())
+        try:
+            async with self.session_factory() as db:
+                outcome = await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id == job["id"], AnalysisJob.worker == self.worker_id, AnalysisJob.status == "running")
+                    .values(**values)
+                )
+                await db.commit()
+        except Exception as e:
+            # The lease runs out and another attempt picks the job up
+            print(f"Job {job['id']}: could not record {status} ({e})")
+            return
+        if outcome.rowcount != 1:
+            self._counters["lost"] += 1
+            print(f"Job {job['id']}: lease lost before it finished; result discarded")
+            return
+        if status in TERMINAL:
+            self._counters[status] += 1
+            self._remove_input(job["payload"])
+
+    @staticmethod
+    def _remove_input(payload):
+        path = (payload or {}).get("path")
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    async def _sweep(self):
+        """Renews this process's leases, takes back jobs whose process stopped renewing, prunes old finished jobs."""
+        now = datetime.utcnow()
+        expired = and_(AnalysisJob.status == "running", AnalysisJob.lease_until < now)
+        try:
+            async with self.session_factory() as db:
+                if self._tasks:
+                    await db.execute(
+                        update(AnalysisJob)
+                        .where(AnalysisJob.id.in_(list(self._tasks)), AnalysisJob.worker == self.worker_id,
+                               AnalysisJob.status == "running")
+                        .values(lease_until=now + timedelta(seconds=self.lease_seconds))
+                    )
+                exhausted = (await db.execute(
+                    select(AnalysisJob.id, AnalysisJob.payload).where(expired, AnalysisJob.attempts >= self.max_attempts)
+                )).all()
+                if exhausted:
+                    await db.execute(
+                        update(AnalysisJob)
+                        .where(expired, AnalysisJob.id.in_([row.id for row in exhausted]))
+                        .values(status="failed", status_code=500, error="The worker running this job stopped",
+                                finished_at=now, lease_until=None)
+                    )
+                requeued = await db.execute(update(AnalysisJob).where(expired).values(status="queued", worker=None, lease_until=None))
+                await db.execute(
+                    delete(AnalysisJob).where(AnalysisJob.status.in_(TERMINAL),
+                                              AnalysisJob.finished_at < now - timedelta(seconds=self.ttl))
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"Job queue: sweep failed ({(str(e).splitlines() or [type(e).__name__])[0][:300]})")
+            return
+        for row in exhausted:
+            self._remove_input(row.payload)
+        if requeued.rowcount:
+            print(f"Job queue: requeued {requeued.rowcount} job(s) from stopped workers")
+
+    async def close(self):
+        """Stops claiming, gives running jobs `drain_seconds` to finish, then puts the rest back in the queue."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()), timeout=self.drain_seconds)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if not tasks:
+            return
+        try:
+            async with self.session_factory() as db:
+                # An interrupted run doesn't count against the job's attempts
+                requeued = await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.worker == self.worker_id, AnalysisJob.status == "running")
+                    .values(status="queued", worker=None, lease_until=None, attempts=AnalysisJob.attempts - 1)
+                )
+                await db.commit()
+            self._counters["requeued"] += requeued.rowcount
+            print(f"Job queue: requeued {requeued.rowcount} unfinished job(s)")
+        except Exception as e:
+            print(f"Job queue: could not requeue unfinished jobs ({e}); their leases will expire")
+
+    def stats(self):
+        return {
+            "worker": self.worker_id,
+            "workers": self.workers,
+            "running": len(self._tasks),
+            "kinds": {kind: {"concurrency": settings["concurrency"], "priority": settings["priority"], "running": self._active[kind]}
+                      for kind, settings in self._kinds.items()},
+            **self._counters,
+        }
+
+def kind_from_env(kind, concurrency, priority=0):
+    """Per-endpoint settings: JOB_<KIND>_CONCURRENCY (per process) and JOB_<KIND>_PRIORITY (higher runs first)."""
+    prefix = f"JOB_{kind.upper()}_"
+    return {
+        "concurrency": int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+        "priority": int(os.getenv(prefix + "PRIORITY", priority)),
+    }
+
+def job_queue_from_env():
+    return JobQueue(
+        workers=int(os.getenv("JOB_WORKERS", "8")),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1")),
+        ttl=float(os.getenv("JOB_TTL", "86400")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        drain_seconds=float(os.getenv("JOB_DRAIN_SECONDS", "10")),
+        spool_dir=os.getenv("JOB_SPOOL_DIR"),
+    )
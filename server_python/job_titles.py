@@ -0,0 +1,382 @@
+import json
+import os
+import re
+from collections import Counter, OrderedDict
+
+from analysis_cache import tiered_cache
+
+# In-process job title normalization for the title autocomplete. A curated
+# taxonomy is indexed once into a prefix trie (over whole titles, each word
+# start and common abbreviations) and a character-trigram index for typos.
+# Only queries neither can place go to the model; its titles are added to the
+# index so the next user typing them is answered locally. Learned titles are
+# capped, and the least recently learned are dropped from the index first.
+
+TITLE_TAXONOMY = {
+    "Software Engineering": [
+        "Software Engineer", "Software Developer", "Front End Developer", "Back End Developer",
+        "Full Stack Developer", "Web Developer", "Mobile Developer", "iOS Developer", "Android Developer",
+        "Embedded Software Engineer", "Game Developer", "DevOps Engineer", "Site Reliability Engineer",
+        "QA Engineer", "Software Test Engineer", "Test Automation Engineer", "Software Architect",
+        "Engineering Manager", "Platform Engineer", "Firmware Engineer", "Machine Learning Engineer",
+        "Blockchain Developer", "Salesforce Developer", "Python Developer", "Java Developer",
+        ".NET Developer", "JavaScript Developer", "React Developer", "PHP Developer",
+    ],
+    "Data & Analytics": [
+        "Data Scientist", "Data Analyst", "Data Engineer", "Business Intelligence Analyst",
+        "Analytics Engineer", "Machine Learning Scientist", "Research Scientist", "Statistician",
+        "Database Administrator", "Business Analyst", "Quantitative Analyst", "Data Architect",
+    ],
+    "IT & Infrastructure": [
+        "System Administrator", "Network Engineer", "Network Administrator", "Cloud Engineer",
+        "Cloud Architect", "IT Support Specialist", "Help Desk Technician", "IT Manager",
+        "Security Engineer", "Cybersecurity Analyst", "Information Security Analyst", "Penetration Tester",
+        "Solutions Architect", "Technical Support Engineer", "IT Project Manager",
+    ],
+    "Product": [
+        "Product Manager", "Product Owner", "Technical Product Manager", "Program Manager",
+        "Project Manager", "Scrum Master", "Product Analyst",
+    ],
+    "Design": [
+        "UX Designer", "UI Designer", "UX/UI Designer", "Product Designer", "Graphic Designer",
+        "Visual Designer", "Interaction Designer", "UX Researcher", "Web Designer", "Motion Designer",
+        "Interior Designer", "Fashion Designer", "Industrial Designer", "Architect",
+    ],
+    "Marketing": [
+        "Marketing Manager", "Digital Marketing Specialist", "Growth Marketing Manager",
+        "Content Marketing Manager", "Social Media Manager", "SEO Specialist", "Marketing Coordinator",
+        "Brand Manager", "Product Marketing Manager", "Marketing Analyst", "Email Marketing Specialist",
+        "Public Relations Specialist", "Communications Manager", "Content Strategist", "Marketing Intern",
+    ],
+    "Sales": [
+        "Sales Representative", "Account Executive", "Account Manager", "Sales Manager",
+        "Business Development Manager", "Sales Development Representative", "Customer Success Manager",
+        "Retail Sales Associate", "Inside Sales Representative", "Regional Sales Manager",
+    ],
+    "Finance & Accounting": [
+        "Accountant", "Senior Accountant", "Financial Analyst", "Auditor", "Bookkeeper",
+        "Controller", "Tax Accountant", "Investment Banker", "Financial Advisor", "Payroll Specialist",
+        "Accounts Payable Specialist", "Credit Analyst", "Actuary", "Finance Manager",
+    ],
+    "Human Resources": [
+        "HR Manager", "HR Generalist", "Recruiter", "Technical Recruiter", "Talent Acquisition Specialist",
+        "HR Business Partner", "Compensation Analyst", "Training and Development Manager",
+    ],
+    "Operations": [
+        "Operations Manager", "Supply Chain Manager", "Logistics Coordinator", "Warehouse Manager",
+        "Procurement Specialist", "Purchasing Manager", "Inventory Analyst", "Facilities Manager",
+    ],
+    "Executive": [
+        "Chief Executive Officer", "Chief Technology Officer", "Chief Financial Officer",
+        "Chief Operating Officer", "Chief Marketing Officer", "Chief Information Officer",
+        "Vice President of Engineering", "Vice President of Sales", "General Manager", "Managing Director",
+    ],
+    "Administrative": [
+        "Administrative Assistant", "Executive Assistant", "Office Manager", "Receptionist",
+        "Data Entry Clerk", "Office Administrator", "Virtual Assistant",
+    ],
+    "Customer Service": [
+        "Customer Service Representative", "Call Center Agent", "Customer Support Specialist",
+        "Client Services Manager",
+    ],
+    "Healthcare": [
+        "Registered Nurse", "Nurse Practitioner", "Physician", "Medical Assistant", "Pharmacist",
+        "Physical Therapist", "Dental Hygienist", "Medical Receptionist", "Healthcare Administrator",
+        "Caregiver", "Psychologist", "Dietitian",
+    ],
+    "Education": [
+        "Teacher", "Elementary School Teacher", "High School Teacher", "Tutor", "Professor",
+        "Teaching Assistant", "Instructional Designer", "School Counselor", "Principal",
+    ],
+    "Legal": ["Lawyer", "Attorney", "Paralegal", "Legal Assistant", "Compliance Officer", "Legal Counsel"],
+    "Engineering": [
+        "Mechanical Engineer", "Civil Engineer", "Electrical Engineer", "Chemical Engineer",
+        "Structural Engineer", "Manufacturing Engineer", "Process Engineer", "Quality Engineer",
+        "Biomedical Engineer", "Aerospace Engineer", "Environmental Engineer",
+    ],
+    "Creative & Media": [
+        "Art Director", "Creative Director", "Copywriter", "Content Writer", "Technical Writer",
+        "Editor", "Video Editor", "Photographer", "Journalist", "Animator", "Illustrator",
+    ],
+    "Hospitality": ["Chef", "Cook", "Restaurant Manager", "Server", "Bartender", "Hotel Manager", "Barista", "Cashier"],
+    "Skilled Trades": ["Electrician", "Plumber", "Carpenter", "Welder", "HVAC Technician", "Mechanic", "Driver"],
+}
+
+ALIASES = {
+    "swe": "Software Engineer", "sde": "Software Engineer", "dev": "Software Developer",
+    "frontend developer": "Front End Developer", "backend developer": "Back End Developer",
+    "fullstack developer": "Full Stack Developer", "sre": "Site Reliability Engineer",
+    "ml engineer": "Machine Learning Engineer", "qa": "QA Engineer", "sdet": "Test Automation Engineer",
+    "pm": "Product Manager", "tpm": "Technical Product Manager", "ux": "UX Designer", "ui": "UI Designer",
+    "bi analyst": "Business Intelligence Analyst", "dba": "Database Administrator", "sysadmin": "System Administrator",
+    "hr": "HR Manager", "hrbp": "HR Business Partner", "sdr": "Sales Development Representative",
+    "ae": "Account Executive", "csm": "Customer Success Manager", "cpa": "Accountant",
+    "ceo": "Chief Executive Officer", "cto": "Chief Technology Officer", "cfo": "Chief Financial Officer",
+    "coo": "Chief Operating Officer", "cmo": "Chief Marketing Officer", "cio": "Chief Information Officer",
+    "vp engineering": "Vice President of Engineering", "vp sales": "Vice President of Sales",
+    "rn": "Registered Nurse", "np": "Nurse Practitioner", "ea": "Executive Assistant", "va": "Virtual Assistant",
+}
+
+# Leading words that qualify a title rather than name one: "senior data analyst"
+SENIORITY = {
+    "intern": "Intern", "trainee": "Trainee", "fresher": "Junior", "graduate": "Graduate", "junior": "Junior",
+    "jr": "Junior", "associate": "Associate", "senior": "Senior", "sr": "Senior", "lead": "Lead",
+    "staff": "Staff", "principal": "Principal",
+}
+# Categories whose titles already carry their level
+UNLEVELED_CATEGORIES = ("Executive",)
+
+_non_word_re = re.compile(r"[^a-z0-9+#./]+")
+
+def normalize(text):
+    return " ".join(_non_word_re.sub(" ", text.lower()).split())
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def load_taxonomy(path):
+    # Optional JSON file of extra titles, e.g. {"Healthcare": ["Phlebotomist"]}
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# --- Index ---
+class _TrieNode:
+    __slots__ = ("children", "hits")
+
+    def __init__(self):
+        self.children = {}
+        self.hits = []  # (rank, title length, title id), best first
+
+class TitleIndex:
+    def __init__(self, taxonomy=None, aliases=None, max_hits_per_node=12, max_model_titles=2000):
+        self.max_hits_per_node = max_hits_per_node
+        self.max_model_titles = max_model_titles
+        self.titles = []  # (title, category, source), None for a removed title's id
+        self.model_titles = OrderedDict()  # title id -> None, least recently learned first
+        self._free_ids = []
+        self.by_key = {}  # normalized title or alias -> title id
+        self.root = _TrieNode()
+        self.grams = {}  # trigram -> set of title ids
+        self.gram_counts = []  # title id -> number of distinct trigrams
+        self.counters = Counter()
+        for category, titles in (taxonomy or TITLE_TAXONOMY).items():
+            for title in titles:
+                self.add(title, category)
+        for alias, title in (aliases or ALIASES).items():
+            title_id = self.by_key.get(normalize(title))
+            if title_id is not None:
+                self._insert(normalize(alias), (0, len(alias), title_id))
+                self.by_key.setdefault(normalize(alias), title_id)
+
+    def __len__(self):
+        return len(self.titles) - len(self._free_ids)
+
+    def add(self, title, category, source="taxonomy"):
+        key = normalize(title)
+        if not key or key in self.by_key:
+            title_id = self.by_key.get(key)
+            if title_id in self.model_titles:
+                self.model_titles.move_to_end(title_id)
+            return title_id
+        grams = trigrams(key)
+        entry = (title, category, source)
+        if self._free_ids:
+            title_id = self._free_ids.pop()
+            self.titles[title_id] = entry
+            self.gram_counts[title_id] = len(grams)
+        else:
+            title_id = len(self.titles)
+            self.titles.append(entry)
+            self.gram_counts.append(len(grams))
+        self.by_key[key] = title_id
+        # Whole title first, then every later word start ("engineer" finds "Software Engineer")
+        for suffix, rank in self._suffixes(key):
+            self._insert(suffix, (rank, len(key), title_id))
+        for gram in grams:
+            self.grams.setdefault(gram, set()).add(title_id)
+        if source == "model":
+            self.model_titles[title_id] = None
+            while len(self.model_titles) > self.max_model_titles:
+                self.remove(next(iter(self.model_titles)))
+        return title_id
+
+    def remove(self, title_id):
+        title, _, _ = self.titles[title_id]
+        key = normalize(title)
+        del self.by_key[key]
+        for suffix, _ in self._suffixes(key):
+            self._unlink(suffix, title_id)
+        for gram in trigrams(key):
+            ids = self.grams[gram]
+            ids.discard(title_id)
+            if not ids:
+                del self.grams[gram]
+        self.model_titles.pop(title_id, None)
+        self.titles[title_id] = None
+        self.gram_counts[title_id] = 0
+        self._free_ids.append(title_id)
+
+    @staticmethod
+    def _suffixes(key):
+        words = key.split(" ")
+        return [(" ".join(words[i:]), min(i, 1)) for i in range(len(words))]
+
+    def _insert(self, key, hit):
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+            if hit[2] in (h[2] for h in node.hits):
+                continue
+            node.hits.append(hit)
+            node.hits.sort()
+            del node.hits[self.max_hits_per_node:]
+
+    def _unlink(self, key, title_id):
+        path = [self.root]
+        for ch in key:
+            node = path[-1].children.get(ch)
+            if node is None:
+                break
+            node.hits = [h for h in node.hits if h[2] != title_id]
+            path.append(node)
+        # Drop the branch nodes nothing passes through any more
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            if node.hits or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+
+    def prefix(self, key, limit):
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return node.hits[:limit]
+
+    def fuzzy(self, key, limit, min_score=0.45):
+        """Titles by trigram Dice similarity, which tolerates typos and transpositions."""
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for title_id in self.grams.get(gram, ()):
+                shared[title_id] += 1
+        scored = [
+            (2 * count / (len(grams) + self.gram_counts[title_id]), title_id)
+            for title_id, count in shared.items()
+        ]
+        scored = sorted((item for item in scored if item[0] >= min_score), reverse=True)
+        return scored[:limit]
+
+    def lookup(self, query, limit=5):
+        """(title ids, confidence, how it matched) for a query; ids are empty on a miss."""
+        key = normalize(query)
+        if not key:
+            return [], 0.0, "empty"
+        exact = self.by_key.get(key)
+        if exact is not None:
+            rest = [h[2] for h in self.prefix(key, limit + 1) if h[2] != exact]
+            return [exact, *rest][:limit], 1.0, "exact"
+        hits = self.prefix(key, limit)
+        if hits:
+            # Confidence grows with how much of the best title has been typed
+            rank, length, _ = hits[0]
+            return [h[2] for h in hits], round((0.5 + 0.5 * len(key) / length) * (1.0 if rank == 0 else 0.9), 3), "prefix"
+        scored = self.fuzzy(key, limit)
+        if scored:
+            return [title_id for _, title_id in scored], round(scored[0][0], 3), "fuzzy"
+        return [], 0.0, "miss"
+
+# --- Normalizer ---
+class TitleNormalizer:
+    """
+    Answers classify-job-title from the index. Seniority words are peeled off
+    the query and put back on the matched titles. The model is consulted only
+    below `min_confidence` on a non-prefix match, and its answers are indexed
+    (and, with shared state, cached for every worker).
+    """
+
+    def __init__(self, index, min_confidence=0.7, cache_size=4096, state=None):
+        self.index = index
+        self.min_confidence = min_confidence
+        self.model_answers = tiered_cache(cache_size, 7 * 86400, state, "titles:")
+        self.counters = Counter()
+
+    def _split_level(self, query):
+        words = normalize(query).split(" ")
+        if len(words) > 1 and words[0] in SENIORITY:
+            return SENIORITY[words[0]], " ".join(words[1:])
+        if len(words) > 1 and words[-1] in ("intern", "trainee"):
+            return SENIORITY[words[-1]], " ".join(words[:-1])
+        return None, " ".join(words)
+
+    @staticmethod
+    def _with_level(level, title, category):
+        if level is None or category in UNLEVELED_CATEGORIES or title.lower().startswith(level.lower()):
+            return title
+        return f"{title} {level}" if level in ("Intern", "Trainee") else f"{level} {title}"
+
+    def classify(self, query, limit=5):
+        ids, confidence, how = self.index.lookup(query, limit)
+        level = None
+        if how not in ("exact", "prefix"):
+            # "senior data analyst" -> "data analyst", re-leveled below
+            level, base = self._split_level(query)
+            if level is not None:
+                ids, confidence, how = self.index.lookup(base, limit)
+        self.counters[how] += 1
+        if not ids:
+            return {"matched_titles": [], "best_job_title": "", "job_category": "", "confidence_score": 0.0}
+        titles = [self._with_level(level, *self.index.titles[i][:2]) for i in ids]
+        return {
+            "matched_titles": list(dict.fromkeys(titles)),
+            "best_job_title": titles[0],
+            "job_category": self.index.titles[ids[0]][1],
+            "confidence_score": confidence,
+        }
+
+    def needs_model(self, query, result):
+        if result["confidence_score"] >= self.min_confidence:
+            return False
+        # Half-typed words are autocomplete, never a miss
+        _, base = self._split_level(query)
+        return not (self.index.prefix(normalize(query), 1) or self.index.prefix(normalize(base), 1))
+
+    async def cached_model_answer(self, query):
+        return await self.model_answers.get(normalize(query))
+
+    async def learn(self, query, answer):
+        """
+        Indexes the model's titles and remembers its answer for this query.
+        Returns False, learning nothing, if the answer isn't the asked-for shape.
+        """
+        titles = answer.get("matched_titles") or []
+        best = answer.get("best_job_title") or ""
+        if not isinstance(titles, list) or not isinstance(best, str):
+            self.counters["rejected"] += 1
+            return False
+        category = str(answer.get("job_category") or "General")
+        titles = [t.strip() for t in [best, *titles] if isinstance(t, str) and t.strip()]
+        for title in titles:
+            self.index.add(title, category, source="model")
+        await self.model_answers.set(normalize(query), answer)
+        self.counters["learned"] += 1
+        return True
+
+    def stats(self):
+        return {**self.counters, "titles": len(self.index), "model_titles": len(self.index.model_titles),
+                "cached_model_answers": len(self.model_answers)}
+
+def normalizer_from_env(state=None):
+    taxonomy = {category: list(titles) for category, titles in TITLE_TAXONOMY.items()}
+    for category, titles in (load_taxonomy(os.getenv("JOB_TITLES_PATH")) or {}).items():
+        taxonomy.setdefault(category, []).extend(titles)
+    return TitleNormalizer(
+        TitleIndex(taxonomy, max_model_titles=int(os.getenv("JOB_TITLE_MAX_LEARNED", "2000"))),
+        min_confidence=float(os.getenv("JOB_TITLE_MIN_CONFIDENCE", "0.7")),
+        cache_size=int(os.getenv("JOB_TITLE_CACHE_SIZE", "4096")),
+        state=state,
+    )
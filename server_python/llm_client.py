@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from instrumentation import stage
+from workers import PoolSaturated
+
+class LLMError(Exception):
+    pass
+
+class LLMUnavailable(LLMError):
+    """No model configured, circuit open, or retries exhausted."""
+
+# --- Response Parsing ---
+_fence_re = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
+def parse_json_response(text):
+    try:
+        return json.loads(_fence_re.sub("", text))
+    except (TypeError, ValueError) as e:
+        raise LLMError(f"Model returned invalid JSON: {e}")
+
+# --- Rate Limiting ---
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                self.waits += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class SharedTokenBucket:
+    """
+    TokenBucket's limit held in shared state, so it applies to all worker
+    processes together. The stored value is GCRA's theoretical arrival time:
+    each acquire reserves the next slot atomically and sleeps until it, and
+    up to `capacity` slots may be taken ahead of schedule.
+    """
+
+    def __init__(self, state, key, rate, capacity):
+        self.state = state
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.waits = 0
+
+    def _reserve(self, tat):
+        now = time.time()
+        tat = max(tat or now, now) + 1 / self.rate
+        return tat, max(0.0, tat - now - self.capacity / self.rate)
+
+    async def acquire(self):
+        wait = await asyncio.to_thread(self.state.update, self.key, self._reserve)
+        if wait > 0:
+            self.waits += 1
+            await asyncio.sleep(wait)
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and rejects
+    calls for `reset_timeout` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+# --- Client ---
+class LLMClient:
+    """
+    Shared async front for the blocking Gemini SDK. Identical prompts that are
+    already in flight share one upstream call; everything else goes through
+    the token bucket, the concurrency cap and the circuit breaker. Callers
+    catch LLMError and fall back to the local analyzer.
+    """
+
+    def __init__(self, model, pool=None, rate=5.0, burst=10, max_concurrency=8,
+                 max_retries=2, backoff=0.5, breaker=None, state=None):
+        self.model = model
+        self.pool = pool
+        # Gemini's quota is per API key, so with several workers the bucket has to be shared
+        if state is not None and state.shared:
+            self.bucket = SharedTokenBucket(state, "llm:bucket", rate, burst)
+        else:
+            self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._inflight = {}
+        self._counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0,
+                          "failures": 0, "short_circuited": 0, "upstream_seconds": 0.0}
+
+    @property
+    def available(self):
+        return self.model is not None
+
+    async def generate_json(self, prompt):
+        if self.model is None:
+            raise LLMUnavailable("No model configured")
+        self._counters["requests"] += 1
+
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._call_with_retry(prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller doesn't cancel the call for the others
+        with stage("llm"):
+            return await asyncio.shield(task)
+
+    async def _call(self, prompt):
+        if self.pool is not None:
+            return await self.pool.run(self.model.generate_content, prompt)
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+
+    async def _call_with_retry(self, prompt):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._counters["short_circuited"] += 1
+                raise LLMUnavailable("Circuit open, upstream is failing")
+
+            await self.bucket.acquire()
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    self._counters["upstream_calls"] += 1
+                    response = await self._call(prompt)
+                    # Inside the try: Gemini's .text raises ValueError when the
+                    # candidate was blocked or came back empty
+                    data = parse_json_response(response.text)
+                    if not isinstance(data, dict):
+                        raise LLMError(f"Model returned a JSON {type(data).__name__}, expected an object")
+                except PoolSaturated:
+                    # Our own backpressure, not an upstream failure
+                    self.breaker.trial_in_flight = False
+                    raise
+                except Exception as e:
+                    last_error = e
+                    self._counters["failures"] += 1
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                    return data
+                finally:
+                    self._counters["upstream_seconds"] += time.perf_counter() - started
+
+            if attempt < self.max_retries:
+                self._counters["retries"] += 1
+                # Full jitter around an exponential base
+                await asyncio.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+        raise LLMUnavailable(f"Model call failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["upstream_seconds"] = round(stats["upstream_seconds"], 3)
+        stats.update(
+            available=self.available,
+            in_flight=len(self._inflight),
+            rate_limited_waits=self.bucket.waits,
+            circuit=self.breaker.state,
+            max_concurrency=self._max_concurrency,
+        )
+        return stats
+
+def client_from_env(model, pool=None, state=None):
+    return LLMClient(
+        model,
+        pool=pool,
+        state=state,
+        rate=float(os.getenv("LLM_RATE", "5")),
+        burst=int(os.getenv("LLM_BURST", "10")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        backoff=float(os.getenv("LLM_BACKOFF", "0.5")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+        ),
+    )
+
+# --- Gemini ---
+class GeminiModel:
+    """
+    genai.GenerativeModel, built on the first call. Importing the Gemini SDK
+    takes around half a second, which every worker would otherwise pay at boot
+    whether or not it ever calls the model.
+    """
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate_content(self, prompt):
+        return (self._model or self._load()).generate_content(prompt)
+
+# --- Fake Model ---
+class FakeModel:
+    """
+    Stand-in for genai.GenerativeModel for local runs and load tests
+    (LLM_FAKE_MODEL=1). Answers each of our prompt kinds with canned JSON,
+    optionally with latency and a failure rate.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, responder=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.responder = responder or self.default_response
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("FakeModel: simulated upstream failure")
+        return SimpleNamespace(text="```json\n" + json.dumps(self.responder(prompt)) + "\n```")
+
+    @staticmethod
+    def default_response(prompt):
+        if "ATS (Applicant Tracking System)" in prompt:
+            return {
+                "atsScore": 72,
+                "suggestions": [{"id": 1, "type": "success", "title": "Fake Analysis", "description": "Generated by FakeModel."}],
+                "parsedData": {"fullName": "Fake Candidate", "email": "", "phone": "", "location": "", "linkedin": "",
+                               "summary": "", "skills": [], "experience": [], "education": [], "projects": []},
+            }
+        if "Compare the following resume" in prompt:
+            return {"matchScore": 64, "summary": "Generated by FakeModel.", "missingKeywords": [], "recommendations": []}
+        if "Job Title Normalization" in prompt:
+            return {"matched_titles": ["Software Engineer"], "best_job_title": "Software Engineer",
+                    "job_category": "Information Technology", "confidence_score": 0.9}
+        if "each headed by an id in brackets" in prompt:
+            ids = re.findall(r"^\s*\[([\w:]+)\]\s*$", prompt, re.MULTILINE)
+            return {"sections": {section_id: [f"Generated by FakeModel for {section_id}."] for section_id in ids}}
+        return {"suggestions": ["Generated by FakeModel."]}
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import io
+import statistics
+import time
+import uuid
+
+import httpx
+from reportlab.pdfgen import canvas
+
+# Concurrent /api/upload-optimize load test.
+#   python loadtest_upload.py --url http://localhost:8000 --concurrency 32 --requests 400
+#   python loadtest_upload.py --in-process   (drives main.app directly, set DATABASE_URL first)
+# Every upload carries a unique line so the analysis cache never short-circuits it.
+# A probe polls GET /api/content meanwhile; its latency is how long the event
+# loop was blocked.
+
+RESUME_LINES = [
+    "Jane Doe", "jane.doe@example.com | (555) 123-4567", "Summary",
+    "Backend engineer who led and developed high-throughput services.",
+    "Experience", "Senior Software Engineer, Acme Corp", "Jan 2020 - Present",
+    "Led a team of 5 engineers, improved latency by 30% and launched a new platform.",
+    "Education", "B.S. Computer Science, State University, 2013 - 2017",
+    "Skills", "Python, SQL, FastAPI, Docker", "Projects", "Resume Builder",
+]
+
+def make_pdf(extra_line):
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf)
+    y = 800
+    for line in RESUME_LINES + [extra_line]:
+        pdf.drawString(40, y, line)
+        y -= 16
+    pdf.save()
+    return buf.getvalue()
+
+async def run(client, total, concurrency):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(make_pdf(f"Reference {uuid.uuid4()}"))
+
+    async def worker():
+        while not queue.empty():
+            pdf = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post("/api/upload-optimize", files={"file": ("resume.pdf", pdf, "application/pdf")})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/api/content")
+            probe_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    print(f"{total} uploads, concurrency {concurrency}: {total / elapsed:.1f} req/s")
+    print(f"  latency ms  {summarize(latencies)}")
+    print(f"  probe ms    {summarize(probe_latencies)}")
+    print(f"  status codes {statuses}")
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return f"p50 {pct(0.50):.0f}  p95 {pct(0.95):.0f}  p99 {pct(0.99):.0f}  mean {statistics.mean(latencies) * 1000:.0f}"
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    if args.in_process:
+        from main import app
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+                await run(client, args.requests, args.concurrency)
+    else:
+        async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+            await run(client, args.requests, args.concurrency)
+
+if __name__ == "__main__":
+    asyncio.run(main())
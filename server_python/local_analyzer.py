@@ -0,0 +1,372 @@
+import json
+import re
+from collections import Counter
+
+from structured_extractor import DATE_RE, extract_education, extract_experience, extract_projects
+
+# --- Compiled Patterns ---
+EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_RE = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+LINKEDIN_RE = re.compile(r'linkedin\.com/in/[a-zA-Z0-9-]+')
+WORD_RE = re.compile(r'\w+')
+LINE_RE = re.compile(r'[^\n]+')
+SKILL_SPLIT_RE = re.compile(r'[,•\n]')
+
+ESSENTIAL_SECTIONS = ["experience", "education", "skills", "projects", "summary"]
+
+# Heading variants per canonical section. Sections outside ESSENTIAL_SECTIONS
+# are indexed too so they end the section before them instead of leaking in.
+SECTION_SYNONYMS = {
+    "summary": ["professional summary", "career summary", "executive summary", "profile", "professional profile",
+                "about me", "objective", "career objective", "overview"],
+    "experience": ["work experience", "professional experience", "relevant experience", "work history",
+                   "employment history", "employment", "career history"],
+    "education": ["education and training", "academic background", "academic qualifications", "qualifications"],
+    "skills": ["technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "skills & expertise", "areas of expertise", "technologies"],
+    "projects": ["personal projects", "academic projects", "key projects", "selected projects"],
+    "certifications": ["certificates", "licenses & certifications", "licenses and certifications"],
+    "awards": ["honors", "honors & awards", "achievements"],
+    "languages": [],
+    "publications": [],
+    "volunteering": ["volunteer experience", "volunteer work"],
+    "interests": ["hobbies", "hobbies & interests"],
+    "references": [],
+}
+
+STOP_WORDS = {"and", "the", "to", "of", "in", "a", "for", "with", "on", "is", "an", "or", "be", "as"}
+
+def load_section_synonyms(path):
+    # Optional JSON file of extra headings, e.g. {"experience": ["Internships"]}
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# --- Section Index ---
+class SectionIndex:
+    """
+    Locates every section heading in one pass. A heading is a line that holds
+    only a known synonym (optionally bulleted), or a synonym followed by a
+    colon/dash and inline content ("Skills: Python, SQL"), so "experience"
+    inside a sentence never starts a section.
+    """
+
+    def __init__(self, synonyms=None):
+        table = {name: list(words) for name, words in SECTION_SYNONYMS.items()}
+        for name, words in (synonyms or {}).items():
+            table.setdefault(name.lower(), []).extend(words)
+
+        self.lookup = {}
+        for canonical, words in table.items():
+            for word in [canonical] + words:
+                self.lookup[self._key(word)] = canonical
+
+        # Longest first so "Technical Skills" wins over "Skills"
+        alternation = "|".join(
+            re.escape(word).replace(r"\ ", r"[ \t]+") for word in sorted(self.lookup, key=len, reverse=True)
+        )
+        self.pattern = re.compile(
+            r"^[ \t]*(?:[#*•>=_|-]+[ \t]*)?(?P<name>" + alternation + r")[ \t]*"
+            r"(?:[:|–—-][ \t]*(?P<inline>[^\n]*?))?[ \t\r]*$",
+            re.IGNORECASE | re.MULTILINE,
+        )
+
+    @staticmethod
+    def _key(word):
+        return " ".join(word.lower().split())
+
+    def scan(self, text):
+        """Return {canonical: [(start, end), ...]} content spans."""
+        headers = []
+        for m in self.pattern.finditer(text):
+            content_start = m.start("inline") if m.group("inline") else m.end()
+            headers.append((self.lookup[self._key(m.group("name"))], m.start(), content_start))
+
+        spans = {}
+        for i, (name, _, content_start) in enumerate(headers):
+            end = headers[i + 1][1] if i + 1 < len(headers) else len(text)
+            spans.setdefault(name, []).append((content_start, end))
+        return spans
+
+DEFAULT_SECTION_INDEX = SectionIndex()
+
+# --- Document Model ---
+class ResumeDocument:
+    """
+    Everything the local engine needs from a resume, computed once: the
+    lowercased text, the word tokens, non-empty lines with their offsets,
+    contact matches and the section spans from the heading index. `analyze`
+    and `parse_resume` both read from this instead of rescanning the text.
+    """
+
+    __slots__ = ("text", "lower", "tokens", "token_set", "word_count", "lines",
+                 "email", "phone", "linkedin", "sections")
+
+    def __init__(self, text, section_index=DEFAULT_SECTION_INDEX):
+        self.text = text
+        self.lower = text.lower()
+        self.tokens = WORD_RE.findall(self.lower)
+        self.token_set = set(self.tokens)
+        self.word_count = len(text.split())
+        # (start, end, stripped line) for every non-blank line
+        self.lines = [(m.start(), m.end(), m.group().strip()) for m in LINE_RE.finditer(text) if not m.group().isspace()]
+
+        email = EMAIL_RE.search(text)
+        phone = PHONE_RE.search(text)
+        linkedin = LINKEDIN_RE.search(text)
+        self.email = email.group(0) if email else ""
+        self.phone = phone.group(0) if phone else ""
+        self.linkedin = linkedin.group(0) if linkedin else ""
+
+        self.sections = section_index.scan(text)
+
+    def has_section(self, name):
+        return name in self.sections
+
+    def section_content(self, name):
+        # A section that appears twice ("Technical Skills", "Soft Skills") is merged
+        parts = [self.text[start:end].strip() for start, end in self.sections.get(name, [])]
+        return "\n".join(part for part in parts if part)
+
+# --- Local Heuristic Analyzer (Fallback) ---
+class LocalATSAnalyzer:
+    def __init__(self, section_synonyms=None):
+        self.action_verbs = {
+            "led", "developed", "managed", "created", "designed", "implemented",
+            "optimized", "achieved", "improved", "launched", "orchestrated",
+            "spearheaded", "engineered", "built", "resolved"
+        }
+        self.essential_sections = ESSENTIAL_SECTIONS
+        self.section_index = SectionIndex(section_synonyms) if section_synonyms else DEFAULT_SECTION_INDEX
+
+    def document(self, text):
+        return text if isinstance(text, ResumeDocument) else ResumeDocument(text, self.section_index)
+
+    def analyze_upload(self, text):
+        # One document model shared by scoring and parsing
+        doc = self.document(text)
+        analysis = self.analyze(doc)
+        analysis["parsedData"] = self.parse_resume(doc)
+        return analysis
+
+    def analyze(self, text):
+        doc = self.document(text)
+        score = 50  # Base score
+        suggestions = []
+
+        # 1. Word Count Check
+        word_count = doc.word_count
+        if word_count < 200:
+            score -= 15
+            suggestions.append({
+                "id": 1, "type": "error", "title": "Resume Too Short",
+                "description": f"Your resume is only {word_count} words. Aim for at least 400 words to cover your experience."
+            })
+        elif word_count > 1500:
+            score -= 5
+            suggestions.append({
+                "id": 2, "type": "warning", "title": "Resume Too Long",
+                "description": "Your resume is quite long. Recruiters prefer concise 1-2 page documents."
+            })
+        else:
+            score += 10
+            suggestions.append({
+                "id": 3, "type": "success", "title": "Optimal Length",
+                "description": "Your resume length is within the recommended range."
+            })
+
+        # 2. Contact Info Check
+        if doc.email:
+            score += 10
+        else:
+            score -= 20
+            suggestions.append({
+                "id": 4, "type": "error", "title": "Missing Email",
+                "description": "We couldn't find an email address. This is critical for recruiters."
+            })
+
+        if doc.phone:
+            score += 5
+        else:
+            suggestions.append({
+                "id": 5, "type": "warning", "title": "Missing Phone Number",
+                "description": "Consider adding a phone number for easier contact."
+            })
+
+        # 3. Section Headers Check
+        missing_sections = [sec for sec in self.essential_sections if not doc.has_section(sec)]
+
+        if len(missing_sections) == 0:
+            score += 15
+            suggestions.append({
+                "id": 6, "type": "success", "title": "Comprehensive Structure",
+                "description": "You have all the essential sections (Experience, Education, Skills, etc.)."
+            })
+        else:
+            score -= (len(missing_sections) * 5)
+            suggestions.append({
+                "id": 7, "type": "warning", "title": "Missing Sections",
+                "description": f"Consider adding these sections: {', '.join([s.capitalize() for s in missing_sections])}."
+            })
+
+        # 4. Action Verbs Check
+        found_verbs = doc.token_set & self.action_verbs
+        if len(found_verbs) > 5:
+            score += 10
+            suggestions.append({
+                "id": 8, "type": "success", "title": "Strong Action Verbs",
+                "description": f"Great use of power words like '{', '.join(list(found_verbs)[:3])}'."
+            })
+        else:
+            suggestions.append({
+                "id": 9, "type": "warning", "title": "Weak Action Verbs",
+                "description": "Use more strong action verbs (e.g., Led, Developed, Managed) to describe your achievements."
+            })
+
+        return {
+            "atsScore": min(100, max(0, score)),
+            "suggestions": suggestions
+        }
+
+    def match_job(self, resume_text, job_desc):
+        return self.match_keywords(self.job_keywords(job_desc), self.resume_words(resume_text))
+
+    # match_job in two halves so batch matching can reuse either side
+    def resume_words(self, resume_text):
+        if isinstance(resume_text, ResumeDocument):
+            return resume_text.token_set
+        return set(WORD_RE.findall(resume_text.lower()))
+
+    def job_keywords(self, job_desc):
+        job_words = WORD_RE.findall(job_desc.lower())
+
+        # Filter out common stop words (simplified list)
+        keywords = [w for w in job_words if w not in STOP_WORDS and len(w) > 3]
+
+        keyword_counts = Counter(keywords)
+        return [k for k, v in keyword_counts.most_common(15)]
+
+    def match_keywords(self, top_keywords, resume_words):
+        matched = [k for k in top_keywords if k in resume_words]
+        missing = [k for k in top_keywords if k not in resume_words]
+
+        match_percentage = int((len(matched) / len(top_keywords)) * 100) if top_keywords else 0
+
+        recommendations = []
+        if match_percentage < 50:
+            recommendations.append("Your resume is missing many key terms from the job description.")
+        if missing:
+            recommendations.append(f"Try to weave in keywords like: {', '.join(missing[:3])}.")
+
+        return {
+            "matchScore": match_percentage,
+            "summary": f"Your resume matches {match_percentage}% of the top keywords found in the job description.",
+            "missingKeywords": missing,
+            "recommendations": recommendations
+        }
+
+    def suggest_improvements(self, text):
+        # Simple heuristic fallback for the builder's AI assistant
+        doc = self.document(text)
+        suggestions = self.suggest_length(doc.word_count)
+        if "responsible for" in doc.lower:
+            suggestions.append("Avoid 'Responsible for'. Use strong action verbs like 'Managed', 'Developed', or 'Executed'.")
+        return suggestions
+
+    def suggest_length(self, word_count):
+        if word_count < 100:
+            return ["Your resume seems a bit short. Try adding more details about your experience."]
+        return []
+
+    def suggest_section(self, kind, text):
+        # Per-section heuristics for incremental analysis; entries are named by their first line
+        lower = text.lower()
+        heading = text.strip().split("\n", 1)[0][:60]
+        suggestions = []
+        if "responsible for" in lower:
+            suggestions.append(f"In '{heading}', replace 'Responsible for' with a strong action verb like 'Managed' or 'Developed'.")
+        if kind in ("experience", "projects"):
+            # Dates would otherwise pass for numbers
+            body = [DATE_RE.sub("", line).strip() for line in text.strip().split("\n")[1:]]
+            openers = [WORD_RE.findall(line.lower())[:1] for line in body if line]
+            if openers and not any(word and word[0] in self.action_verbs for word in openers):
+                suggestions.append(f"Start the bullets in '{heading}' with action verbs like 'Led', 'Built' or 'Improved'.")
+            if kind == "experience" and not any(ch.isdigit() for line in body for ch in line):
+                suggestions.append(f"Quantify the impact in '{heading}' with numbers (percentages, revenue, team size).")
+        elif kind == "summary":
+            words = len(text.split())
+            if words < 20:
+                suggestions.append("Expand your summary to 2-3 sentences covering your focus, experience and strengths.")
+            elif words > 120:
+                suggestions.append("Tighten your summary to 2-3 sentences; recruiters skim it first.")
+        elif kind == "skills":
+            if len([s for s in SKILL_SPLIT_RE.split(text) if s.strip()]) < 5:
+                suggestions.append("List more relevant skills, including the tools and technologies you use day to day.")
+        return suggestions
+
+    def is_well_structured(self, parsed):
+        # Enough structure to skip the model: contact details, dated roles, schools and skills
+        experience = parsed.get("experience") or []
+        education = parsed.get("education") or []
+        return bool(
+            parsed.get("email")
+            and parsed.get("skills")
+            and experience and all(e.get("title") and e.get("date") for e in experience)
+            and education and all(e.get("degree") or e.get("school") for e in education)
+        )
+
+    def parse_resume(self, text):
+        doc = self.document(text)
+        # Basic Heuristic Parsing
+        data = {
+            "fullName": "Your Name",
+            "email": doc.email,
+            "phone": doc.phone,
+            "location": "",
+            "linkedin": doc.linkedin,
+            "summary": "",
+            "experience": [],
+            "education": [],
+            "skills": [],
+            "projects": []
+        }
+
+        if doc.lines:
+            data["fullName"] = doc.lines[0][2]  # Assume first line is name
+
+        # Extract Summary
+        data["summary"] = doc.section_content("summary")
+
+        # Extract Skills
+        skills_text = doc.section_content("skills")
+        if skills_text:
+            # Split by common delimiters
+            data["skills"] = [s.strip() for s in SKILL_SPLIT_RE.split(skills_text) if s.strip() and len(s.strip()) > 2]
+
+        # Extract Experience
+        exp_text = doc.section_content("experience")
+        if exp_text:
+            data["experience"] = extract_experience(exp_text)
+            if not data["experience"]:
+                # No date ranges to anchor on, keep the raw text as one entry
+                data["experience"] = [{
+                    "id": 1,
+                    "title": "Experience Details",
+                    "company": "See Description",
+                    "date": "",
+                    "location": "",
+                    "description": exp_text[:500] # Limit length
+                }]
+
+        # Extract Education
+        edu_text = doc.section_content("education")
+        if edu_text:
+            data["education"] = extract_education(edu_text)
+
+        # Extract Projects
+        projects_text = doc.section_content("projects")
+        if projects_text:
+            data["projects"] = extract_projects(projects_text)
+
+        return data
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Per-key sliding-window attempt limits for the auth endpoints. Checked
+# before any password hashing happens, so a login storm is turned away at
+# the cost of a dict lookup instead of a pbkdf2 run.
+
+class TooManyAttempts(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Too many attempts for this {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+class SlidingWindow:
+    """At most `limit` events per `window` seconds per key; least recently seen keys are forgotten past `max_keys`."""
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+
+    def _recent(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def retry_after(self, key, now):
+        events = self._recent(key, now)
+        if events is None or len(events) < self.limit:
+            return 0
+        return max(1, math.ceil(events[0] + self.window - now))
+
+    def add(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque()
+        self._events.move_to_end(key)
+        events.append(now)
+        while len(self._events) > self.max_keys:
+            self._events.popitem(last=False)
+
+    def clear(self, key):
+        self._events.pop(key, None)
+
+    def __len__(self):
+        return len(self._events)
+
+class SharedSlidingWindow:
+    """SlidingWindow kept in shared state, so worker processes count attempts together. Each key holds its last `limit` event times."""
+
+    def __init__(self, state, name, limit, window):
+        self.state = state
+        self.prefix = f"throttle:{name}:"
+        self.limit = limit
+        self.window = window
+
+    def retry_after(self, key, now):
+        events = [t for t in self.state.get(self.prefix + key) or () if t > now - self.window]
+        if len(events) < self.limit:
+            return 0
+        return max(1, math.ceil(events[0] + self.window - now))
+
+    def add(self, key, now):
+        def append(events):
+            recent = [t for t in events or () if t > now - self.window]
+            recent.append(now)
+            return recent[-self.limit:], None
+
+        self.state.update(self.prefix + key, append, ttl=self.window)
+
+    def clear(self, key):
+        self.state.delete(self.prefix + key)
+
+    def __len__(self):
+        return self.state.count(self.prefix)
+
+class LoginThrottle:
+    """
+    Two limits: failed logins per email (guessing one account), and all
+    attempts per client IP (one client hammering many accounts or signups).
+    A successful login clears its email's failures. Times are wall-clock so
+    they mean the same in every worker when the windows are shared; shared
+    windows are blocking store calls, so they run in a worker thread.
+    """
+
+    def __init__(self, email_failures=5, email_window=900, ip_attempts=30, ip_window=60, state=None):
+        if state is not None and state.shared:
+            self.by_email = SharedSlidingWindow(state, "email", email_failures, email_window)
+            self.by_ip = SharedSlidingWindow(state, "ip", ip_attempts, ip_window)
+            self.blocking = True
+        else:
+            self.by_email = SlidingWindow(email_failures, email_window)
+            self.by_ip = SlidingWindow(ip_attempts, ip_window)
+            self.blocking = False
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "throttled_email": 0, "throttled_ip": 0, "failures": 0}
+
+    async def _run(self, fn, *args):
+        if self.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def check(self, email=None, ip=None):
+        """Counts an attempt from `ip`; raises TooManyAttempts if either limit is exhausted."""
+        await self._run(self._check, email, ip)
+
+    async def record_failure(self, email):
+        await self._run(self._record_failure, email)
+
+    async def record_success(self, email):
+        await self._run(self._record_success, email)
+
+    def _check(self, email, ip):
+        now = time.time()
+        with self._lock:
+            if ip is not None:
+                retry_after = self.by_ip.retry_after(ip, now)
+                if retry_after:
+                    self._counters["throttled_ip"] += 1
+                    raise TooManyAttempts("client", retry_after)
+            if email is not None:
+                retry_after = self.by_email.retry_after(email.lower(), now)
+                if retry_after:
+                    self._counters["throttled_email"] += 1
+                    raise TooManyAttempts("account", retry_after)
+            if ip is not None:
+                self.by_ip.add(ip, now)
+            self._counters["allowed"] += 1
+
+    def _record_failure(self, email):
+        with self._lock:
+            self.by_email.add(email.lower(), time.time())
+            self._counters["failures"] += 1
+
+    def _record_success(self, email):
+        with self._lock:
+            self.by_email.clear(email.lower())
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "tracked_emails": len(self.by_email), "tracked_ips": len(self.by_ip)}
+
+def throttle_from_env(state=None):
+    return LoginThrottle(
+        email_failures=int(os.getenv("LOGIN_MAX_FAILURES", "5")),
+        email_window=float(os.getenv("LOGIN_FAILURE_WINDOW", "900")),
+        ip_attempts=int(os.getenv("AUTH_MAX_ATTEMPTS_PER_IP", "30")),
+        ip_window=float(os.getenv("AUTH_IP_WINDOW", "60")),
+        state=state,
+    )
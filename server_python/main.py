@@ -1,26 +1,89 @@
+import time
+# Taken before the other imports so /api/ready can report how long boot took
+BOOT_STARTED = time.perf_counter()
+
 import os
+import asyncio
+import hashlib
 import json
 import re
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query, Request
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import google.generativeai as genai
-from pypdf import PdfReader
-from docx import Document
-import io
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
-from collections import Counter
-from sqlalchemy.orm import Session
-from database import SessionLocal, Resume, User, init_db
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal, AsyncSessionLocal, Resume, ResumePayload, User, init_db, get_async_db, dispose_async_engine
+from analysis_cache import cache_from_env, hash_bytes, hash_file, hash_text
+from extraction import PDF_SLOW_SECONDS, PdfTooLarge, extract_pdf, extract_text_from_docx
+from workers import PoolSaturated, WorkTimeout, pool_from_env, web_concurrency
+from llm_client import FakeModel, GeminiModel, LLMError, client_from_env
+from local_analyzer import ESSENTIAL_SECTIONS, LocalATSAnalyzer, load_section_synonyms
+from search_index import load_or_create, resume_search_text
+from section_analysis import section_analyzer_from_env, split_resume, split_text
+from batch_match import batch_rank_jobs, batch_rank_resume_chunks, ndjson_lines
+import resume_listing
+from id_allocator import allocator_from_env
+from write_behind import queue_from_env
+from login_throttle import TooManyAttempts, throttle_from_env
+import resume_renderer
+import resume_versions
+import job_titles
+import instrumentation
+from instrumentation import stage
+from bulk_upload import BULK_MAX_TOTAL_BYTES, BulkLimitExceeded, iter_events, registry_from_env
+from upload_spool import UPLOAD_MAX_BYTES, UploadSizeLimit, UploadTooLarge, spool_upload
+from readiness import Readiness
+from shared_state import state_from_env
+from job_queue import job_queue_from_env, kind_from_env
 
 load_dotenv()
 
-# Initialize Database
-init_db()
+# --- Startup ---
+# Nothing touches the database at import time. The lifespan handler creates
+# the schema, waiting up to DB_STARTUP_WAIT seconds for the first attempt; if
+# the database is down the worker serves anyway, reports not ready on
+# /api/ready and keeps retrying in the background. The index catch-up and the
+# background job queue both read the database, so they start once it is up.
+DB_STARTUP_WAIT = float(os.getenv("DB_STARTUP_WAIT", "5"))
+readiness = Readiness(BOOT_STARTED)
+
+@asynccontextmanager
+async def lifespan(app):
+    await readiness.bring_up("database", init_db, wait=DB_STARTUP_WAIT, on_ready=on_database_ready)
+    start_profiler()
+    resume_writes.start()
+    print(f"Startup finished in {time.perf_counter() - BOOT_STARTED:.2f}s (ready: {readiness.ready})")
+    try:
+        yield
+    finally:
+        readiness.close()
+        stop_profiler()
+        await job_queue.close()
+        await bulk_jobs.shutdown()
+        await resume_writes.close()
+        shutdown_pools()
+        save_search_indexes()
+        await dispose_async_engine()
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Oversized bodies are refused from Content-Length, or cut off mid-stream,
+# before the multipart parser spools them. Added before CORS so 413s still
+# carry CORS headers.
+app.add_middleware(UploadSizeLimit, limits={
+    "/api/upload-optimize": UPLOAD_MAX_BYTES,
+    "/api/upload-bulk": BULK_MAX_TOTAL_BYTES,
+})
 
 # Configure CORS
 app.add_middleware(
@@ -29,25 +92,101 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# Outermost, so rejected uploads and preflights are timed too
+request_profiler = instrumentation.profiler_from_env()
+app.add_middleware(instrumentation.RequestMetrics, profiler=request_profiler)
+
+# --- Shared State ---
+# Caches, the Gemini rate limit, login throttling and bulk job progress go
+# through this; with several server processes it must be a shared backend
+# (STATE_BACKEND=sqlite or redis) for them to hold across the node.
+shared_state = state_from_env()
+
+# --- Worker Pools ---
+# PDF parsing is CPU-bound pure Python, so it gets processes; python-docx and
+# the Gemini SDK mostly wait on I/O and are fine on threads. Sized to this
+# process's share of the cores when several server processes run.
+cpu_count = max(1, (os.cpu_count() or 2) // web_concurrency())
+pdf_pool = pool_from_env("pdf", kind="process", max_workers=cpu_count, queue_depth=cpu_count * 4, timeout=30)
+docx_pool = pool_from_env("docx", kind="thread", max_workers=cpu_count, queue_depth=cpu_count * 4, timeout=15)
+llm_pool = pool_from_env("llm", kind="thread", max_workers=8, queue_depth=32, timeout=60)
+# Password hashing is CPU-heavy by design; hashlib's pbkdf2 releases the GIL,
+# so threads work, and capping them keeps a login burst from taking every core
+auth_pool = pool_from_env("auth", kind="thread", max_workers=max(1, cpu_count // 2), queue_depth=32, timeout=10)
+# reportlab / python-docx layout is pure Python
+render_pool = pool_from_env("render", kind="process", max_workers=cpu_count, queue_depth=cpu_count * 8, timeout=30)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Server is busy, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(TooManyAttempts)
+async def too_many_attempts_handler(request, exc):
+    return JSONResponse(
+        status_code=429,
+        content={"message": "Too many attempts, please try again later."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(WorkTimeout)
+async def work_timeout_handler(request, exc):
+    return JSONResponse(status_code=504, content={"message": "Processing took too long. Please try a smaller file."})
+
+def start_profiler():
+    if request_profiler is not None:
+        request_profiler.start()
+        print(f"Profiling requests slower than {request_profiler.threshold * 1000:g}ms into {request_profiler.directory}")
+
+def stop_profiler():
+    if request_profiler is not None:
+        request_profiler.stop()
+
+def shutdown_pools():
+    for pool in (pdf_pool, docx_pool, llm_pool, auth_pool, render_pool):
+        pool.shutdown()
+
 # Configure Gemini
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+if os.getenv("LLM_FAKE_MODEL"):
+    print("Warning: LLM_FAKE_MODEL is set. Using canned FakeModel responses.")
+    model = FakeModel(latency=float(os.getenv("LLM_FAKE_LATENCY", "0")))
+elif GOOGLE_API_KEY:
+    model = GeminiModel(GOOGLE_API_KEY, 'gemini-1.5-flash')
 else:
     print("Warning: GOOGLE_API_KEY not found. Using Local Heuristic Mode.")
     model = None
 
+llm = client_from_env(model, pool=llm_pool, state=shared_state)
+
 # --- Auth Configuration ---
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Hashes below PASSWORD_MIN_ROUNDS are upgraded on the next successful login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+login_throttle = throttle_from_env(shared_state)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+@lru_cache(maxsize=1)
+def password_context():
+    # Built on the first signup or login; passlib isn't needed to boot
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+        pbkdf2_sha256__min_rounds=int(os.getenv("PASSWORD_MIN_ROUNDS", PASSWORD_HASH_ROUNDS)),
+    )
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+def client_ip(request):
+    return request.client.host if request.client else None
 
 class UserCreate(BaseModel):
     email: str
@@ -78,269 +217,133 @@ class ResumeSave(BaseModel):
     education: list
     skills: list
     projects: list = []
+    # Set to update an existing resume in place (and add a version) instead of creating one
+    resume_id: Optional[int] = None
     # Optional: store design config too if needed, but for now just content
 
-# --- Helper Functions ---
-def extract_text_from_pdf(file_bytes):
-    try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
-    except Exception as e:
-        print(f"PDF Error: {e}")
-        return ""
-
-def extract_text_from_docx(file_bytes):
-    try:
-        doc = Document(io.BytesIO(file_bytes))
-        text = "\n".join([para.text for para in doc.paragraphs])
-        return text
-    except Exception as e:
-        print(f"DOCX Error: {e}")
-        return ""
-
-# --- Local Heuristic Analyzer (Fallback) ---
-class LocalATSAnalyzer:
-    def __init__(self):
-        self.action_verbs = {
-            "led", "developed", "managed", "created", "designed", "implemented", 
-            "optimized", "achieved", "improved", "launched", "orchestrated", 
-            "spearheaded", "engineered", "built", "resolved"
-        }
-        self.essential_sections = ["experience", "education", "skills", "projects", "summary"]
-
-    def analyze(self, text):
-        text_lower = text.lower()
-        score = 50  # Base score
-        suggestions = []
-        
-        # 1. Word Count Check
-        word_count = len(text.split())
-        if word_count < 200:
-            score -= 15
-            suggestions.append({
-                "id": 1, "type": "error", "title": "Resume Too Short", 
-                "description": f"Your resume is only {word_count} words. Aim for at least 400 words to cover your experience."
-            })
-        elif word_count > 1500:
-            score -= 5
-            suggestions.append({
-                "id": 2, "type": "warning", "title": "Resume Too Long", 
-                "description": "Your resume is quite long. Recruiters prefer concise 1-2 page documents."
-            })
-        else:
-            score += 10
-            suggestions.append({
-                "id": 3, "type": "success", "title": "Optimal Length", 
-                "description": "Your resume length is within the recommended range."
-            })
-
-        # 2. Contact Info Check
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        phone_pattern = r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        
-        has_email = re.search(email_pattern, text)
-        has_phone = re.search(phone_pattern, text)
-        
-        if has_email:
-            score += 10
-        else:
-            score -= 20
-            suggestions.append({
-                "id": 4, "type": "error", "title": "Missing Email", 
-                "description": "We couldn't find an email address. This is critical for recruiters."
-            })
-            
-        if has_phone:
-            score += 5
-        else:
-            suggestions.append({
-                "id": 5, "type": "warning", "title": "Missing Phone Number", 
-                "description": "Consider adding a phone number for easier contact."
-            })
-
-        # 3. Section Headers Check
-        found_sections = [sec for sec in self.essential_sections if sec in text_lower]
-        missing_sections = [sec for sec in self.essential_sections if sec not in found_sections]
-        
-        if len(missing_sections) == 0:
-            score += 15
-            suggestions.append({
-                "id": 6, "type": "success", "title": "Comprehensive Structure", 
-                "description": "You have all the essential sections (Experience, Education, Skills, etc.)."
-            })
-        else:
-            score -= (len(missing_sections) * 5)
-            suggestions.append({
-                "id": 7, "type": "warning", "title": "Missing Sections", 
-                "description": f"Consider adding these sections: {', '.join([s.capitalize() for s in missing_sections])}."
-            })
-
-        # 4. Action Verbs Check
-        words = re.findall(r'\w+', text_lower)
-        found_verbs = set(words) & self.action_verbs
-        if len(found_verbs) > 5:
-            score += 10
-            suggestions.append({
-                "id": 8, "type": "success", "title": "Strong Action Verbs", 
-                "description": f"Great use of power words like '{', '.join(list(found_verbs)[:3])}'."
-            })
-        else:
-            suggestions.append({
-                "id": 9, "type": "warning", "title": "Weak Action Verbs", 
-                "description": "Use more strong action verbs (e.g., Led, Developed, Managed) to describe your achievements."
-            })
-
-        return {
-            "atsScore": min(100, max(0, score)),
-            "suggestions": suggestions
-        }
-
-    def match_job(self, resume_text, job_desc):
-        resume_words = set(re.findall(r'\w+', resume_text.lower()))
-        job_words = re.findall(r'\w+', job_desc.lower())
-        
-        # Filter out common stop words (simplified list)
-        stop_words = {"and", "the", "to", "of", "in", "a", "for", "with", "on", "is", "an", "or", "be", "as"}
-        keywords = [w for w in job_words if w not in stop_words and len(w) > 3]
-        
-        keyword_counts = Counter(keywords)
-        top_keywords = [k for k, v in keyword_counts.most_common(15)]
-        
-        matched = [k for k in top_keywords if k in resume_words]
-        missing = [k for k in top_keywords if k not in resume_words]
-        
-        match_percentage = int((len(matched) / len(top_keywords)) * 100) if top_keywords else 0
-        
-        recommendations = []
-        if match_percentage < 50:
-            recommendations.append("Your resume is missing many key terms from the job description.")
-        if missing:
-            recommendations.append(f"Try to weave in keywords like: {', '.join(missing[:3])}.")
-        
-        return {
-            "matchScore": match_percentage,
-            "summary": f"Your resume matches {match_percentage}% of the top keywords found in the job description.",
-            "missingKeywords": missing,
-            "recommendations": recommendations
-        }
-
-    def parse_resume(self, text):
-        # Basic Heuristic Parsing
-        data = {
-            "fullName": "Your Name",
-            "email": "",
-            "phone": "",
-            "location": "",
-            "linkedin": "",
-            "summary": "",
-            "experience": [],
-            "education": [],
-            "skills": [],
-            "projects": []
-        }
-        
-        lines = [l.strip() for l in text.split('\n') if l.strip()]
-        if lines:
-            data["fullName"] = lines[0]  # Assume first line is name
-
-        # Extract Email
-        email_match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)
-        if email_match:
-            data["email"] = email_match.group(0)
-
-        # Extract Phone
-        phone_match = re.search(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', text)
-        if phone_match:
-            data["phone"] = phone_match.group(0)
-            
-        # Extract LinkedIn
-        linkedin_match = re.search(r'linkedin\.com/in/[a-zA-Z0-9-]+', text)
-        if linkedin_match:
-            data["linkedin"] = linkedin_match.group(0)
-
-        # Helper to find section content
-        lower_text = text.lower()
-        def get_section_content(section_name, next_sections):
-            start_idx = lower_text.find(section_name)
-            if start_idx == -1: return ""
-            
-            content_start = start_idx + len(section_name)
-            content_end = len(text)
-            
-            for next_sec in next_sections:
-                idx = lower_text.find(next_sec, content_start)
-                if idx != -1 and idx < content_end:
-                    content_end = idx
-            
-            return text[content_start:content_end].strip()
-
-        # Extract Summary
-        data["summary"] = get_section_content("summary", ["experience", "education", "skills", "projects"])
-        if not data["summary"]:
-             # Fallback: take text after contact info until next section
-             pass 
-
-        # Extract Skills
-        skills_text = get_section_content("skills", ["experience", "education", "projects", "summary"])
-        if skills_text:
-            # Split by common delimiters
-            data["skills"] = [s.strip() for s in re.split(r'[,•\n]', skills_text) if s.strip() and len(s.strip()) > 2]
-
-        # Extract Experience (Very basic)
-        exp_text = get_section_content("experience", ["education", "skills", "projects", "summary"])
-        if exp_text:
-            # Create a single dummy entry with the raw text if we can't parse structure
-            # In a real local parser, we'd need complex logic to identify dates/companies
-            data["experience"] = [{
-                "id": 1,
-                "title": "Experience Details",
-                "company": "See Description",
-                "date": "",
-                "location": "",
-                "description": exp_text[:500] # Limit length
-            }]
-
-        # Extract Education (Very basic)
-        edu_text = get_section_content("education", ["experience", "skills", "projects", "summary"])
-        if edu_text:
-             data["education"] = [{
-                "id": 1,
-                "degree": "Education Details",
-                "school": "See Details",
-                "date": "",
-                "location": ""
-            }]
+LOCAL_PARSE_FIRST = os.getenv("LOCAL_PARSE_FIRST", "").lower() in ("1", "true", "yes")
+local_analyzer = LocalATSAnalyzer(section_synonyms=load_section_synonyms(os.getenv("SECTION_SYNONYMS_PATH")))
+analysis_cache = cache_from_env(shared_state)
+section_analyzer = section_analyzer_from_env(llm, local_analyzer, shared_state)
+title_normalizer = job_titles.normalizer_from_env(shared_state)
 
-        return data
+# --- Search Indexes ---
+# BM25 over stored resumes for ranking, and over submitted job descriptions
+# for document frequencies that tell boilerplate apart from real requirements.
+# Job descriptions come straight from requests, so only the JOB_INDEX_MAX_DOCS
+# most recently submitted ones are kept.
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR")
+JOB_INDEX_MAX_DOCS = int(os.getenv("JOB_INDEX_MAX_DOCS", "5000"))
+resume_index_path = os.path.join(SEARCH_INDEX_DIR, "resumes.json.gz") if SEARCH_INDEX_DIR else None
+job_index_path = os.path.join(SEARCH_INDEX_DIR, "jobs.json.gz") if SEARCH_INDEX_DIR else None
+resume_index = load_or_create(resume_index_path)
+job_index = load_or_create(job_index_path, key=str, max_docs=JOB_INDEX_MAX_DOCS)
 
-local_analyzer = LocalATSAnalyzer()
+# Each process keeps its own index, and the rows other processes (and their
+# background jobs) write only reach it through the database. Ids come from
+# per-process hi/lo blocks, so they interleave and "everything above the
+# highest indexed id" would miss rows: the sync compares id sets instead,
+# at startup and then every RESUME_INDEX_SYNC_SECONDS.
+RESUME_INDEX_SYNC_SECONDS = float(os.getenv("RESUME_INDEX_SYNC_SECONDS", "60"))
 
-# --- Dependency ---
-def get_db():
+def sync_resume_index(batch_size=500, quiet=False):
     db = SessionLocal()
     try:
-        yield db
+        missing = sorted({row.id for row in db.query(Resume.id)} - resume_index.doc_ids())
+        for start in range(0, len(missing), batch_size):
+            rows = (
+                db.query(Resume.id, ResumePayload.extracted_text, ResumePayload.parsed_data)
+                .outerjoin(ResumePayload, ResumePayload.resume_id == Resume.id)
+                .filter(Resume.id.in_(missing[start:start + batch_size]))
+                .all()
+            )
+            for row in rows:
+                resume_index.add(row.id, resume_search_text(row.extracted_text, row.parsed_data))
+        if not quiet:
+            print(f"Resume search index ready with {len(resume_index)} resumes")
+    except Exception as e:
+        print(f"Resume index sync failed: {e}")
     finally:
         db.close()
 
+def keep_resume_index_synced():
+    sync_resume_index()
+    while RESUME_INDEX_SYNC_SECONDS > 0:
+        time.sleep(RESUME_INDEX_SYNC_SECONDS)
+        sync_resume_index(quiet=True)
+
+def start_index_sync():
+    threading.Thread(target=keep_resume_index_synced, name="resume-index-sync", daemon=True).start()
+
+def save_search_indexes():
+    if SEARCH_INDEX_DIR:
+        os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+        resume_index.save(resume_index_path)
+        job_index.save(job_index_path)
+
+# --- Resume Writes ---
+# Ids are reserved up front so uploads can answer before their row is written;
+# every Resume insert takes its id from resume_ids.
+resume_ids = allocator_from_env("resumes", Resume.id)
+resume_writes = queue_from_env()
+
+def resume_rows(resume_id, filename, parsed_data, ats_score, suggestions, text, user_id=None):
+    return [
+        (Resume.__table__, {
+            "id": resume_id,
+            "filename": filename,
+            "upload_date": datetime.utcnow(),
+            "full_name": parsed_data.get("fullName"),
+            "email": parsed_data.get("email"),
+            "phone": parsed_data.get("phone"),
+            "ats_score": ats_score,
+            "user_id": user_id,
+        }),
+        (ResumePayload.__table__, {
+            "resume_id": resume_id,
+            "parsed_data": parsed_data,
+            "suggestions": suggestions,
+            "extracted_text": text,
+        }),
+    ]
+
+bulk_jobs = registry_from_env(concurrency=cpu_count * 2, state=shared_state)
+
+# --- Background Jobs ---
+# Analyses requested with ?mode=async run from the analysis_jobs table
+# instead of holding the request open; handlers are registered next to their
+# endpoints below.
+job_queue = job_queue_from_env()
+
+def on_database_ready():
+    start_index_sync()
+    job_queue.start()
+
+# --- Dependency ---
+# Handlers talk to the database through the async engine so a slow query
+# waits on the event loop instead of holding one of the threadpool's threads.
+get_db = get_async_db
+
 # --- Endpoints ---
 
 @app.post("/api/auth/signup", response_model=UserResponse)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
+    await login_throttle.check(ip=client_ip(request))
     try:
-        db_user = db.query(User).filter(User.email == user.email).first()
+        db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
         if db_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        hashed_password = get_password_hash(user.password)
+        with stage("password_hash"):
+            hashed_password = await auth_pool.run(get_password_hash, user.password)
         new_user = User(email=user.email, password_hash=hashed_password, full_name=user.full_name)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        with stage("db_commit"):
+            await db.commit()
+        await db.refresh(new_user)
         return new_user
+    except (HTTPException, PoolSaturated, WorkTimeout):
+        raise
     except Exception as e:
         print(f"Signup Error: {e}")
         import traceback
@@ -348,12 +351,33 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Signup failed: {str(e)}")
 
 @app.post("/api/auth/login", response_model=UserResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    await login_throttle.check(email=user.email, ip=client_ip(request))
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
+    valid, new_hash = False, None
+    if db_user:
+        with stage("password_hash"):
+            valid, new_hash = await auth_pool.run(password_context().verify_and_update, user.password, db_user.password_hash)
+    if not valid:
+        await login_throttle.record_failure(user.email)
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    await login_throttle.record_success(user.email)
+    if new_hash:
+        # Stored with an outdated cost; the plaintext is only in hand right now
+        db_user.password_hash = new_hash
+        with stage("db_commit"):
+            await db.commit()
     return db_user
 
+@app.get("/api/health")
+async def health():
+    # Liveness: the worker is serving, whatever the state of its dependencies
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def ready():
+    return JSONResponse(status_code=200 if readiness.ready else 503, content=readiness.report())
+
 @app.get("/api/content")
 async def get_content():
     return {
@@ -394,29 +418,78 @@ async def get_content():
         ]
     }
 
-@app.post("/api/upload-optimize")
-async def upload_optimize(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    try:
-        contents = await file.read()
-        filename = file.filename.lower()
-        text = ""
-
-        if filename.endswith(".pdf"):
-            text = extract_text_from_pdf(contents)
-        elif filename.endswith(".docx"):
-            text = extract_text_from_docx(contents)
-        else:
-            return JSONResponse(status_code=400, content={"message": "Unsupported file type"})
+# --- Upload Pipeline ---
+class UploadRejected(Exception):
+    """The file itself is unusable; carries the status the endpoint should answer with."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+async def extract_upload(filename, source):
+    # `source` is bytes or a spooled file path; workers open paths themselves
+    if filename.lower().endswith(".pdf"):
+        try:
+            extraction = await pdf_pool.run(extract_pdf, source)
+        except PdfTooLarge as e:
+            raise UploadRejected(413, str(e))
+        except (PoolSaturated, WorkTimeout):
+            raise
+        except Exception as e:
+            print(f"PDF Error: {e}")
+            extraction = {"text": "", "seconds": 0.0, "page_timings": []}
+        if extraction["seconds"] > PDF_SLOW_SECONDS:
+            timings = extraction["page_timings"]
+            slowest = max(range(len(timings)), key=timings.__getitem__)
+            print(
+                f"Slow PDF {filename}: {extraction['seconds']:.2f}s over {extraction['pages']}/{extraction['page_count']} pages, "
+                f"slowest page {slowest + 1} ({timings[slowest]:.2f}s)"
+            )
+        return extraction["text"]
+    return await docx_pool.run(extract_text_from_docx, source)
+
+async def process_resume_upload(filename, source, user_id=None, file_digest=None):
+    """Extract, analyze and queue the save of one uploaded resume (bytes or a file path). Shared by the single and bulk endpoints."""
+    if not filename.lower().endswith((".pdf", ".docx")):
+        raise UploadRejected(400, "Unsupported file type")
+
+    # Same upload as before? Skip extraction and analysis entirely.
+    if file_digest is None:
+        file_digest = hash_bytes(source) if isinstance(source, bytes) else await asyncio.to_thread(hash_file, source)
+    cached = await analysis_cache.get_by_bytes(file_digest)
 
+    if cached is None:
+        with stage("extraction"):
+            text = await extract_upload(filename, source)
         if not text.strip():
-             return JSONResponse(status_code=400, content={"message": "Could not extract text from file. Please try another file."})
+            raise UploadRejected(400, "Could not extract text from file. Please try another file.")
 
+        text_digest = hash_text(text)
+        cached = await analysis_cache.get_by_text(text_digest, file_digest)
+
+    if cached is not None:
+        text = cached["text"]
+        parsed_data = cached["parsedData"]
+        ats_score = cached["atsScore"]
+        suggestions = cached["suggestions"]
+    else:
         # Use Gemini if available, else Local
         parsed_data = {}
         ats_score = 0
         suggestions = []
-        
-        if model:
+        started = time.perf_counter()
+
+        # Resumes the local parser can fully structure don't need the model
+        local_data = None
+        use_model = llm.available
+        if use_model and LOCAL_PARSE_FIRST:
+            with stage("local_analysis"):
+                local_data = local_analyzer.analyze_upload(text)
+            use_model = not local_analyzer.is_well_structured(local_data["parsedData"])
+        engine = "gemini" if use_model else "local"
+
+        if use_model:
             prompt = f"""
             You are an expert ATS (Applicant Tracking System) resume analyzer. 
             Analyze the following resume text and provide a JSON response with:
@@ -440,66 +513,176 @@ async def upload_optimize(file: UploadFile = File(...), db: Session = Depends(ge
             Return ONLY valid JSON. Do not include markdown formatting.
             """
             try:
-                ai_response = model.generate_content(prompt)
-                clean_response = ai_response.text.replace("```json", "").replace("```", "").strip()
-                analysis_data = json.loads(clean_response)
+                analysis_data = await llm.generate_json(prompt)
                 parsed_data = analysis_data.get("parsedData", {})
                 ats_score = analysis_data.get("atsScore", 0)
                 suggestions = analysis_data.get("suggestions", [])
-            except Exception as e:
+            except LLMError as e:
                 print(f"Gemini Error, falling back to local: {e}")
-                analysis_data = local_analyzer.analyze(text)
-                parsed_data = local_analyzer.parse_resume(text)
+                # Don't cache the fallback, the next upload should retry Gemini
+                engine = None
+                with stage("local_analysis"):
+                    analysis_data = local_analyzer.analyze_upload(text)
+                parsed_data = analysis_data["parsedData"]
                 ats_score = analysis_data.get("atsScore", 0)
                 suggestions = analysis_data.get("suggestions", [])
         else:
-            analysis_data = local_analyzer.analyze(text)
-            parsed_data = local_analyzer.parse_resume(text)
+            with stage("local_analysis"):
+                analysis_data = local_data or local_analyzer.analyze_upload(text)
+            parsed_data = analysis_data["parsedData"]
             ats_score = analysis_data.get("atsScore", 0)
             suggestions = analysis_data.get("suggestions", [])
 
-        # Save to Database
-        try:
-            db_resume = Resume(
-                filename=file.filename,
-                full_name=parsed_data.get("fullName"),
-                email=parsed_data.get("email"),
-                phone=parsed_data.get("phone"),
-                parsed_data=parsed_data,
-                ats_score=ats_score,
-                suggestions=suggestions,
-                extracted_text=text
+        if engine:
+            await analysis_cache.put(
+                file_digest, text_digest, text,
+                {"atsScore": ats_score, "suggestions": suggestions, "parsedData": parsed_data},
+                engine, time.perf_counter() - started,
             )
-            db.add(db_resume)
-            db.commit()
-            db.refresh(db_resume)
-            print(f"Saved resume to DB with ID: {db_resume.id}")
-        except Exception as db_e:
-            print(f"Database Error: {db_e}")
-            # Continue even if DB save fails, but log it
-
-        return {
-            "title": "Upload & Optimize",
-            "subtitle": "Analysis Complete. Here is how your resume performs.",
-            "atsScore": ats_score,
-            "suggestions": suggestions,
-            "parsedData": parsed_data
-        }
 
+    # Save to Database, behind the response
+    resume_id = None
+    try:
+        resume_id = await resume_ids.next_id()
+        await resume_writes.submit(resume_rows(resume_id, filename, parsed_data, ats_score, suggestions, text, user_id=user_id))
+        resume_index.add(resume_id, text)
+    except Exception as db_e:
+        print(f"Database Error: {db_e}")
+        # Continue even if DB save fails, but log it
+
+    return {
+        "atsScore": ats_score,
+        "suggestions": suggestions,
+        "parsedData": parsed_data,
+        "resumeId": resume_id,
+    }
+
+def upload_response(result):
+    return {
+        "title": "Upload & Optimize",
+        "subtitle": "Analysis Complete. Here is how your resume performs.",
+        **result,
+    }
+
+@app.post("/api/upload-optimize")
+async def upload_optimize(file: UploadFile = File(...), mode: str = Query("sync", pattern="^(sync|async)$")):
+    if mode == "async":
+        return await submit_upload_job(file)
+    try:
+        # Small files stay in memory, larger ones go to a temp file; hashed in the same pass
+        with stage("upload_read"):
+            upload = await asyncio.to_thread(spool_upload, file.file, os.path.splitext(file.filename)[1])
+        with upload:
+            result = await process_resume_upload(file.filename, upload.source, file_digest=upload.digest)
+        return upload_response(result)
+    except UploadRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"message": e.message})
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"message": str(e)})
+    except (PoolSaturated, WorkTimeout):
+        raise
     except Exception as e:
         print(f"Error: {e}")
         return JSONResponse(status_code=500, content={"message": f"Internal Server Error: {str(e)}"})
 
+async def submit_upload_job(file):
+    # Checked here so an obviously bad file fails now rather than as a job
+    if not file.filename.lower().endswith((".pdf", ".docx")):
+        return JSONResponse(status_code=400, content={"message": "Unsupported file type"})
+    try:
+        with stage("upload_read"):
+            upload = await asyncio.to_thread(job_queue.spool, file.file, os.path.splitext(file.filename)[1])
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"message": str(e)})
+    if not upload.on_disk:
+        return JSONResponse(status_code=400, content={"message": "The uploaded file is empty."})
+    try:
+        return await submit_job("upload", {"filename": file.filename, "path": upload.source, "digest": upload.digest})
+    except HTTPException:
+        upload.close()
+        raise
+
+async def run_upload_job(payload):
+    result = await process_resume_upload(payload["filename"], payload["path"], file_digest=payload["digest"])
+    return upload_response(result)
+
+# --- Bulk Upload ---
+EVENT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+@app.post("/api/upload-bulk")
+async def upload_bulk(
+    files: List[UploadFile] = File(...),
+    user_id: Optional[int] = Form(None),
+    stream: str = Query("ndjson", pattern="^(ndjson|sse|none)$"),
+):
+    # Files (and ZIP members) go to disk first; the job keeps running if the
+    # client goes away, and can be polled or re-streamed by its id
+    job = bulk_jobs.create(user_id=user_id)
+    try:
+        with stage("upload_read"):
+            for upload in files:
+                await asyncio.to_thread(bulk_jobs.spool, job, upload.filename or "file", upload.file)
+    except BulkLimitExceeded as e:
+        bulk_jobs.discard(job)
+        raise HTTPException(status_code=413, detail=str(e))
+    if not job.processable:
+        bulk_jobs.discard(job)
+        # The per-file rejections say why, e.g. a ZIP of .doc files
+        return JSONResponse(
+            status_code=400,
+            content={"detail": "No PDF or DOCX files found in the upload", "results": job.results},
+        )
+
+    await bulk_jobs.start(job, process_resume_upload)
+    if stream == "none":
+        return JSONResponse(status_code=202, content=job.summary())
+    return StreamingResponse(iter_events(job, 0, stream), media_type=EVENT_MEDIA_TYPES[stream])
+
+async def get_bulk_job(job_id):
+    job = await bulk_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk job not found or expired")
+    return job
+
+@app.get("/api/upload-bulk/{job_id}")
+async def bulk_job_status(job_id: str, since: int = Query(0, ge=0)):
+    job = await get_bulk_job(job_id)
+    return {**job.summary(), "since": since, "results": await job.results_since(since)}
+
+@app.get("/api/upload-bulk/{job_id}/events")
+async def bulk_job_events(
+    job_id: str,
+    request: Request,
+    since: int = Query(0, ge=0),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+):
+    job = await get_bulk_job(job_id)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        # EventSource reconnect: continue after the last result it saw
+        since = int(last_event_id) + 1
+    return StreamingResponse(iter_events(job, since, format), media_type=EVENT_MEDIA_TYPES[format])
+
 @app.post("/api/job-match")
-async def job_match(job_description: str = Form(...), resume_text: str = Form(None)):
+async def job_match(
+    job_description: str = Form(...),
+    resume_text: str = Form(None),
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+):
     # Note: In a real app, we would handle file upload here too or use session state.
     # For now, we will use the text if provided, or a generic placeholder if not, 
     # BUT since the user might not have uploaded a resume in this session context,
     # we will just analyze the JD keywords as a "Self-Check" if no resume is present.
     
     current_resume = resume_text if resume_text else ""
-    
-    if model:
+    job_index.add(hashlib.sha256(job_description.encode("utf-8")).hexdigest(), job_description)
+
+    if mode == "async":
+        return await submit_job("match", {"jobDescription": job_description, "resumeText": current_resume})
+    return await match_resume(job_description, current_resume)
+
+async def match_resume(job_description, current_resume):
+    if llm.available:
         prompt = f"""
         Compare the following resume against the job description.
         Provide a JSON response with:
@@ -517,53 +700,174 @@ async def job_match(job_description: str = Form(...), resume_text: str = Form(No
         Return ONLY valid JSON.
         """
         try:
-            ai_response = model.generate_content(prompt)
-            clean_response = ai_response.text.replace("```json", "").replace("```", "").strip()
-            match_data = json.loads(clean_response)
-        except Exception:
-            match_data = local_analyzer.match_job(current_resume, job_description)
+            match_data = await llm.generate_json(prompt)
+        except LLMError:
+            with stage("local_analysis"):
+                match_data = local_analyzer.match_job(current_resume, job_description)
     else:
-        match_data = local_analyzer.match_job(current_resume, job_description)
+        with stage("local_analysis"):
+            match_data = local_analyzer.match_job(current_resume, job_description)
     
     return match_data
 
+async def run_match_job(payload):
+    return await match_resume(payload["jobDescription"], payload["resumeText"])
+
+# --- Background Job Endpoints ---
+# Per-endpoint settings (JOB_UPLOAD_CONCURRENCY, JOB_MATCH_PRIORITY, ...):
+# matches are short and someone is waiting on the page, so they go first
+job_queue.register("upload", run_upload_job, **kind_from_env("upload", concurrency=4))
+job_queue.register("match", run_match_job, **kind_from_env("match", concurrency=4, priority=10))
+
+async def submit_job(kind, payload):
+    try:
+        job_id = await job_queue.submit(kind, payload)
+    except Exception as e:
+        print(f"Job Queue Error: {e}")
+        raise HTTPException(status_code=503, detail="Background jobs are unavailable right now; retry, or leave out mode=async.")
+    return JSONResponse(
+        status_code=202,
+        content={"jobId": job_id, "status": "queued", "statusUrl": f"/api/jobs/{job_id}", "eventsUrl": f"/api/jobs/{job_id}/events"},
+        headers={"Location": f"/api/jobs/{job_id}"},
+    )
+
+async def get_job(job_id):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await get_job(job_id)
+    # Tells pollers how soon to come back; finished jobs don't change
+    headers = {} if job["status"] in ("done", "failed") else {"Retry-After": "1"}
+    return JSONResponse(content=job, headers=headers)
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, format: str = Query("sse", pattern="^(ndjson|sse)$")):
+    await get_job(job_id)
+    # X-Accel-Buffering: nginx would otherwise hold events back until its buffer fills
+    return StreamingResponse(
+        job_queue.iter_events(job_id, format),
+        media_type=EVENT_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class JobRankRequest(BaseModel):
+    job_description: str
+    limit: int = 20
+    user_id: Optional[int] = None
+
+@app.post("/api/job-match/rank")
+async def rank_resumes(request: JobRankRequest, db: AsyncSession = Depends(get_db)):
+    started = time.perf_counter()
+    job_index.add(hashlib.sha256(request.job_description.encode("utf-8")).hexdigest(), request.job_description)
+    terms = job_index.top_terms(request.job_description)
+
+    candidates = None
+    if request.user_id is not None:
+        candidates = set((await db.execute(select(Resume.id).where(Resume.user_id == request.user_id))).scalars())
+
+    hits = resume_index.search(terms, limit=max(1, min(request.limit, 200)), candidates=candidates)
+    meta = {}
+    if hits:
+        rows = await db.execute(
+            select(Resume.id, Resume.full_name, Resume.email, Resume.filename).where(Resume.id.in_([h[0] for h in hits]))
+        )
+        meta = {row.id: row for row in rows}
+
+    results = []
+    for resume_id, score, matched in hits:
+        row = meta.get(resume_id)
+        if row is None:
+            continue  # deleted since it was indexed
+        results.append({
+            "resumeId": resume_id,
+            "fullName": row.full_name,
+            "email": row.email,
+            "filename": row.filename,
+            "score": round(score, 4),
+            "matchedTerms": matched,
+        })
+
+    return {
+        "results": results,
+        "queryTerms": terms,
+        "indexedResumes": len(resume_index),
+        "tookMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+class BatchJobMatchRequest(BaseModel):
+    # One job against many resumes...
+    job_description: Optional[str] = None
+    resume_ids: List[int] = []
+    resume_texts: List[str] = []
+    # ...or one resume against many jobs
+    resume_id: Optional[int] = None
+    resume_text: Optional[str] = None
+    job_descriptions: List[str] = []
+    limit: Optional[int] = None
+
+def resume_text_query():
+    return select(Resume.id, ResumePayload.extracted_text, ResumePayload.parsed_data).outerjoin(
+        ResumePayload, ResumePayload.resume_id == Resume.id
+    )
+
+async def iter_resume_text_chunks(db, resume_ids, found, chunk_size=500):
+    # Stream stored resumes in chunks so only one chunk of text is in memory;
+    # the ids that exist are collected in `found`
+    for i in range(0, len(resume_ids), chunk_size):
+        rows = (await db.execute(resume_text_query().where(Resume.id.in_(resume_ids[i:i + chunk_size])))).all()
+        found.update(row.id for row in rows)
+        yield [({"resumeId": row.id}, resume_search_text(row.extracted_text, row.parsed_data)) for row in rows]
+
+async def iter_text_chunks(db, resume_ids, resume_texts, found):
+    async for chunk in iter_resume_text_chunks(db, resume_ids, found):
+        yield chunk
+    yield [({"resumeIndex": i}, text) for i, text in enumerate(resume_texts)]
+
+@app.post("/api/job-match/batch")
+async def job_match_batch(request: BatchJobMatchRequest, db: AsyncSession = Depends(get_db)):
+    # Local keyword scoring only, so the ranking agrees with /api/job-match's fallback
+    errors = []
+    if request.job_description and (request.resume_ids or request.resume_texts):
+        found = set()
+        chunks = iter_text_chunks(db, request.resume_ids, request.resume_texts, found)
+        ranked = await batch_rank_resume_chunks(local_analyzer, request.job_description, chunks, request.limit)
+        # Unknown ids get a line of their own instead of silently shrinking the output
+        errors = [({"resumeId": i}, "not found") for i in dict.fromkeys(request.resume_ids) if i not in found]
+    elif request.job_descriptions and (request.resume_id is not None or request.resume_text):
+        resume_text = request.resume_text or ""
+        if request.resume_id is not None:
+            row = (await db.execute(resume_text_query().where(Resume.id == request.resume_id))).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Resume not found")
+            resume_text = resume_search_text(row.extracted_text, row.parsed_data)
+        ranked = batch_rank_jobs(local_analyzer, resume_text, request.job_descriptions, request.limit)
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Send job_description with resume_ids/resume_texts, or resume_id/resume_text with job_descriptions",
+        )
+    return StreamingResponse(ndjson_lines(ranked, errors), media_type="application/x-ndjson")
+
 class ContentAnalysisRequest(BaseModel):
-    text: str
+    text: str = ""
+    # The builder's resume data; when present it is split into sections directly
+    resume: Optional[dict] = None
 
 @app.post("/api/analyze-content")
 async def analyze_content(request: ContentAnalysisRequest):
-    text = request.text
-    
-    if not text.strip():
-        return {"suggestions": []}
-
-    if model:
-        prompt = f"""
-        You are an expert resume consultant. Analyze the following resume content and provide 3-5 specific, actionable suggestions to improve it.
-        Focus on impact, clarity, and strong action verbs.
-        
-        Resume Content:
-        {text[:5000]}
-        
-        Return a JSON object with a key 'suggestions', which is a list of strings.
-        Example: {{ "suggestions": ["Use 'Orchestrated' instead of 'Led' in the first bullet point.", "Quantify your sales achievement by adding the percentage increase."] }}
-        """
-        try:
-            ai_response = model.generate_content(prompt)
-            clean_response = ai_response.text.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_response)
-            return data
-        except Exception as e:
-            print(f"AI Error: {e}")
-            return {"suggestions": ["Could not generate AI suggestions at this time."]}
+    # Only sections whose text changed since they were last analyzed are sent to the model
+    if request.resume is not None:
+        sections = split_resume(request.resume)
     else:
-        # Simple heuristic fallback
-        suggestions = []
-        if len(text.split()) < 100:
-            suggestions.append("Your resume seems a bit short. Try adding more details about your experience.")
-        if "responsible for" in text.lower():
-            suggestions.append("Avoid 'Responsible for'. Use strong action verbs like 'Managed', 'Developed', or 'Executed'.")
-        return {"suggestions": suggestions}
+        sections = split_text(local_analyzer.document(request.text), ESSENTIAL_SECTIONS)
+
+    if not sections:
+        return {"suggestions": []}
+    return await section_analyzer.analyze(sections)
 
 class JobTitleQuery(BaseModel):
     query: str
@@ -573,8 +877,17 @@ async def classify_job_title(request: JobTitleQuery):
     query = request.query
     if not query:
         return {}
-    
-    if model:
+
+    # The local index answers autocomplete; only titles it can't place go to the model
+    with stage("local_analysis"):
+        result = title_normalizer.classify(query)
+    if not title_normalizer.needs_model(query, result):
+        return result
+    cached = await title_normalizer.cached_model_answer(query)
+    if cached is not None:
+        return cached
+
+    if llm.available:
         prompt = f"""
         You are a professional Job Title Normalization and Prediction Engine for a resume builder.
 
@@ -602,62 +915,264 @@ async def classify_job_title(request: JobTitleQuery):
         Input: "{query}"
         """
         try:
-            ai_response = model.generate_content(prompt)
-            clean_response = ai_response.text.replace("```json", "").replace("```", "").strip()
-            data = json.loads(clean_response)
-            return data
-        except Exception as e:
-            print(f"AI Error: {e}")
-            return {"error": str(e)}
-    else:
-        # Fallback for local testing if no API key
-        return {
-            "matched_titles": [f"{query} Specialist", f"{query} Manager"],
-            "best_job_title": query,
-            "job_category": "General",
-            "confidence_score": 0.5
-        }
+            answer = await llm.generate_json(prompt)
+            if isinstance(answer, dict) and answer.get("best_job_title") and await title_normalizer.learn(query, answer):
+                return answer
+        except LLMError as e:
+            print(f"AI Error, answering from the local index: {e}")
+    return result
+
+@app.get("/api/stats")
+async def get_stats():
+    # Both count entries in the shared state, a blocking query with SQLite or Redis
+    cache_stats, throttle_stats = await asyncio.gather(
+        asyncio.to_thread(analysis_cache.stats), asyncio.to_thread(login_throttle.stats)
+    )
+    return {
+        "analysisCache": cache_stats,
+        "sectionAnalysis": section_analyzer.stats(),
+        "jobTitles": title_normalizer.stats(),
+        "pools": {pool.name: pool.stats() for pool in (pdf_pool, docx_pool, llm_pool, auth_pool, render_pool)},
+        "loginThrottle": throttle_stats,
+        "llm": llm.stats(),
+        "writeBehind": resume_writes.stats(),
+        "renderCache": render_cache.stats(),
+        "bulkJobs": bulk_jobs.stats(),
+        "jobQueue": job_queue.stats(),
+        # Numbers above are per process; this says which one answered
+        "worker": {"pid": os.getpid(), "processes": web_concurrency(), "sharedState": shared_state.backend},
+        "resumeIds": resume_ids.stats(),
+        "profiler": request_profiler.stats() if request_profiler is not None else None,
+    }
+
+POOL_METRICS = (
+    ("in_flight", "worker_pool_in_flight", "gauge", "Jobs running or queued in each worker pool."),
+    ("completed", "worker_pool_completed_total", "counter", "Jobs completed by each worker pool."),
+    ("rejected", "worker_pool_rejected_total", "counter", "Jobs turned away by a saturated pool."),
+    ("timeouts", "worker_pool_timeouts_total", "counter", "Jobs that exceeded the pool timeout."),
+    ("busy_seconds", "worker_pool_busy_seconds_total", "counter", "Time spent running jobs in each pool."),
+)
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format: request and stage histograms, then the hot-path counters from /api/stats
+    lines = instrumentation.REQUEST_SECONDS.render() + instrumentation.STAGE_SECONDS.render()
+    pools = {pool.name: pool.stats() for pool in (pdf_pool, docx_pool, llm_pool, auth_pool, render_pool)}
+    for key, name, kind, help in POOL_METRICS:
+        lines += instrumentation.render_family(name, kind, help, [({"pool": pool}, stats[key]) for pool, stats in pools.items()])
+
+    llm_stats = llm.stats()
+    cache = await asyncio.to_thread(analysis_cache.stats)
+    renders = render_cache.stats()
+    writes = resume_writes.stats()
+    lines += instrumentation.render_family("llm_upstream_calls_total", "counter", "Calls made to the model.", [({}, llm_stats["upstream_calls"])])
+    lines += instrumentation.render_family("llm_failures_total", "counter", "Model calls that failed after retries.", [({}, llm_stats["failures"])])
+    lines += instrumentation.render_family("cache_hits_total", "counter", "Cache hits.", [
+        ({"cache": "analysis"}, cache["hits"]), ({"cache": "render"}, renders["hits"]),
+    ])
+    lines += instrumentation.render_family("cache_misses_total", "counter", "Cache misses.", [
+        ({"cache": "analysis"}, cache["misses"]), ({"cache": "render"}, renders["misses"]),
+    ])
+    lines += instrumentation.render_family("write_behind_pending", "gauge", "Resume rows waiting to be written.", [({}, writes["pending"])])
+    lines += instrumentation.render_family("write_behind_dropped_total", "counter", "Resume rows dropped after retries.", [({}, writes["dropped"])])
+    lines += instrumentation.render_family("bulk_jobs_running", "gauge", "Bulk upload jobs in progress.", [({}, bulk_jobs.stats()["running"])])
+    jobs = job_queue.stats()
+    lines += instrumentation.render_family("background_jobs_running", "gauge", "Background jobs running in this process.", [
+        ({"kind": kind}, settings["running"]) for kind, settings in jobs["kinds"].items()
+    ])
+    lines += instrumentation.render_family("background_jobs_finished_total", "counter", "Background jobs finished by this process.", [
+        ({"status": status}, jobs[status]) for status in ("done", "failed")
+    ])
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
 
 @app.get("/api/resumes")
-async def get_resumes(db: Session = Depends(get_db)):
-    resumes = db.query(Resume).all()
-    return resumes
+async def get_resumes(
+    limit: int = Query(50, ge=1, le=resume_listing.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Newest first, light columns only unless `fields` asks for parsed_data etc.
+    # The page is a plain list (what ResumeList expects); the next page's
+    # cursor comes back in the X-Next-Cursor header.
+    try:
+        columns = resume_listing.parse_fields(fields)
+        query = resume_listing.build_query(columns, user_id=user_id, cursor=cursor)
+    except resume_listing.InvalidListingParams as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        return StreamingResponse(export_resumes_ndjson(query, columns), media_type="application/x-ndjson")
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    page = [resume_listing.serialize_row(row, columns) for row in rows[:limit]]
+    headers = {}
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        headers["X-Next-Cursor"] = resume_listing.encode_cursor(last.upload_date, last.id)
+    return JSONResponse(content=jsonable_encoder(page), headers=headers)
+
+async def export_resumes_ndjson(query, columns, batch_size=500):
+    # Own session: the request's one is closed before a streamed body finishes
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield json.dumps(jsonable_encoder(resume_listing.serialize_row(row, columns))) + "\n"
+
+@app.get("/api/resumes/{resume_id}")
+async def get_resume(resume_id: int, fields: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    try:
+        columns = resume_listing.parse_fields(fields or ",".join(resume_listing.ALL_FIELDS))
+    except resume_listing.InvalidListingParams as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    row = (await db.execute(resume_listing.select_fields(columns).where(Resume.id == resume_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return resume_listing.serialize_row(row, columns)
+
+render_cache = resume_renderer.render_cache_from_env()
+
+@app.get("/api/resumes/{resume_id}/export")
+async def export_resume(
+    resume_id: int,
+    request: Request,
+    format: str = Query("pdf", pattern="^(pdf|docx)$"),
+    template: str = "modern",
+    color: str = resume_renderer.DEFAULT_COLOR,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        resume_renderer.compile_template(template, color)
+    except resume_renderer.UnknownTemplate as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    parsed_data = (await db.execute(
+        select(ResumePayload.parsed_data).where(ResumePayload.resume_id == resume_id)
+    )).scalar()
+    if not parsed_data:
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    # Same content + template renders the same file, so the key doubles as an ETag
+    key = resume_renderer.content_key(parsed_data, template, color, format)
+    etag = f'"{key[:32]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    output = render_cache.get(key)
+    if output is None:
+        with stage("render"):
+            output = await render_pool.run(resume_renderer.render, parsed_data, format, template, color)
+        render_cache.put(key, output)
+
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "", "_".join(str(parsed_data.get("fullName") or "").split()))
+    name = f"{safe_name or 'My'}_Resume.{format}"
+    return StreamingResponse(
+        resume_renderer.iter_chunks(output),
+        media_type=resume_renderer.FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}"',
+            "Content-Length": str(len(output)),
+            "ETag": etag,
+        },
+    )
+
+@app.get("/api/resumes/{resume_id}/versions")
+async def get_resume_versions(resume_id: int, db: AsyncSession = Depends(get_db)):
+    versions = await resume_versions.list_versions(db, resume_id)
+    if not versions and await db.get(Resume, resume_id) is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return {"resumeId": resume_id, "versions": versions}
+
+@app.get("/api/resumes/{resume_id}/versions/{version}")
+async def get_resume_version(resume_id: int, version: int, db: AsyncSession = Depends(get_db)):
+    try:
+        parsed_data, created_at = await resume_versions.load_version(db, resume_id, version)
+    except resume_versions.VersionNotFound:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return {
+        "resumeId": resume_id,
+        "version": version,
+        "createdAt": created_at.isoformat() if created_at else None,
+        "parsed_data": parsed_data,
+    }
 
 @app.post("/api/resumes/save")
-async def save_resume(resume_data: ResumeSave, db: Session = Depends(get_db)):
+async def save_resume(resume_data: ResumeSave, db: AsyncSession = Depends(get_db)):
     print(f"Received save request for user_id: {resume_data.user_id}")
-    print(f"Data: {resume_data.dict()}")
+    content = resume_data.dict(exclude={"resume_id"})
     try:
-        # Check if user exists
-        user = db.query(User).filter(User.id == resume_data.user_id).first()
-        if not user:
-            print(f"User {resume_data.user_id} not found in DB")
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Create new resume entry
-        new_resume = Resume(
-            user_id=resume_data.user_id,
-            full_name=resume_data.fullName,
-            email=resume_data.email,
-            phone=resume_data.phone,
-            parsed_data=resume_data.dict(), # Store the whole blob
-            ats_score=0, # Recalculate if needed, or pass from frontend
-            suggestions=[],
-            extracted_text="" # No raw text for manually created/edited resumes
-        )
-        
-        db.add(new_resume)
-        db.commit()
-        db.refresh(new_resume)
-        print(f"Successfully saved resume ID: {new_resume.id}")
-        
-        return {"message": "Resume saved successfully", "id": new_resume.id}
+        if resume_data.resume_id is None:
+            # Reserve the id before this session holds a connection; a block
+            # reservation needs one of its own
+            resume_id = await resume_ids.next_id()
+
+            # Check if user exists
+            user = await db.get(User, resume_data.user_id)
+            if not user:
+                print(f"User {resume_data.user_id} not found in DB")
+                raise HTTPException(status_code=404, detail="User not found")
+
+            # Create new resume entry
+            resume = Resume(
+                id=resume_id,
+                user_id=resume_data.user_id,
+                full_name=resume_data.fullName,
+                email=resume_data.email,
+                phone=resume_data.phone,
+                parsed_data=content, # Store the whole blob
+                ats_score=0, # Recalculate if needed, or pass from frontend
+                suggestions=[],
+                extracted_text="" # No raw text for manually created/edited resumes
+            )
+            db.add(resume)
+            previous = None
+        else:
+            # Update in place; history goes to resume_versions
+            resume_id = resume_data.resume_id
+            resume = (await db.execute(
+                select(Resume).options(selectinload(Resume.payload))
+                .where(Resume.id == resume_id, Resume.user_id == resume_data.user_id)
+            )).scalar()
+            if resume is None:
+                raise HTTPException(status_code=404, detail="Resume not found")
+            previous = resume.parsed_data
+            resume.full_name = resume_data.fullName
+            resume.email = resume_data.email
+            resume.phone = resume_data.phone
+            resume.parsed_data = content
+
+        version = await resume_versions.record_version(db, resume_id, previous, content)
+        with stage("db_commit"):
+            await db.commit()
+        print(f"Successfully saved resume ID: {resume_id} (version {version})")
+        resume_index.add(resume_id, resume_search_text("", content))
+
+        return {"message": "Resume saved successfully", "id": resume_id, "version": version}
+    except HTTPException:
+        raise
+    except IntegrityError:
+        # Another save of the same resume claimed this version number first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Resume was modified by another save; reload and try again")
     except Exception as e:
         print(f"Save Error: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+readiness.imported_seconds = time.perf_counter() - BOOT_STARTED
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # WEB_CONCURRENCY=4 (or auto, one per core) runs that many server
+    # processes under uvicorn's supervisor. They share state through SQLite
+    # on this node unless STATE_BACKEND says otherwise.
+    workers = web_concurrency()
+    if workers > 1:
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        os.environ.setdefault("STATE_BACKEND", "sqlite")
+        print(f"Starting {workers} workers with {os.environ['STATE_BACKEND']} shared state")
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,36 @@
+import sys
+from database import engine, init_db, Resume
+from sqlalchemy import inspect, text
+
+# One-off migration for databases created before resume_payloads existed:
+# copies the heavy columns into the side table and adds the listing indexes.
+# Pass --drop-old-columns to remove the copies from `resumes` afterwards.
+
+HEAVY_COLUMNS = ["parsed_data", "suggestions", "extracted_text"]
+
+def migrate_payloads(drop_old_columns=False):
+    init_db()
+    existing = {col["name"] for col in inspect(engine).get_columns("resumes")}
+
+    with engine.begin() as conn:
+        for index in Resume.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+        if not set(HEAVY_COLUMNS) <= existing:
+            print("resumes has no payload columns, nothing to copy.")
+            return
+
+        result = conn.execute(text(
+            "INSERT INTO resume_payloads (resume_id, parsed_data, suggestions, extracted_text) "
+            "SELECT r.id, r.parsed_data, r.suggestions, r.extracted_text FROM resumes r "
+            "WHERE NOT EXISTS (SELECT 1 FROM resume_payloads p WHERE p.resume_id = r.id)"
+        ))
+        print(f"Copied {result.rowcount} payload rows.")
+
+        if drop_old_columns:
+            for column in HEAVY_COLUMNS:
+                conn.execute(text(f"ALTER TABLE resumes DROP COLUMN {column}"))
+            print("Dropped old payload columns from resumes.")
+
+if __name__ == "__main__":
+    migrate_payloads(drop_old_columns="--drop-old-columns" in sys.argv)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+# Startup state for the health endpoints. A worker serves /api/health as soon
+# as it accepts connections; /api/ready answers 503 until every component it
+# was told to expect has come up (and again once shutdown begins), so a load
+# balancer only routes to workers whose database is reachable.
+
+class Readiness:
+    def __init__(self, boot_started):
+        self.boot_started = boot_started
+        self.imported_seconds = None
+        self.ready_seconds = None
+        self.draining = False
+        self._components = {}
+        self._tasks = []
+
+    def expect(self, *names):
+        for name in names:
+            self._components.setdefault(name, {"ready": False, "attempts": 0, "error": None})
+
+    def mark_ready(self, name):
+        component = self._components[name]
+        component.update(ready=True, error=None)
+        if self.ready and self.ready_seconds is None:
+            self.ready_seconds = time.perf_counter() - self.boot_started
+
+    def mark_failed(self, name, error):
+        self._components[name].update(ready=False, error=error)
+
+    @property
+    def ready(self):
+        return not self.draining and all(c["ready"] for c in self._components.values())
+
+    def report(self):
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "components": {name: dict(c) for name, c in self._components.items()},
+            "bootSeconds": {
+                "import": round(self.imported_seconds, 3) if self.imported_seconds is not None else None,
+                "ready": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            },
+        }
+
+    async def bring_up(self, name, init, wait, on_ready=None, retry_delay=0.5, max_delay=30.0):
+        """
+        Runs the blocking `init` in a thread until it succeeds, then calls
+        `on_ready`. Returns once the first attempt has finished, or after
+        `wait` seconds; after a failure the retries carry on in the
+        background with exponential backoff.
+        """
+        self.expect(name)
+        first_attempt = asyncio.Event()
+
+        async def run():
+            delay = retry_delay
+            while True:
+                self._components[name]["attempts"] += 1
+                try:
+                    await asyncio.to_thread(init)
+                except Exception as e:
+                    # First line only; driver errors trail a docs link
+                    error = (str(e).splitlines() or [type(e).__name__])[0][:300]
+                    self.mark_failed(name, error)
+                    first_attempt.set()
+                    print(f"Startup: {name} not ready ({error}); retrying in {delay:g}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, max_delay)
+                else:
+                    self.mark_ready(name)
+                    first_attempt.set()
+                    if on_ready is not None:
+                        on_ready()
+                    return
+
+        self._tasks.append(asyncio.create_task(run()))
+        try:
+            await asyncio.wait_for(first_attempt.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self):
+        """Shutdown has begun: report not ready and stop retrying."""
+        self.draining = True
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,57 @@
+# The builder's resume data (the ResumeSave / parsedData shape) as ordered
+# sections and entries. Shared by the PDF/DOCX renderer and the incremental
+# section analysis, so neither has to import the other.
+
+def field_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(field_text(v) for v in value if field_text(v))
+    if isinstance(value, dict):
+        return ", ".join(field_text(v) for v in value.values() if field_text(v))
+    return str(value).strip()
+
+def entries(data, key):
+    return [item for item in (data.get(key) or []) if isinstance(item, dict)]
+
+def skill_list(data):
+    skills = data.get("skills") or []
+    if isinstance(skills, dict):
+        # Some parsed resumes group skills: {"languages": [...], "tools": [...]}
+        skills = [s for group in skills.values() for s in (group if isinstance(group, list) else [group])]
+    if isinstance(skills, str):
+        skills = [s.strip() for s in skills.split(",")]
+    return [field_text(s) for s in skills if field_text(s)]
+
+def sections(data):
+    """The resume as (title, [entries]) in preview order; an entry is (heading, date, subtitle, body)."""
+    out = []
+    if field_text(data.get("summary")):
+        out.append(("Professional Summary", [("", "", "", field_text(data.get("summary")))]))
+    experience = [
+        (field_text(e.get("title")), field_text(e.get("date")), " · ".join(filter(None, [field_text(e.get("company")), field_text(e.get("location"))])),
+         field_text(e.get("description")))
+        for e in entries(data, "experience")
+    ]
+    if experience:
+        out.append(("Work Experience", experience))
+    education = [
+        (field_text(e.get("degree")), field_text(e.get("date")), " · ".join(filter(None, [field_text(e.get("school")), field_text(e.get("location"))])), "")
+        for e in entries(data, "education")
+    ]
+    if education:
+        out.append(("Education", education))
+    projects = [
+        (field_text(p.get("title") or p.get("name")), "", field_text(p.get("link")), field_text(p.get("description")))
+        for p in entries(data, "projects")
+    ]
+    if projects:
+        out.append(("Projects", projects))
+    skills = skill_list(data)
+    if skills:
+        out.append(("Skills", [("", "", "", "  •  ".join(skills))]))
+    return out
+
+def contact_lines(data):
+    first = " | ".join(filter(None, [field_text(data.get("email")), field_text(data.get("phone")), field_text(data.get("location"))]))
+    return [line for line in (first, field_text(data.get("linkedin"))) if line]
@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from database import Resume, ResumePayload
+
+# Column projection and keyset pagination for GET /api/resumes.
+
+LIGHT_FIELDS = ["id", "filename", "upload_date", "full_name", "email", "phone", "ats_score", "user_id"]
+HEAVY_FIELDS = ["parsed_data", "suggestions", "extracted_text"]
+ALL_FIELDS = LIGHT_FIELDS + HEAVY_FIELDS
+
+MAX_PAGE_SIZE = 500
+
+class InvalidListingParams(ValueError):
+    pass
+
+def parse_fields(fields):
+    """Comma-separated field list; the light metadata columns by default."""
+    if not fields:
+        return list(LIGHT_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    if requested == ["*"] or requested == ["all"]:
+        return list(ALL_FIELDS)
+    unknown = [f for f in requested if f not in ALL_FIELDS]
+    if unknown:
+        raise InvalidListingParams(f"Unknown fields: {', '.join(unknown)}")
+    # id and upload_date are always needed to build the next cursor
+    return ["id", "upload_date"] + [f for f in requested if f not in ("id", "upload_date")]
+
+def encode_cursor(upload_date, resume_id):
+    raw = json.dumps([upload_date.isoformat() if upload_date else None, resume_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor):
+    try:
+        upload_date, resume_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(upload_date) if upload_date else None), int(resume_id)
+    except Exception:
+        raise InvalidListingParams("Invalid cursor")
+
+def select_fields(fields):
+    # Heavy fields live in resume_payloads; only join it when one is asked for
+    columns = [getattr(ResumePayload if f in HEAVY_FIELDS else Resume, f) for f in fields]
+    query = select(*columns)
+    if any(f in HEAVY_FIELDS for f in fields):
+        query = query.select_from(Resume).outerjoin(ResumePayload, ResumePayload.resume_id == Resume.id)
+    return query
+
+def build_query(fields, user_id=None, cursor=None):
+    # Plain select() statements so both sync and async sessions can run them
+    query = select_fields(fields)
+    if user_id is not None:
+        query = query.where(Resume.user_id == user_id)
+    if cursor:
+        upload_date, resume_id = decode_cursor(cursor)
+        # Newest first: strictly after the last row of the previous page
+        query = query.where(or_(
+            Resume.upload_date < upload_date,
+            and_(Resume.upload_date == upload_date, Resume.id < resume_id),
+        ))
+    return query.order_by(Resume.upload_date.desc(), Resume.id.desc())
+
+def serialize_row(row, fields):
+    item = dict(zip(fields, row))
+    if item.get("upload_date") is not None:
+        item["upload_date"] = item["upload_date"].isoformat()
+    return item
@@ -0,0 +1,302 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from resume_content import contact_lines, field_text, sections
+
+# Server-side export of a saved resume (the ResumeSave / parsedData shape)
+# to PDF (reportlab) or DOCX (python-docx). Runs inside worker processes, so
+# nothing here touches the app or the database. Template layouts mirror the
+# builder's preview styles: modern, professional and creative. reportlab and
+# python-docx are imported inside the render functions: the app imports this
+# module for content keys, and shouldn't pay for them at boot.
+
+FORMATS = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+DEFAULT_COLOR = "#4f46e5"
+
+class UnknownTemplate(ValueError):
+    pass
+
+# --- Templates ---
+TEMPLATES = {
+    "modern": {
+        "font": "Helvetica", "bold": "Helvetica-Bold", "docx_font": "Arial",
+        "name_size": 22, "title_size": 11, "body_size": 9.5,
+        "align": "left", "header_rule": True, "section_rule": True, "band": False, "upper_titles": True,
+    },
+    "professional": {
+        "font": "Times-Roman", "bold": "Times-Bold", "docx_font": "Times New Roman",
+        "name_size": 20, "title_size": 12, "body_size": 10.5,
+        "align": "center", "header_rule": False, "section_rule": True, "band": False, "upper_titles": False,
+    },
+    "creative": {
+        "font": "Helvetica", "bold": "Helvetica-Bold", "docx_font": "Verdana",
+        "name_size": 24, "title_size": 12, "body_size": 9.5,
+        "align": "left", "header_rule": False, "section_rule": False, "band": True, "upper_titles": False,
+    },
+}
+
+def parse_color(value):
+    value = (value or DEFAULT_COLOR).lstrip("#")
+    if len(value) == 3:
+        value = "".join(c * 2 for c in value)
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise UnknownTemplate(f"Invalid color: #{value}")
+
+@lru_cache(maxsize=64)
+def compile_template(name, color=DEFAULT_COLOR):
+    """Template spec with the accent resolved; cached per worker across requests."""
+    if name not in TEMPLATES:
+        raise UnknownTemplate(f"Unknown template: {name}. Choose from {', '.join(TEMPLATES)}")
+    return {**TEMPLATES[name], "name": name, "rgb": parse_color(color)}
+
+# --- Content ---
+def content_key(data, template, color, fmt):
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{fmt}|{template}|{color}|{canonical}".encode("utf-8")).hexdigest()
+
+# --- PDF ---
+@lru_cache(maxsize=16)
+def char_widths(font_name):
+    """Per-character advance widths at 1pt for the fonts' WinAnsi range, so wrapping never asks reportlab twice."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    chars = bytes(range(32, 256)).decode("cp1252", "ignore")
+    return {c: stringWidth(c, font_name, 1) for c in chars}
+
+def text_width(text, font_name, size):
+    widths = char_widths(font_name)
+    fallback = widths["M"]
+    return sum(widths.get(c, fallback) for c in text) * size
+
+def wrap(text, font_name, size, max_width):
+    lines = []
+    space = text_width(" ", font_name, size)
+    for paragraph in text.split("\n"):
+        words = paragraph.split()
+        line, width = [], 0.0
+        for word in words:
+            w = text_width(word, font_name, size)
+            if line and width + space + w > max_width:
+                lines.append(" ".join(line))
+                line, width = [], 0.0
+            width += (space if line else 0) + w
+            line.append(word)
+        lines.append(" ".join(line))
+    return lines
+
+def _winansi(text):
+    # The standard PDF fonts only cover WinAnsi (cp1252)
+    return text.encode("cp1252", "replace").decode("cp1252")
+
+def render_pdf(data, template="modern", color=DEFAULT_COLOR):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    spec = compile_template(template, color)
+    accent = tuple(c / 255 for c in spec["rgb"])
+    page_width, page_height = A4
+    margin = 48
+    usable = page_width - 2 * margin
+    body, font, bold = spec["body_size"], spec["font"], spec["bold"]
+    leading = body * 1.45
+
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=A4, pageCompression=1)
+    pdf.setTitle(_winansi(field_text(data.get("fullName")) or "Resume"))
+    y = page_height - margin
+
+    def ensure(height):
+        nonlocal y
+        if y - height < margin:
+            pdf.showPage()
+            y = page_height - margin
+
+    def line(text, font_name, size, x=margin, align="left", fill=(0.12, 0.16, 0.23)):
+        pdf.setFont(font_name, size)
+        pdf.setFillColorRGB(*fill)
+        text = _winansi(text)
+        if align == "center":
+            pdf.drawCentredString(page_width / 2, y, text)
+        elif align == "right":
+            pdf.drawRightString(page_width - margin, y, text)
+        else:
+            pdf.drawString(x, y, text)
+
+    # Header
+    name = field_text(data.get("fullName"))
+    if spec["band"]:
+        band = spec["name_size"] * 2.6 + 14 * len(contact_lines(data))
+        pdf.setFillColorRGB(*accent)
+        pdf.rect(0, page_height - band, page_width, band, stroke=0, fill=1)
+        y = page_height - margin + 8 - spec["name_size"] * 0.4
+        line(name, bold, spec["name_size"], fill=(1, 1, 1))
+        for contact in contact_lines(data):
+            y -= 15
+            line(contact, font, body, fill=(1, 1, 1))
+        y = page_height - band - 22
+    else:
+        y -= spec["name_size"] * 0.6
+        line(name, bold, spec["name_size"], align=spec["align"], fill=accent)
+        y -= 6
+        for contact in contact_lines(data):
+            y -= 14
+            line(contact, font, body, align=spec["align"], fill=(0.28, 0.33, 0.41))
+        y -= 10
+        if spec["header_rule"]:
+            pdf.setStrokeColorRGB(*accent)
+            pdf.setLineWidth(1.5)
+            pdf.line(margin, y, page_width - margin, y)
+        y -= 20
+
+    for title, entries in sections(data):
+        ensure(spec["title_size"] + leading * 3)
+        line(title.upper() if spec["upper_titles"] else title, bold, spec["title_size"], fill=accent)
+        y -= 5
+        if spec["section_rule"]:
+            pdf.setStrokeColorRGB(*accent)
+            pdf.setLineWidth(0.6)
+            pdf.line(margin, y, page_width - margin, y)
+        y -= leading + 2
+        for heading, date, subtitle, text in entries:
+            if heading or date:
+                ensure(leading * 2)
+                line(heading, bold, body + 0.5)
+                if date:
+                    line(date, font, body, align="right", fill=(0.39, 0.45, 0.55))
+                y -= leading
+            if subtitle:
+                ensure(leading)
+                line(subtitle, bold if not heading else font, body, fill=(0.28, 0.33, 0.41))
+                y -= leading
+            for text_line in wrap(text, font, body, usable) if text else ():
+                ensure(leading)
+                line(text_line, font, body)
+                y -= leading
+            y -= 4
+        y -= 8
+
+    pdf.save()
+    return buf.getvalue()
+
+# --- DOCX ---
+@lru_cache(maxsize=16)
+def docx_base(template, color=DEFAULT_COLOR):
+    """An empty document with the template's styles applied, kept as bytes so each render skips style setup."""
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+
+    spec = compile_template(template, color)
+    doc = Document()
+    normal = doc.styles["Normal"]
+    normal.font.name = spec["docx_font"]
+    normal.font.size = Pt(spec["body_size"] + 0.5)
+    normal.paragraph_format.space_after = Pt(2)
+    for style_name, size in (("Title", spec["name_size"]), ("Heading 1", spec["title_size"] + 1), ("Heading 2", spec["body_size"] + 1)):
+        style = doc.styles[style_name]
+        style.font.name = spec["docx_font"]
+        style.font.size = Pt(size)
+        style.font.color.rgb = RGBColor(*spec["rgb"]) if style_name != "Heading 2" else RGBColor(0x1E, 0x29, 0x3B)
+    for section in doc.sections:
+        section.left_margin = section.right_margin = Pt(48)
+        section.top_margin = section.bottom_margin = Pt(48)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def render_docx(data, template="modern", color=DEFAULT_COLOR):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_TAB_ALIGNMENT
+
+    spec = compile_template(template, color)
+    doc = Document(io.BytesIO(docx_base(template, color)))
+    align = WD_ALIGN_PARAGRAPH.CENTER if spec["align"] == "center" else WD_ALIGN_PARAGRAPH.LEFT
+    section = doc.sections[0]
+    right_edge = section.page_width - section.left_margin - section.right_margin
+
+    doc.add_paragraph(field_text(data.get("fullName")), style="Title").alignment = align
+    for contact in contact_lines(data):
+        doc.add_paragraph(contact).alignment = align
+
+    for title, entries in sections(data):
+        doc.add_heading(title.upper() if spec["upper_titles"] else title, level=1)
+        for heading, date, subtitle, text in entries:
+            if heading or date:
+                p = doc.add_paragraph(style="Heading 2")
+                p.paragraph_format.tab_stops.add_tab_stop(right_edge, WD_TAB_ALIGNMENT.RIGHT)
+                p.add_run(heading)
+                if date:
+                    p.add_run("\t" + date).bold = False
+            if subtitle:
+                run = doc.add_paragraph().add_run(subtitle)
+                run.italic = bool(heading)
+            for paragraph in text.split("\n") if text else ():
+                if paragraph.strip():
+                    doc.add_paragraph(paragraph.strip())
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def render(data, fmt="pdf", template="modern", color=DEFAULT_COLOR):
+    if fmt == "pdf":
+        return render_pdf(data, template, color)
+    if fmt == "docx":
+        return render_docx(data, template, color)
+    raise UnknownTemplate(f"Unknown format: {fmt}")
+
+# --- Output Cache ---
+class RenderCache:
+    """Rendered files by content key, LRU-evicted against a byte budget."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+def render_cache_from_env():
+    return RenderCache(max_bytes=int(float(os.getenv("RENDER_CACHE_MB", "64")) * 1024 * 1024))
+
+def iter_chunks(data, chunk_size=64 * 1024):
+    view = memoryview(data)
+    for i in range(0, len(view), chunk_size):
+        yield bytes(view[i:i + chunk_size])
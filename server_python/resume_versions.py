@@ -0,0 +1,146 @@
+import json
+import os
+import zlib
+
+from sqlalchemy import case, func, select
+
+from database import ResumeVersion
+
+# Save history for resumes edited in the builder. The current document lives
+# in resume_payloads and is updated in place; every save that changes it
+# appends a version row holding either a full snapshot or a diff against the
+# previous version, zlib-compressed JSON either way. Reading version N loads
+# the nearest snapshot at or below N and replays the diffs after it.
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+SNAPSHOT_EVERY = int(os.getenv("RESUME_SNAPSHOT_EVERY", "20"))
+
+class VersionNotFound(LookupError):
+    pass
+
+# --- Diffs ---
+# A diff is a list of ops on paths (lists of dict keys / list indexes):
+#   ["s", path, value]   set (or append, for a list index == len)
+#   ["d", path]          delete a dict key
+#   ["t", path, length]  truncate a list
+def json_diff(old, new, path=()):
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [["d", [*path, key]] for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append(["s", [*path, key], value])
+            else:
+                ops.extend(json_diff(old[key], value, (*path, key)))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for i in range(min(len(old), len(new))):
+            ops.extend(json_diff(old[i], new[i], (*path, i)))
+        if len(new) < len(old):
+            ops.append(["t", list(path), len(new)])
+        ops.extend(["s", [*path, i], new[i]] for i in range(len(old), len(new)))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [["s", list(path), new]]
+
+def apply_diff(doc, ops):
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            doc = op[2]
+            continue
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        last = path[-1]
+        if kind == "s":
+            if isinstance(parent, list) and last == len(parent):
+                parent.append(op[2])
+            else:
+                parent[last] = op[2]
+        elif kind == "d":
+            del parent[last]
+        elif kind == "t":
+            del parent[last][op[2]:]
+    return doc
+
+def pack(value):
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+
+def unpack(data):
+    return json.loads(zlib.decompress(data))
+
+# --- Storage ---
+async def latest_versions(db, resume_id):
+    """(latest version, latest snapshot version), (0, 0) with no history."""
+    row = (await db.execute(
+        select(
+            func.max(ResumeVersion.version),
+            func.max(case((ResumeVersion.kind == SNAPSHOT, ResumeVersion.version))),
+        ).where(ResumeVersion.resume_id == resume_id)
+    )).one()
+    return row[0] or 0, row[1] or 0
+
+async def record_version(db, resume_id, previous, current, snapshot_every=SNAPSHOT_EVERY):
+    """
+    Adds the version row(s) for a save to the session; the caller commits.
+    Returns the new version, or the latest one if nothing changed. A resume
+    saved before versioning gets its prior content recorded as version 1.
+    """
+    latest, snapshot = await latest_versions(db, resume_id)
+    if latest == 0 and previous is not None:
+        db.add(ResumeVersion(resume_id=resume_id, version=1, kind=SNAPSHOT, data=pack(previous)))
+        latest = snapshot = 1
+
+    if latest == 0:
+        db.add(ResumeVersion(resume_id=resume_id, version=1, kind=SNAPSHOT, data=pack(current)))
+        return 1
+
+    ops = json_diff(previous, current)
+    if not ops:
+        return latest
+    version = latest + 1
+    delta = pack(ops)
+    full = pack(current)
+    # Snapshots bound the replay length, and win outright when the diff isn't smaller
+    if version - snapshot >= snapshot_every or len(delta) >= len(full):
+        db.add(ResumeVersion(resume_id=resume_id, version=version, kind=SNAPSHOT, data=full))
+    else:
+        db.add(ResumeVersion(resume_id=resume_id, version=version, kind=DELTA, data=delta))
+    return version
+
+async def load_version(db, resume_id, version):
+    base = (await db.execute(
+        select(func.max(ResumeVersion.version)).where(
+            ResumeVersion.resume_id == resume_id,
+            ResumeVersion.kind == SNAPSHOT,
+            ResumeVersion.version <= version,
+        )
+    )).scalar()
+    if base is None:
+        raise VersionNotFound(version)
+    rows = (await db.execute(
+        select(ResumeVersion.version, ResumeVersion.kind, ResumeVersion.data, ResumeVersion.created_at)
+        .where(ResumeVersion.resume_id == resume_id, ResumeVersion.version.between(base, version))
+        .order_by(ResumeVersion.version)
+    )).all()
+    if rows[-1].version != version:
+        raise VersionNotFound(version)
+
+    doc = unpack(rows[0].data)
+    for row in rows[1:]:
+        doc = unpack(row.data) if row.kind == SNAPSHOT else apply_diff(doc, unpack(row.data))
+    return doc, rows[-1].created_at
+
+async def list_versions(db, resume_id):
+    rows = (await db.execute(
+        select(ResumeVersion.version, ResumeVersion.kind, ResumeVersion.created_at, func.length(ResumeVersion.data))
+        .where(ResumeVersion.resume_id == resume_id)
+        .order_by(ResumeVersion.version.desc())
+    )).all()
+    return [
+        {"version": version, "kind": kind, "createdAt": created_at.isoformat() if created_at else None, "storedBytes": size}
+        for version, kind, created_at, size in rows
+    ]
@@ -0,0 +1,236 @@
+import gzip
+import heapq
+import json
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no forked workers to race with
+    fcntl = None
+
+from local_analyzer import STOP_WORDS, WORD_RE
+
+# --- Term Analysis ---
+SEARCH_STOP_WORDS = STOP_WORDS | {
+    "are", "at", "by", "from", "has", "have", "it", "its", "our", "that", "this", "we", "will", "you", "your",
+    "who", "what", "which", "their", "they", "was", "were", "can", "not", "all", "any", "but", "into", "us",
+}
+
+def analyze_terms(text, ngram=2):
+    """Unigrams plus word n-grams ("machine learning") that contain no stop words."""
+    tokens = WORD_RE.findall(text.lower())
+    terms = [t for t in tokens if t not in SEARCH_STOP_WORDS and len(t) > 1]
+    for n in range(2, ngram + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if not any(t in SEARCH_STOP_WORDS for t in gram):
+                terms.append(" ".join(gram))
+    return terms
+
+# --- Inverted Index ---
+class InvertedIndex:
+    """
+    term -> {doc_id: term frequency}, plus document lengths for BM25.
+    Documents are replaced wholesale on re-add, so callers can index by a
+    stable id (Resume.id, a JD hash) without tracking what changed.
+    With max_docs set, the least recently added documents are evicted.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, ngram=2, key=int, max_docs=None):
+        self.k1 = k1
+        self.b = b
+        self.ngram = ngram
+        self.key = key  # doc id type, restored from the string keys of a snapshot
+        self.max_docs = max_docs
+        self.postings = defaultdict(dict)
+        self.doc_terms = {}  # doc_id -> length in terms, oldest add first
+        self.doc_vocab = {}  # doc_id -> distinct terms, so removal doesn't scan the vocabulary
+        self.total_length = 0
+        self._norms = None  # BM25 length normalization per doc, rebuilt after writes
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_terms
+
+    def add(self, doc_id, text):
+        counts = Counter(analyze_terms(text, self.ngram))
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in counts.items():
+                self.postings[term][doc_id] = tf
+            self.doc_vocab[doc_id] = list(counts)
+            self.doc_terms[doc_id] = sum(counts.values())
+            self.total_length += self.doc_terms[doc_id]
+            self._norms = None
+            self._evict()
+
+    def _evict(self):
+        # remove() + re-insert in add() keeps doc_terms in least recently added order
+        if self.max_docs is None:
+            return
+        while len(self.doc_terms) > self.max_docs:
+            self.remove(next(iter(self.doc_terms)))
+
+    def remove(self, doc_id):
+        with self._lock:
+            length = self.doc_terms.pop(doc_id, None)
+            if length is None:
+                return
+            self.total_length -= length
+            self._norms = None
+            for term in self.doc_vocab.pop(doc_id, ()):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(doc_id, None)
+                    if not docs:
+                        del self.postings[term]
+
+    def df(self, term):
+        return len(self.postings.get(term, ()))
+
+    def idf(self, term):
+        n = len(self.doc_terms)
+        df = self.df(term)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def top_terms(self, text, limit=40):
+        """The most characteristic terms of `text` by TF-IDF against this corpus."""
+        counts = Counter(analyze_terms(text, self.ngram))
+        with self._lock:
+            weighted = {term: tf * self.idf(term) for term, tf in counts.items()}
+        return heapq.nlargest(limit, weighted, key=weighted.get)
+
+    def _doc_norms(self):
+        if self._norms is None:
+            avg_length = self.total_length / len(self.doc_terms)
+            k1, b = self.k1, self.b
+            self._norms = {doc_id: k1 * (1 - b + b * length / avg_length) for doc_id, length in self.doc_terms.items()}
+        return self._norms
+
+    def search(self, query_terms, limit=20, candidates=None):
+        """BM25 over the given terms. Returns [(doc_id, score, matched_terms)]."""
+        scores = defaultdict(float)
+        with self._lock:
+            if not self.doc_terms:
+                return []
+            norms = self._doc_norms()
+            query_terms = [term for term in dict.fromkeys(query_terms) if term in self.postings]
+            for term in query_terms:
+                docs = self.postings[term]
+                weight = self.idf(term) * (self.k1 + 1)
+                if candidates is not None:
+                    docs = {doc_id: tf for doc_id, tf in docs.items() if doc_id in candidates}
+                for doc_id, tf in docs.items():
+                    scores[doc_id] += weight * tf / (tf + norms[doc_id])
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            # Only the returned docs need their matched terms spelled out
+            return [
+                (doc_id, score, [term for term in query_terms if doc_id in self.postings[term]])
+                for doc_id, score in best
+            ]
+
+    def merge(self, other):
+        """
+        Adds the documents of `other` this index doesn't have; ones it has are
+        kept as they are. A capped index only takes them while it has room.
+        """
+        with self._lock:
+            for doc_id, terms in other.doc_vocab.items():
+                if doc_id in self.doc_terms:
+                    continue
+                if self.max_docs is not None and len(self.doc_terms) >= self.max_docs:
+                    break
+                for term in terms:
+                    self.postings[term][doc_id] = other.postings[term][doc_id]
+                self.doc_vocab[doc_id] = list(terms)
+                self.doc_terms[doc_id] = other.doc_terms[doc_id]
+                self.total_length += other.doc_terms[doc_id]
+                self._norms = None
+
+    def doc_ids(self):
+        with self._lock:
+            return set(self.doc_terms)
+
+    # --- Persistence ---
+    def save(self, path):
+        # Every worker process saves to the same path on shutdown. Holding the
+        # lock, each first merges in what is already on disk, so the snapshot
+        # accumulates documents instead of the last writer's copy winning.
+        with _file_lock(f"{path}.lock"):
+            if os.path.exists(path):
+                try:
+                    self.merge(InvertedIndex.load(path, key=self.key, max_docs=self.max_docs))
+                except Exception as e:
+                    print(f"Search index at {path} unreadable, overwriting: {e}")
+            with self._lock:
+                payload = {
+                    "ngram": self.ngram,
+                    "doc_terms": {str(k): v for k, v in self.doc_terms.items()},
+                    "postings": {term: {str(k): tf for k, tf in docs.items()} for term, docs in self.postings.items()},
+                }
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, key=int, **kwargs):
+        index = cls(key=key, **kwargs)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index.ngram = payload.get("ngram", index.ngram)
+        index.doc_terms = {key(k): v for k, v in payload["doc_terms"].items()}
+        index.total_length = sum(index.doc_terms.values())
+        for term, docs in payload["postings"].items():
+            index.postings[term] = {key(k): tf for k, tf in docs.items()}
+            for doc_id in index.postings[term]:
+                index.doc_vocab.setdefault(doc_id, []).append(term)
+        index._evict()
+        return index
+
+@contextmanager
+def _file_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def load_or_create(path, key=int, max_docs=None):
+    if path and os.path.exists(path):
+        try:
+            return InvertedIndex.load(path, key=key, max_docs=max_docs)
+        except Exception as e:
+            print(f"Search index at {path} unreadable, rebuilding: {e}")
+    return InvertedIndex(key=key, max_docs=max_docs)
+
+# --- Resume Text ---
+def resume_search_text(extracted_text, parsed_data):
+    # Builder-saved resumes have no extracted text, so index their fields
+    if extracted_text:
+        return extracted_text
+    parts = []
+
+    def walk(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    walk(parsed_data or {})
+    return "\n".join(parts)
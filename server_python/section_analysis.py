@@ -0,0 +1,160 @@
+import os
+import re
+import threading
+
+from analysis_cache import hash_text, tiered_cache
+from instrumentation import stage
+from llm_client import LLMError
+from resume_content import sections as resume_sections
+
+# Incremental analysis for the builder's assistant. A resume is split into
+# sections (summary, each experience or project entry, education, skills)
+# fingerprinted by their normalized text, and suggestions are cached per
+# fingerprint. After an edit only the sections whose text changed go to the
+# model, in one prompt; the rest are merged back in from the cache.
+
+SECTION_KINDS = {
+    "Professional Summary": "summary",
+    "Work Experience": "experience",
+    "Education": "education",
+    "Projects": "projects",
+    "Skills": "skills",
+}
+PER_ENTRY_KINDS = ("experience", "projects")
+SECTION_TEXT_LIMIT = 2000
+_blank_line_re = re.compile(r"\n[ \t]*\n")
+
+# --- Splitting ---
+def split_resume(data):
+    """Builder resume data (the ResumeSave shape) as [(key, kind, text)] in preview order."""
+    out = []
+    for title, entries in resume_sections(data):
+        kind = SECTION_KINDS[title]
+        texts = ["\n".join(part for part in entry if part) for entry in entries]
+        if kind in PER_ENTRY_KINDS:
+            out.extend((f"{kind}:{i}", kind, text) for i, text in enumerate(texts))
+        else:
+            out.append((kind, kind, "\n".join(texts)))
+    return out
+
+def split_text(doc, kinds):
+    """Plain text via the local heading index; entries are blank-line separated blocks."""
+    out = []
+    for kind in sorted((k for k in kinds if doc.has_section(k)), key=lambda k: doc.sections[k][0][0]):
+        content = doc.section_content(kind)
+        if not content:
+            continue
+        if kind in PER_ENTRY_KINDS:
+            blocks = [block.strip() for block in _blank_line_re.split(content) if block.strip()]
+            out.extend((f"{kind}:{i}", kind, block) for i, block in enumerate(blocks))
+        else:
+            out.append((kind, kind, content))
+    if not out and doc.text.strip():
+        out.append(("document", "document", doc.text.strip()))
+    return out
+
+def section_prompt(changed):
+    parts = "\n\n".join(f"[{key}]\n{text[:SECTION_TEXT_LIMIT]}" for key, _, text in changed)
+    return f"""
+        You are an expert resume consultant. Below are sections of a resume, each headed by an id in brackets.
+        For each section, give 1-3 specific, actionable suggestions to improve it, focusing on impact, clarity
+        and strong action verbs. Use an empty list for a section that needs no changes.
+
+        {parts}
+
+        Return a JSON object with a key 'sections' mapping each section id to a list of strings.
+        Example: {{ "sections": {{ "experience:0": ["Quantify the engagement gain in the first bullet."] }} }}
+        """
+
+def parse_section_suggestions(response, keys):
+    """{key: [suggestion]} from the model's answer; LLMError if it isn't the asked-for shape."""
+    by_key = response.get("sections")
+    if by_key is None:
+        by_key = {}
+    if not isinstance(by_key, dict):
+        raise LLMError(f"Model returned sections as {type(by_key).__name__}, not an object")
+    out = {}
+    for key in keys:
+        suggestions = by_key.get(key)
+        if suggestions is None:
+            suggestions = []
+        if not isinstance(suggestions, list) or not all(isinstance(s, str) for s in suggestions):
+            raise LLMError(f"Model returned suggestions for {key} that aren't a list of strings")
+        out[key] = suggestions
+    return out
+
+# --- Analyzer ---
+class SectionAnalyzer:
+    def __init__(self, llm, local_analyzer, max_entries=4096, ttl_seconds=86400, state=None):
+        self.llm = llm
+        self.local = local_analyzer
+        self.cache = tiered_cache(max_entries, ttl_seconds, state, "sections:")
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "sections_reused": 0, "sections_analyzed": 0, "model_calls": 0}
+
+    @staticmethod
+    def fingerprint(engine, kind, text):
+        # Engine in the key so local fallbacks never stand in for model answers
+        return f"{engine}:{kind}:{hash_text(text)}"
+
+    async def _suggest(self, changed):
+        """{key: suggestions} for the changed sections, and the engine that produced them."""
+        if self.llm.available:
+            try:
+                response = await self.llm.generate_json(section_prompt(changed))
+                with self._lock:
+                    self._counters["model_calls"] += 1
+                return parse_section_suggestions(response, [key for key, _, _ in changed]), "gemini"
+            except LLMError as e:
+                print(f"AI Error, falling back to local: {e}")
+        with stage("local_analysis"):
+            return {key: self.local.suggest_section(kind, text) for key, kind, text in changed}, "local"
+
+    async def analyze(self, sections):
+        engine = "gemini" if self.llm.available else "local"
+        results = {}
+        changed = []
+        for key, kind, text in sections:
+            cached = await self.cache.get(self.fingerprint(engine, kind, text))
+            if cached is None:
+                changed.append((key, kind, text))
+            else:
+                results[key] = cached
+
+        if changed:
+            fresh, source = await self._suggest(changed)
+            for key, kind, text in changed:
+                results[key] = fresh[key]
+                if source == engine:
+                    await self.cache.set(self.fingerprint(engine, kind, text), fresh[key])
+
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["sections_reused"] += len(sections) - len(changed)
+            self._counters["sections_analyzed"] += len(changed)
+
+        # Whole-document checks are cheap and can't be cached per section
+        word_count = sum(len(text.split()) for _, _, text in sections)
+        merged = self.local.suggest_length(word_count)
+        for key, _, _ in sections:
+            merged.extend(s for s in results[key] if s not in merged)
+        return {
+            "suggestions": merged,
+            "sections": {key: results[key] for key, _, _ in sections},
+            "reanalyzed": [key for key, _, _ in changed],
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["cached_sections"] = len(self.cache)
+        return stats
+
+def section_analyzer_from_env(llm, local_analyzer, state=None):
+    return SectionAnalyzer(
+        llm,
+        local_analyzer,
+        max_entries=int(os.getenv("SECTION_CACHE_SIZE", "4096")),
+        ttl_seconds=int(os.getenv("SECTION_CACHE_TTL", "86400")),
+        state=state,
+    )
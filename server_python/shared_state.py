@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Node-wide state for running several worker processes: cache entries,
+# rate-limit buckets and bulk job progress live here instead of in one
+# process's memory. Values are JSON. Backends (STATE_BACKEND):
+#   memory  this process only; the default for a single worker
+#   sqlite  a WAL-mode file every worker on the node opens (STATE_PATH)
+#   redis   any Redis-compatible server (STATE_REDIS_URL); needs the redis package
+# update() is the one atomic primitive: a read-modify-write of one key, which
+# the token bucket and sliding windows are built on.
+
+SWEEP_EVERY = 1000  # writes between purges of expired keys
+
+def _expires_at(ttl):
+    return time.time() + ttl if ttl is not None else None
+
+class MemoryState:
+    backend = "memory"
+    shared = False
+
+    def __init__(self):
+        self._data = {}  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is not None and item[0] is not None and item[0] <= now:
+            del self._data[key]
+            return None
+        return item
+
+    def _write(self, key, value, ttl):
+        if value is None:
+            self._data.pop(key, None)
+        else:
+            self._data[key] = (_expires_at(ttl), value)
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            now = time.time()
+            for k in [k for k, (expires_at, _) in self._data.items() if expires_at is not None and expires_at <= now]:
+                del self._data[k]
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.time())
+            return item[1] if item is not None else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._write(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def update(self, key, fn, ttl=None):
+        """fn(current value or None) -> (new value, result), atomically; a new value of None deletes the key. Returns result."""
+        with self._lock:
+            item = self._live(key, time.time())
+            value, result = fn(item[1] if item is not None else None)
+            self._write(key, value, ttl)
+            return result
+
+    def count(self, prefix):
+        now = time.time()
+        with self._lock:
+            return sum(1 for key in list(self._data) if key.startswith(prefix) and self._live(key, now) is not None)
+
+class SQLiteState:
+    """One table in a WAL-mode SQLite file; BEGIN IMMEDIATE makes update() atomic across processes."""
+
+    backend = "sqlite"
+    shared = True
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit; update() opens its own write transaction
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _read(self, key):
+        row = self._conn.execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _write(self, key, value, ttl):
+        if value is None:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(",", ":")), _expires_at(ttl)),
+            )
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self._conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key):
+        with self._lock:
+            return self._read(key)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._write(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def update(self, key, fn, ttl=None):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value, result = fn(self._read(key))
+                self._write(key, value, ttl)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def count(self, prefix):
+        # Range scan on the primary key rather than LIKE, which would treat % and _ in keys as wildcards
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM shared_state WHERE key >= ? AND key < ? AND (expires_at IS NULL OR expires_at > ?)",
+                (prefix, prefix + "\U0010ffff", time.time()),
+            ).fetchone()[0]
+
+class RedisState:
+    """Keys live under `prefix`; update() is a WATCH/MULTI transaction, retried by redis-py on conflict."""
+
+    backend = "redis"
+    shared = True
+
+    def __init__(self, url, prefix="resume:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("STATE_BACKEND=redis needs the redis package (pip install redis)") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, separators=(",", ":"))
+
+    @staticmethod
+    def _px(ttl):
+        return max(1, int(ttl * 1000)) if ttl is not None else None
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, self._encode(value), px=self._px(ttl))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def update(self, key, fn, ttl=None):
+        name = self.prefix + key
+
+        def transaction(pipe):
+            raw = pipe.get(name)
+            value, result = fn(json.loads(raw) if raw is not None else None)
+            pipe.multi()
+            if value is None:
+                pipe.delete(name)
+            else:
+                pipe.set(name, self._encode(value), px=self._px(ttl))
+            return result
+
+        return self._client.transaction(transaction, name, value_from_callable=True)
+
+    def count(self, prefix):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", self.prefix + prefix) + "*"
+        return sum(1 for _ in self._client.scan_iter(match=pattern, count=1000))
+
+def state_from_env():
+    backend = os.getenv("STATE_BACKEND", "memory").lower()
+    if backend == "memory":
+        return MemoryState()
+    if backend == "sqlite":
+        return SQLiteState(os.getenv("STATE_PATH") or os.path.join(tempfile.gettempdir(), "resume-state.db"))
+    if backend == "redis":
+        return RedisState(os.getenv("STATE_REDIS_URL", "redis://localhost:6379/0"), prefix=os.getenv("STATE_REDIS_PREFIX", "resume:"))
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r} (expected memory, sqlite or redis)")
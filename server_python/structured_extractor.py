@@ -0,0 +1,178 @@
+import re
+
+# Rule-based structure for experience, education and projects sections, in
+# the same shape Gemini returns for parsedData.
+
+# --- Patterns ---
+_month = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|"
+          r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+_season = r"(?:spring|summer|fall|autumn|winter)"
+_date = rf"(?:(?:{_month}|{_season})[ \t,]*\d{{4}}|\d{{1,2}}/\d{{4}}|\d{{4}})"
+_open_end = r"(?:present|current|now|today|ongoing)"
+
+DATE_RANGE_RE = re.compile(rf"\(?\b{_date}[ \t]*(?:-|–|—|to|until)[ \t]*(?:{_date}|{_open_end})\b\)?", re.IGNORECASE)
+DATE_RE = re.compile(rf"\(?\b(?:{_date}|expected[ \t]+{_date})\b\)?", re.IGNORECASE)
+YEAR_RE = re.compile(r"\d{4}")  # cheap pre-check before the date patterns
+BULLET_RE = re.compile(r"^[ \t]*[•●▪◦‣*·o-][ \t]+")
+URL_RE = re.compile(r"(?:https?://|www\.|github\.com/)\S+", re.IGNORECASE)
+# "Remote" or "City, ST"; looser forms collide with "Title, Company"
+LOCATION_RE = re.compile(r"\b(?:remote|hybrid|[A-Z][a-zA-Z.]+(?:[ \t][A-Z][a-zA-Z.]+){0,2},[ \t]?[A-Z]{2})\b")
+HEADER_SPLIT_RE = re.compile(r"[ \t]+(?:at|@)[ \t]+|[ \t]*[|•][ \t]*|[ \t]+[-–—][ \t]+|,[ \t]*")
+
+TITLE_WORDS_RE = re.compile(
+    r"\b(?:engineer|developer|programmer|manager|analyst|intern|designer|consultant|director|lead|specialist|"
+    r"assistant|associate|coordinator|officer|scientist|architect|administrator|executive|head|president|"
+    r"representative|technician|teacher|tutor|accountant|advisor|nurse|supervisor|recruiter|researcher|"
+    r"owner|founder|cashier|clerk|writer|editor|volunteer|fellow|trainee|apprentice|sde|swe)\b",
+    re.IGNORECASE,
+)
+COMPANY_WORDS_RE = re.compile(
+    r"\b(?:inc|llc|ltd|corp|corporation|company|co|gmbh|plc|group|technologies|technology|solutions|systems|"
+    r"labs|studio|services|consulting|partners|bank|hospital|agency|pvt)\b\.?",
+    re.IGNORECASE,
+)
+DEGREE_RE = re.compile(
+    r"\b(?:bachelor(?:'s)?|master(?:'s)?|doctor(?:ate)?|ph\.?[ \t]?d|mba|bba|bca|mca|b\.?[ \t]?tech|m\.?[ \t]?tech|"
+    r"b\.?[ \t]?sc?|m\.?[ \t]?sc?|b\.?[ \t]?a|m\.?[ \t]?a|b\.?[ \t]?e|m\.?[ \t]?e|b\.?[ \t]?com|m\.?[ \t]?com|"
+    r"associate(?:'s)?|diploma|high[ \t]school|secondary[ \t]school|certificate|ged)\b\.?",
+    re.IGNORECASE,
+)
+SCHOOL_RE = re.compile(r"\b(?:university|college|institute|school|academy|polytechnic|iit|nit)\b", re.IGNORECASE)
+
+def _lines(section_text):
+    return [line.strip() for line in section_text.split("\n") if line.strip()]
+
+def _strip_bullet(line):
+    return BULLET_RE.sub("", line)
+
+def _is_bullet(line):
+    return bool(BULLET_RE.match(line))
+
+def _clean(value):
+    return value.strip(" \t,|-–—:()")
+
+def _pop_location(text):
+    match = LOCATION_RE.search(text)
+    if not match:
+        return text, ""
+    return text[:match.start()] + text[match.end():], match.group(0)
+
+# --- Experience ---
+def _split_title_company(header):
+    parts = [_clean(p) for p in HEADER_SPLIT_RE.split(header) if _clean(p)]
+    if not parts:
+        return "", ""
+    title = next((p for p in parts if TITLE_WORDS_RE.search(p)), "")
+    company = next((p for p in parts if p != title and COMPANY_WORDS_RE.search(p)), "")
+    rest = [p for p in parts if p not in (title, company)]
+    if not title and rest:
+        title = rest.pop(0)
+    if not company and rest:
+        company = rest.pop(0)
+    return title, company
+
+def _entry_date(line):
+    # Date ranges anchor an entry; a single date only on a short role line
+    if _is_bullet(line) or not YEAR_RE.search(line):
+        return None
+    match = DATE_RANGE_RE.search(line)
+    if match is None and len(line) < 100 and (TITLE_WORDS_RE.search(line) or COMPANY_WORDS_RE.search(line)):
+        match = DATE_RE.search(line)
+    return match
+
+def extract_experience(section_text):
+    lines = _lines(section_text)
+    dates = [_entry_date(line) for line in lines]
+    anchors = [i for i, match in enumerate(dates) if match]
+    if not anchors:
+        return []
+
+    entries = []
+    consumed = -1  # last line index owned by a previous entry's header
+    starts = []
+    for i in anchors:
+        start = i
+        # A date alone on its line belongs to the header line(s) above it
+        prev = i - 1
+        if prev > consumed and not _is_bullet(lines[prev]) and not dates[prev] \
+                and len(lines[prev]) < 100 and not lines[prev].endswith("."):
+            start = prev
+        starts.append(start)
+        consumed = i
+
+    for n, (start, anchor) in enumerate(zip(starts, anchors)):
+        end = starts[n + 1] if n + 1 < len(starts) else len(lines)
+        date_match = dates[anchor]
+        header = " | ".join(lines[start:anchor] + [lines[anchor][:date_match.start()] + lines[anchor][date_match.end():]])
+        header, location = _pop_location(header)
+        title, company = _split_title_company(header)
+        description = "\n".join(_strip_bullet(line) for line in lines[anchor + 1:end])
+        entries.append({
+            "id": n + 1,
+            "title": title,
+            "company": company,
+            "date": _clean(date_match.group(0)),
+            "location": location,
+            "description": description,
+        })
+    return entries
+
+# --- Education ---
+def extract_education(section_text):
+    entries = []
+    current = None
+    for line in _lines(section_text):
+        text = _strip_bullet(line)
+        degree_match = DEGREE_RE.search(text)
+        school_match = SCHOOL_RE.search(text)
+        # A second degree or school line means the next entry has started
+        if (degree_match or school_match) and (
+            current is None
+            or (degree_match and current["degree"])
+            or (school_match and not degree_match and current["school"])
+        ):
+            current = {"id": len(entries) + 1, "degree": "", "school": "", "date": "", "location": ""}
+            entries.append(current)
+        if current is None:
+            continue
+
+        date_match = YEAR_RE.search(text) and (DATE_RANGE_RE.search(text) or DATE_RE.search(text))
+        if date_match and not current["date"]:
+            current["date"] = _clean(date_match.group(0))
+        if date_match:
+            text = text[:date_match.start()] + text[date_match.end():]
+        text, location = _pop_location(text)
+        if location and not current["location"]:
+            current["location"] = location
+
+        parts = [_clean(p) for p in HEADER_SPLIT_RE.split(text) if _clean(p)]
+        for part in parts:
+            if not current["school"] and SCHOOL_RE.search(part):
+                current["school"] = part
+            elif not current["degree"] and (DEGREE_RE.search(part) or " in " in part.lower()):
+                current["degree"] = part
+    return entries
+
+# --- Projects ---
+def extract_projects(section_text):
+    projects = []
+    current = None
+    for line in _lines(section_text):
+        # Bullets and full sentences describe the project above them
+        if current is not None and (_is_bullet(line) or line.endswith(".") or len(line) > 80):
+            current["description"] = "\n".join(filter(None, [current["description"], _strip_bullet(line)]))
+            continue
+        url = URL_RE.search(line)
+        if current is not None and url and not current["link"] and len(line) == len(url.group(0)):
+            current["link"] = url.group(0)
+            continue
+        title = _clean((line[:url.start()] + line[url.end():]) if url else line)
+        current = {"title": title, "description": "", "link": url.group(0) if url else ""}
+        # "Name: what it does" / "Name - what it does" on one line
+        for sep in (":", " - ", " – "):
+            if sep in title:
+                name, _, rest = title.partition(sep)
+                current["title"], current["description"] = _clean(name), rest.strip()
+                break
+        projects.append(current)
+    return projects
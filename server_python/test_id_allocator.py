@@ -0,0 +1,54 @@
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, Resume
+from id_allocator import IdAllocator
+
+# Two allocators on separate engines stand in for two worker processes
+# sharing one id_sequences row.
+
+def run_with_engines(tmp_path, test, engines=2):
+    async def main():
+        url = f"sqlite+aiosqlite:///{tmp_path / 'ids.db'}"
+        opened = [create_async_engine(url) for _ in range(engines)]
+        async with opened[0].begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            return await test([async_sessionmaker(engine, expire_on_commit=False) for engine in opened])
+        finally:
+            for engine in opened:
+                await engine.dispose()
+
+    return asyncio.run(main())
+
+def test_allocators_sharing_a_sequence_never_repeat_ids(tmp_path):
+    async def test(factories):
+        allocators = [IdAllocator("resumes", Resume.id, block_size=7, session_factory=f) for f in factories]
+        ids = await asyncio.gather(*(allocator.next_id() for _ in range(40) for allocator in allocators))
+        return ids, [allocator.stats() for allocator in allocators]
+
+    ids, stats = run_with_engines(tmp_path, test)
+    assert len(ids) == len(set(ids)) == 80
+    assert min(ids) == 1
+    assert all(s["issued"] == 40 and s["blocks"] == 6 for s in stats)
+
+def test_blocks_start_above_rows_written_without_the_allocator(tmp_path):
+    async def test(factories):
+        async with factories[0]() as db:
+            await db.execute(insert(Resume.__table__).values(id=500, filename="legacy.pdf"))
+            await db.commit()
+        allocator = IdAllocator("resumes", Resume.id, block_size=10, session_factory=factories[0])
+        return [await allocator.next_id() for _ in range(12)]
+
+    assert run_with_engines(tmp_path, test, engines=1) == list(range(501, 513))
+
+def test_restarted_allocator_skips_the_rest_of_its_old_block(tmp_path):
+    async def test(factories):
+        first = IdAllocator("resumes", Resume.id, block_size=5, session_factory=factories[0])
+        issued = [await first.next_id() for _ in range(3)]
+        restarted = IdAllocator("resumes", Resume.id, block_size=5, session_factory=factories[0])
+        return issued, await restarted.next_id()
+
+    assert run_with_engines(tmp_path, test, engines=1) == ([1, 2, 3], 6)
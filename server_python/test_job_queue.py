@@ -0,0 +1,196 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import AnalysisJob, Base
+from job_queue import JobQueue
+
+# Several JobQueue instances on their own engines over one SQLite file stand
+# in for server processes sharing the analysis_jobs table.
+
+class BadUpload(Exception):
+    status_code = 400
+
+def run_with_queues(tmp_path, test, count=1, **options):
+    async def main():
+        url = f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}"
+        engines = [create_async_engine(url) for _ in range(count)]
+        async with engines[0].begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        queues = []
+        for i, engine in enumerate(engines):
+            queue = JobQueue(poll_interval=0.05, spool_dir=str(tmp_path / "spool"),
+                             session_factory=async_sessionmaker(engine, expire_on_commit=False), **options)
+            queue.worker_id = f"worker-{i}"
+            queues.append(queue)
+        try:
+            return await test(*queues)
+        finally:
+            for queue in queues:
+                await queue.close()
+            for engine in engines:
+                await engine.dispose()
+
+    return asyncio.run(main())
+
+async def wait_for_status(queue, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} never reached {statuses}: {job}")
+
+async def expire_lease(queue, job_id):
+    # What a process that stopped renewing looks like once its lease runs out
+    async with queue.session_factory() as db:
+        await db.execute(update(AnalysisJob).where(AnalysisJob.id == job_id)
+                         .values(lease_until=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+async def row(queue, job_id):
+    async with queue.session_factory() as db:
+        return await db.get(AnalysisJob, job_id)
+
+def spooled_file(tmp_path, name="upload.pdf"):
+    path = tmp_path / name
+    path.write_bytes(b"%PDF-1.4")
+    return str(path)
+
+async def never_finishes(payload):
+    await asyncio.Event().wait()
+
+# --- Claiming ---
+def test_only_one_queue_wins_a_claim(tmp_path):
+    async def test(first, second):
+        for queue in (first, second):
+            queue.register("match", never_finishes, concurrency=4)
+        job_ids = [await first.submit("match", {"n": n}) for n in range(3)]
+        claims = await asyncio.gather(*(queue._claim(["match"]) for _ in range(3) for queue in (first, second)))
+        return job_ids, claims, [await row(first, job_id) for job_id in job_ids]
+
+    job_ids, claims, rows = run_with_queues(tmp_path, test, count=2)
+    won = [claim["id"] for claim in claims if claim is not None]
+    assert sorted(won) == sorted(job_ids)
+    assert all(r.status == "running" and r.attempts == 1 for r in rows)
+    assert {r.worker for r in rows} <= {"worker-0", "worker-1"}
+
+def test_claims_follow_priority(tmp_path):
+    async def test(queue):
+        queue.register("upload", never_finishes, concurrency=1, priority=0)
+        queue.register("match", never_finishes, concurrency=1, priority=10)
+        upload = await queue.submit("upload", {})
+        match = await queue.submit("match", {})
+        return [(await queue._claim(["upload", "match"]))["id"] for _ in range(2)], [match, upload]
+
+    claimed, expected = run_with_queues(tmp_path, test)
+    assert claimed == expected
+
+# --- Leases ---
+def test_expired_lease_requeues_then_fails_after_max_attempts(tmp_path):
+    path = spooled_file(tmp_path)
+
+    async def test(dead, sweeper):
+        for queue in (dead, sweeper):
+            queue.register("upload", never_finishes, concurrency=1)
+        job_id = await dead.submit("upload", {"path": path})
+        seen = []
+        for _ in range(2):
+            claim = await dead._claim(["upload"])
+            assert claim["id"] == job_id
+            await expire_lease(dead, job_id)
+            await sweeper._sweep()
+            seen.append(await row(sweeper, job_id))
+        return seen
+
+    requeued, failed = run_with_queues(tmp_path, test, count=2, max_attempts=2)
+    assert (requeued.status, requeued.worker, requeued.attempts, requeued.lease_until) == ("queued", None, 1, None)
+    assert (failed.status, failed.status_code, failed.attempts) == ("failed", 500, 2)
+    assert failed.error == "The worker running this job stopped"
+    assert not (tmp_path / "upload.pdf").exists()
+
+def test_sweep_renews_leases_of_running_jobs(tmp_path):
+    async def test(queue):
+        queue.register("match", never_finishes, concurrency=1)
+        queue.start()
+        job_id = await queue.submit("match", {})
+        await wait_for_status(queue, job_id, ("running",))
+        await expire_lease(queue, job_id)
+        await queue._sweep()
+        return await row(queue, job_id)
+
+    job = run_with_queues(tmp_path, test, drain_seconds=0)
+    assert job.status == "running"
+    assert job.lease_until > datetime.utcnow()
+
+# --- Draining ---
+def test_close_requeues_running_jobs_with_attempts_restored(tmp_path):
+    path = spooled_file(tmp_path)
+
+    async def test(queue):
+        queue.register("upload", never_finishes, concurrency=1)
+        queue.start()
+        job_id = await queue.submit("upload", {"path": path})
+        running = await wait_for_status(queue, job_id, ("running",))
+        await queue.close()
+        return running, await row(queue, job_id), queue.stats()
+
+    running, job, stats = run_with_queues(tmp_path, test, drain_seconds=0.1)
+    assert running["attempts"] == 1
+    assert (job.status, job.worker, job.lease_until, job.attempts) == ("queued", None, None, 0)
+    assert stats["requeued"] == 1
+    # Still needed by whichever process runs the job next
+    assert (tmp_path / "upload.pdf").exists()
+
+# --- Finishing ---
+def test_terminal_states_remove_the_spooled_input(tmp_path):
+    async def handler(payload):
+        if payload["outcome"] == "bad":
+            raise BadUpload("Unsupported file")
+        if payload["outcome"] == "crash":
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    paths = {outcome: spooled_file(tmp_path, f"{outcome}.pdf") for outcome in ("ok", "bad", "crash")}
+
+    async def test(queue):
+        queue.register("upload", handler, concurrency=3)
+        queue.start()
+        job_ids = {outcome: await queue.submit("upload", {"outcome": outcome, "path": path}) for outcome, path in paths.items()}
+        return {outcome: await wait_for_status(queue, job_id, ("done", "failed")) for outcome, job_id in job_ids.items()}
+
+    jobs = run_with_queues(tmp_path, test, max_attempts=1)
+    assert jobs["ok"]["status"] == "done" and jobs["ok"]["result"] == {"ok": True}
+    assert (jobs["bad"]["status"], jobs["bad"]["statusCode"], jobs["bad"]["error"]) == ("failed", 400, "Unsupported file")
+    assert (jobs["crash"]["status"], jobs["crash"]["statusCode"]) == ("failed", 500)
+    assert not any((tmp_path / f"{outcome}.pdf").exists() for outcome in paths)
+
+def test_lost_lease_discards_the_late_result(tmp_path):
+    async def test(slow, other):
+        gate = asyncio.Event()
+
+        async def handler(payload):
+            await gate.wait()
+            return {"late": True}
+
+        slow.register("match", handler, concurrency=1)
+        other.register("match", never_finishes, concurrency=1)
+        slow.start()
+        job_id = await slow.submit("match", {})
+        await wait_for_status(slow, job_id, ("running",))
+        # The lease lapses and another process takes the job over
+        await expire_lease(slow, job_id)
+        await other._sweep()
+        assert (await other._claim(["match"]))["id"] == job_id
+        gate.set()
+        while slow.stats()["running"]:
+            await asyncio.sleep(0.02)
+        return await row(other, job_id), slow.stats()
+
+    job, stats = run_with_queues(tmp_path, test, count=2)
+    assert (job.status, job.worker, job.attempts) == ("running", "worker-1", 2)
+    assert stats["lost"] == 1 and stats["done"] == 0
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from llm_client import FakeModel, LLMClient, LLMError
+
+# Responses that aren't a usable JSON object must surface as LLMError, which
+# is what the endpoints catch to fall back to the local analyzer.
+
+class BlockedResponse:
+    @property
+    def text(self):
+        # What Gemini's response.text does for a safety-blocked or empty candidate
+        raise ValueError("The `response.text` quick accessor only works when the response contains a valid `Part`")
+
+class BlockedModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return BlockedResponse()
+
+def make_client(model):
+    return LLMClient(model, rate=1000, burst=1000, max_retries=1, backoff=0)
+
+def test_blocked_response_raises_llm_error():
+    model = BlockedModel()
+    client = make_client(model)
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate_json("prompt"))
+    assert model.calls == 2  # counted as an upstream failure and retried
+    assert client.stats()["failures"] == 2
+
+def test_non_object_json_raises_llm_error():
+    client = make_client(FakeModel(responder=lambda prompt: []))
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate_json("prompt"))
+
+def test_invalid_json_raises_llm_error():
+    model = SimpleNamespace(generate_content=lambda prompt: SimpleNamespace(text="not json"))
+    with pytest.raises(LLMError):
+        asyncio.run(make_client(model).generate_json("prompt"))
+
+def test_object_json_is_returned():
+    client = make_client(FakeModel(responder=lambda prompt: {"matchScore": 70}))
+    assert asyncio.run(client.generate_json("prompt")) == {"matchScore": 70}
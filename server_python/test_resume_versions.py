@@ -0,0 +1,116 @@
+import asyncio
+import copy
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from database import Base, ResumeVersion
+from resume_versions import DELTA, SNAPSHOT, VersionNotFound, apply_diff, json_diff, load_version, record_version
+
+# Each save below changes the previous one: nested edits, list growth and
+# truncation, deleted keys and values that change type.
+HISTORY = [
+    {"fullName": "Ada", "skills": ["python", "sql"], "experience": [{"title": "Dev", "bullets": ["a", "b"]}]},
+    {"fullName": "Ada Lovelace", "skills": ["python", "sql", "go"], "experience": [{"title": "Dev", "bullets": ["a", "b", "c"]}]},
+    {"fullName": "Ada Lovelace", "skills": ["python"], "experience": [{"title": "Senior Dev", "bullets": ["a"]}], "summary": "Engineer"},
+    {"fullName": "Ada Lovelace", "skills": "python, go", "experience": [{"title": "Senior Dev", "bullets": None}, {"title": "Intern"}]},
+    {"fullName": "Ada Lovelace", "skills": {"languages": ["python"]}, "experience": [], "summary": 1},
+    {"fullName": "Ada Lovelace", "skills": {"languages": ["python", "rust"]}, "experience": [{"title": "CTO", "bullets": []}], "summary": 1.0},
+    {"skills": {"languages": ["rust"], "tools": ["git"]}, "experience": [{"title": "CTO", "bullets": [{"text": "Led"}]}], "summary": True},
+]
+
+def run_with_session(test):
+    async def main():
+        # One shared connection, so every session sees the same in-memory database
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                return await test(db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+async def save_all(db, docs, resume_id=1, snapshot_every=3):
+    versions = []
+    previous = None
+    for doc in docs:
+        versions.append(await record_version(db, resume_id, previous, copy.deepcopy(doc), snapshot_every=snapshot_every))
+        await db.commit()
+        previous = doc
+    return versions
+
+async def kinds(db, resume_id=1):
+    rows = await db.execute(
+        select(ResumeVersion.version, ResumeVersion.kind).where(ResumeVersion.resume_id == resume_id).order_by(ResumeVersion.version)
+    )
+    return dict(rows.all())
+
+@pytest.mark.parametrize("old, new", list(zip(HISTORY, HISTORY[1:])) + [(HISTORY[-1], HISTORY[0]), ({"a": 1}, [1]), (1, True)])
+def test_diff_round_trips(old, new):
+    ops = json_diff(old, new)
+    patched = apply_diff(copy.deepcopy(old), ops)
+    assert patched == new
+    assert [type(v) for v in _leaves(patched)] == [type(v) for v in _leaves(new)]
+
+def _leaves(value):
+    if isinstance(value, dict):
+        return [leaf for key in value for leaf in _leaves(value[key])]
+    if isinstance(value, list):
+        return [leaf for item in value for leaf in _leaves(item)]
+    return [value]
+
+def test_every_version_loads_back():
+    async def test(db):
+        versions = await save_all(db, HISTORY)
+        assert versions == list(range(1, len(HISTORY) + 1))
+        for version, doc in zip(versions, HISTORY):
+            loaded, created_at = await load_version(db, 1, version)
+            assert loaded == doc
+            assert created_at is not None
+        return await kinds(db)
+
+    stored = run_with_session(test)
+    # Snapshots at most three versions apart, diffs between them
+    assert stored[1] == SNAPSHOT
+    assert DELTA in stored.values()
+    snapshots = [v for v, kind in stored.items() if kind == SNAPSHOT]
+    assert all(b - a <= 3 for a, b in zip(snapshots, snapshots[1:] + [len(HISTORY) + 1]))
+
+def test_unchanged_save_adds_no_version():
+    async def test(db):
+        versions = await save_all(db, [HISTORY[0], HISTORY[0], HISTORY[1]])
+        return versions, await kinds(db)
+
+    versions, stored = run_with_session(test)
+    assert versions == [1, 1, 2]
+    assert list(stored) == [1, 2]
+
+def test_resume_saved_before_versioning_keeps_its_content_as_version_one():
+    async def test(db):
+        version = await record_version(db, 7, HISTORY[0], copy.deepcopy(HISTORY[1]))
+        await db.commit()
+        return version, (await load_version(db, 7, 1))[0], (await load_version(db, 7, 2))[0]
+
+    assert run_with_session(test) == (2, HISTORY[0], HISTORY[1])
+
+def test_histories_are_per_resume():
+    async def test(db):
+        await save_all(db, HISTORY[:3], resume_id=1)
+        await save_all(db, HISTORY[3:], resume_id=2)
+        return (await load_version(db, 1, 3))[0], (await load_version(db, 2, 1))[0]
+
+    assert run_with_session(test) == (HISTORY[2], HISTORY[3])
+
+@pytest.mark.parametrize("resume_id, version", [(1, 4), (1, 0), (2, 1)])
+def test_missing_version_raises(resume_id, version):
+    async def test(db):
+        await save_all(db, HISTORY[:3])
+        with pytest.raises(VersionNotFound):
+            await load_version(db, resume_id, version)
+
+    run_with_session(test)
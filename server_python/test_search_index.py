@@ -0,0 +1,135 @@
+import multiprocessing
+
+import pytest
+
+import search_index
+from search_index import InvertedIndex, analyze_terms, load_or_create
+
+DOCS = {
+    1: "Python developer building Django services and REST APIs on AWS",
+    2: "Java engineer working on Spring services",
+    3: "Machine learning engineer using Python, PyTorch and machine learning pipelines",
+    4: "Office manager handling payroll and scheduling",
+}
+
+def build(docs=DOCS, **options):
+    index = InvertedIndex(**options)
+    for doc_id, text in docs.items():
+        index.add(doc_id, text)
+    return index
+
+def ranked(index, query):
+    return [doc_id for doc_id, _, _ in index.search(analyze_terms(query))]
+
+# --- Terms ---
+def test_terms_include_bigrams_without_stop_words():
+    terms = analyze_terms("Machine learning for the web")
+    assert "machine learning" in terms
+    assert "for" not in terms and "learning for" not in terms
+
+# --- Ranking ---
+def test_bm25_ranks_documents_matching_more_and_rarer_terms_first():
+    index = build()
+    assert ranked(index, "python machine learning") == [3, 1]
+    hits = index.search(analyze_terms("spring services"))
+    assert [doc_id for doc_id, _, _ in hits] == [2, 1]
+    # The rare term outweighs the one both share
+    assert hits[0][1] > hits[1][1]
+    assert hits[0][2] == ["spring", "services", "spring services"]
+
+def test_repeated_terms_saturate_instead_of_dominating():
+    index = build({1: "python " * 50, 2: "python django", 3: "unrelated text here"})
+    scores = dict((doc_id, score) for doc_id, score, _ in index.search(["python"]))
+    assert scores[1] < 2 * scores[2]
+
+def test_search_limits_and_candidates():
+    index = build()
+    assert ranked(index, "engineer") == [2, 3]
+    assert [doc_id for doc_id, _, _ in index.search(["engineer"], limit=1)] == [2]
+    assert [doc_id for doc_id, _, _ in index.search(["engineer"], candidates={3})] == [3]
+    assert InvertedIndex().search(["python"]) == []
+
+# --- Updates ---
+def test_remove_updates_document_frequencies():
+    index = build()
+    assert index.df("python") == 2 and index.df("services") == 2
+    index.remove(1)
+    assert index.df("python") == 1 and index.df("services") == 1
+    assert index.df("django") == 0 and "django" not in index.postings
+    assert 1 not in index and len(index) == 3
+    assert index.total_length == sum(index.doc_terms.values())
+    assert ranked(index, "django python") == [3]
+    index.remove(1)  # already gone
+    assert len(index) == 3
+
+def test_re_adding_a_document_replaces_it():
+    index = build()
+    index.add(2, "Kotlin developer")
+    assert index.df("java") == 0 and index.df("kotlin") == 1
+    assert ranked(index, "java") == []
+    assert index.total_length == sum(index.doc_terms.values())
+
+def test_capped_index_evicts_least_recently_added():
+    index = build(max_docs=3, key=int)
+    assert index.doc_ids() == {2, 3, 4}
+    index.add(2, DOCS[2])  # refreshed, so 3 goes next
+    index.add(5, "Nurse practitioner")
+    assert index.doc_ids() == {2, 4, 5}
+    assert index.df("pytorch") == 0
+
+def test_merge_adds_only_missing_documents():
+    index = build({1: DOCS[1], 2: DOCS[2]})
+    other = build({2: "Rust engineer", 3: DOCS[3]})
+    index.merge(other)
+    assert index.doc_ids() == {1, 2, 3}
+    assert index.df("rust") == 0  # doc 2 kept as it was
+    assert ranked(index, "pytorch") == [3]
+    assert index.total_length == sum(index.doc_terms.values())
+
+# --- Persistence ---
+@pytest.mark.parametrize("key, docs", [(int, DOCS), (str, {f"jd-{doc_id}": text for doc_id, text in DOCS.items()})])
+def test_save_and_load_round_trip(tmp_path, key, docs):
+    path = str(tmp_path / "index.json.gz")
+    index = build(docs, key=key)
+    index.save(path)
+    loaded = InvertedIndex.load(path, key=key)
+    assert loaded.doc_ids() == index.doc_ids()
+    assert loaded.doc_terms == index.doc_terms
+    assert {term: dict(docs) for term, docs in loaded.postings.items()} == dict(index.postings)
+    assert loaded.search(["python", "engineer"]) == index.search(["python", "engineer"])
+    # Removal after a load still finds every posting of the document
+    first = next(iter(docs))
+    loaded.remove(first)
+    assert all(first not in postings for postings in loaded.postings.values())
+
+def test_saves_from_several_processes_accumulate(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    build({1: DOCS[1], 2: DOCS[2]}).save(path)
+    # Another worker that never saw 1 and 2 saves to the same file
+    build({3: DOCS[3]}).save(path)
+    assert load_or_create(path).doc_ids() == {1, 2, 3}
+    assert (tmp_path / "index.json.gz.lock").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+def _save_docs(path, first):
+    build({doc_id: f"document {doc_id} python" for doc_id in range(first, first + 25)}).save(path)
+
+@pytest.mark.skipif(search_index.fcntl is None, reason="needs flock")
+def test_concurrent_saves_lose_no_documents(tmp_path):
+    path = str(tmp_path / "index.json.gz")
+    workers = [multiprocessing.Process(target=_save_docs, args=(path, first)) for first in range(0, 200, 25)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert load_or_create(path).doc_ids() == set(range(200))
+
+def test_unreadable_snapshot_is_rebuilt(tmp_path):
+    path = tmp_path / "index.json.gz"
+    path.write_bytes(b"not gzip")
+    index = load_or_create(str(path), key=str, max_docs=2)
+    assert len(index) == 0 and index.key is str and index.max_docs == 2
+    index.add("a", "python")
+    index.save(str(path))
+    assert load_or_create(str(path), key=str).doc_ids() == {"a"}
@@ -0,0 +1,73 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, Resume, ResumePayload
+from write_behind import WriteBehindQueue
+
+def rows(resume_id, text="text"):
+    # A resume and its payload, as main.resume_rows builds them
+    return [
+        (Resume.__table__, {"id": resume_id, "filename": f"{resume_id}.pdf"}),
+        (ResumePayload.__table__, {"resume_id": resume_id, "extracted_text": text}),
+    ]
+
+def run_with_queue(tmp_path, test, **options):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writes.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        queue = WriteBehindQueue("test_writes", backoff=0, session_factory=factory, **options)
+        try:
+            await test(queue)
+            async with factory() as db:
+                stored = (await db.execute(select(Resume.id).order_by(Resume.id))).scalars().all()
+                payloads = (await db.execute(select(ResumePayload.resume_id).order_by(ResumePayload.resume_id))).scalars().all()
+            return queue.stats(), stored, payloads
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+def test_batch_is_written_in_one_commit(tmp_path):
+    async def test(queue):
+        queue.start()
+        for resume_id in range(1, 6):
+            await queue.submit(rows(resume_id))
+        await queue.close()
+
+    stats, stored, payloads = run_with_queue(tmp_path, test, batch_size=10, flush_interval=0.2)
+    assert stored == payloads == [1, 2, 3, 4, 5]
+    assert stats["batches"] == 1 and stats["written"] == 5
+
+def test_one_bad_row_doesnt_drop_the_rest_of_its_batch(tmp_path):
+    async def test(queue):
+        queue.start()
+        for resume_id in (1, 2, 2, 3):  # the second 2 violates the primary key
+            await queue.submit(rows(resume_id))
+        await queue.close()
+
+    stats, stored, payloads = run_with_queue(tmp_path, test, batch_size=10, flush_interval=0.2, max_retries=1)
+    assert stored == payloads == [1, 2, 3]
+    assert stats["retries"] == 1
+    assert stats["dropped"] == 1
+    assert stats["written"] == 3
+
+def test_close_flushes_buffered_writes(tmp_path):
+    pending = {}
+
+    async def test(queue):
+        queue.start()
+        for resume_id in range(1, 4):
+            await queue.submit(rows(resume_id))
+        pending.update(queue.stats())
+        await queue.close()
+        # Once closed, submits write through
+        await queue.submit(rows(4))
+
+    stats, stored, payloads = run_with_queue(tmp_path, test, batch_size=100, flush_interval=0.3)
+    assert pending["written"] == 0
+    assert stored == payloads == [1, 2, 3, 4]
+    assert stats["pending"] == 0
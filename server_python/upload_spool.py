@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import tempfile
+
+# Upload size enforcement and spooling. The middleware turns away oversized
+# requests from Content-Length before any body is read, and cuts off bodies
+# that stream past the limit without declaring one. spool_upload() then gives
+# the handler either the bytes (small files) or a path to a named temp file
+# the extraction workers open themselves, hashing on the way through.
+
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "10")) * 1024 * 1024)
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+# Multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLarge(ValueError):
+    def __init__(self, limit):
+        super().__init__(f"Upload exceeds the {limit / (1024 * 1024):g}MB limit")
+        self.limit = limit
+
+# --- Request Body Limit ---
+class UploadSizeLimit:
+    """ASGI middleware: per-path-prefix body limits, e.g. {"/api/upload-optimize": 10 * 1024 * 1024}."""
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path):
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limit = self._limit_for(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit + MULTIPART_OVERHEAD:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        # Past the limit we answer 413 ourselves and tell the app the client
+        # went away; the form parser would otherwise turn any error into a 400.
+        async def counting_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit + MULTIPART_OVERHEAD:
+                    if response_started:
+                        raise UploadTooLarge(limit)
+                    rejected = True
+                    await self._reject(send, limit)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, tracking_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    async def _reject(self, send, limit):
+        body = json.dumps({"message": str(UploadTooLarge(limit))}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# --- Spooling ---
+class SpooledUpload:
+    """`source` is bytes or a temp file path; always close() (or use as a context manager) to remove the file."""
+
+    def __init__(self, source, digest, size):
+        self.source = source
+        self.digest = digest
+        self.size = size
+
+    @property
+    def on_disk(self):
+        return isinstance(self.source, str)
+
+    def close(self):
+        if self.on_disk and os.path.exists(self.source):
+            os.remove(self.source)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def spool_upload(fileobj, suffix="", max_bytes=UPLOAD_MAX_BYTES, threshold=UPLOAD_SPOOL_THRESHOLD, directory=UPLOAD_SPOOL_DIR):
+    """Blocking: run in a thread. Reads `fileobj` once in chunks, hashing as it goes."""
+    digest = hashlib.sha256()
+    size = 0
+    buffered = []
+    spool = None
+    try:
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            digest.update(chunk)
+            if spool is None and size > threshold:
+                spool = tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, dir=directory, delete=False)
+                spool.writelines(buffered)
+                buffered = []
+            if spool is not None:
+                spool.write(chunk)
+            else:
+                buffered.append(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+        raise
+    if spool is None:
+        return SpooledUpload(b"".join(buffered), digest.hexdigest(), size)
+    spool.close()
+    return SpooledUpload(spool.name, digest.hexdigest(), size)
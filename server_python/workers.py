@@ -0,0 +1,127 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when a pool is already at its queue depth."""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"{pool_name} pool is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+class WorkTimeout(Exception):
+    def __init__(self, pool_name, timeout):
+        super().__init__(f"{pool_name} task exceeded {timeout}s")
+        self.pool_name = pool_name
+        self.timeout = timeout
+
+class BoundedPool:
+    """
+    Executor wrapper that keeps blocking work off the event loop.
+
+    At most `max_workers + queue_depth` tasks may be admitted at once; further
+    submissions fail fast with PoolSaturated so the handler can answer 503
+    instead of letting requests pile up. A slot is only released when the
+    underlying task really finishes, so timed-out work still counts against
+    the bound while it keeps running in the worker.
+    """
+
+    def __init__(self, name, kind="thread", max_workers=2, queue_depth=8, timeout=30.0):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"submitted": 0, "completed": 0, "rejected": 0, "timeouts": 0, "busy_seconds": 0.0}
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.queue_depth
+
+    def _get_executor(self):
+        # Created on first use so importing the app never forks workers
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def retry_after(self):
+        completed = self._counters["completed"]
+        avg = self._counters["busy_seconds"] / completed if completed else 1.0
+        waves = self._in_flight / max(1, self.max_workers)
+        return max(1, math.ceil(avg * waves))
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._counters["rejected"] += 1
+                raise PoolSaturated(self.name, self.retry_after())
+            self._in_flight += 1
+            self._counters["submitted"] += 1
+
+    def _release(self, started):
+        with self._lock:
+            self._in_flight -= 1
+            self._counters["completed"] += 1
+            self._counters["busy_seconds"] += time.perf_counter() - started
+
+    async def run(self, fn, *args, timeout=None):
+        self._acquire()
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release(started)
+            raise
+        future.add_done_callback(lambda _: self._release(started))
+
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise WorkTimeout(self.name, timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = self._in_flight
+        stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+        stats.update(kind=self.kind, max_workers=self.max_workers, queue_depth=self.queue_depth, timeout=self.timeout)
+        return stats
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def pool_from_env(name, kind="thread", max_workers=2, queue_depth=8, timeout=30.0):
+    # e.g. PDF_POOL_KIND=process PDF_POOL_WORKERS=4 PDF_POOL_QUEUE=16 PDF_POOL_TIMEOUT=20
+    prefix = f"{name.upper()}_POOL_"
+    return BoundedPool(
+        name,
+        kind=os.getenv(prefix + "KIND", kind),
+        max_workers=int(os.getenv(prefix + "WORKERS", max_workers)),
+        queue_depth=int(os.getenv(prefix + "QUEUE", queue_depth)),
+        timeout=float(os.getenv(prefix + "TIMEOUT", timeout)),
+    )
+
+def web_concurrency():
+    """Server processes on this node: WEB_CONCURRENCY (as uvicorn and gunicorn read it), "auto" for one per core."""
+    value = os.getenv("WEB_CONCURRENCY", "1").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
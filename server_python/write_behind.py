@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+
+from sqlalchemy import insert
+
+from database import AsyncSessionLocal
+from instrumentation import stage
+
+# Write-behind persistence: handlers enqueue rows (with ids reserved up
+# front by id_allocator) and return; a background task writes them in
+# batches, one multi-row INSERT per table and one commit per batch.
+
+class WriteBehindQueue:
+    """
+    Bounded buffer of pending writes. An item is a list of (table, row dict)
+    pairs that belong together (a resume and its payload), written in the
+    order given. When the buffer is full, submit() waits for room instead of
+    growing, so a stalled database slows uploads down rather than eating memory.
+    """
+
+    def __init__(self, name, max_buffer=1000, batch_size=100, flush_interval=0.5,
+                 max_retries=3, backoff=0.5, session_factory=AsyncSessionLocal):
+        self.name = name
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session_factory = session_factory
+        self._queue = None
+        self._task = None
+        self._closing = False
+        self._counters = {
+            "enqueued": 0, "written": 0, "batches": 0, "retries": 0, "dropped": 0,
+            "buffer_full_waits": 0, "write_seconds": 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_buffer)
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-writer")
+
+    async def submit(self, rows):
+        if self._task is None or self._closing:
+            # Not running (scripts, shutdown): write through
+            await self._write_batch([rows])
+            return
+        if self._queue.full():
+            self._counters["buffer_full_waits"] += 1
+        await self._queue.put(rows)
+        self._counters["enqueued"] += 1
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write_with_retry(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_with_retry(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write_batch(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"{self.name}: batch of {len(batch)} failed after {attempt + 1} attempts: {str(e).splitlines()[0]}")
+                    break
+                self._counters["retries"] += 1
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+        # One bad row shouldn't take its whole batch down with it
+        if len(batch) > 1:
+            for item in batch:
+                try:
+                    await self._write_batch([item])
+                except Exception as e:
+                    self._counters["dropped"] += 1
+                    print(f"{self.name}: dropping write {item[0][1].get('id')}: {str(e).splitlines()[0]}")
+        else:
+            self._counters["dropped"] += 1
+
+    async def _write_batch(self, batch):
+        started = time.perf_counter()
+        by_table = {}
+        for item in batch:
+            for table, row in item:
+                by_table.setdefault(table, []).append(row)
+        async with self.session_factory() as db:
+            # Dicts keep insertion order: parents before children
+            for table, rows in by_table.items():
+                await db.execute(insert(table).values(rows))
+            with stage("db_commit"):
+                await db.commit()
+        self._counters["batches"] += 1
+        self._counters["written"] += len(batch)
+        self._counters["write_seconds"] += time.perf_counter() - started
+
+    async def close(self):
+        """Flush what is buffered, then stop the writer."""
+        if self._task is None:
+            return
+        self._closing = True
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        counters = dict(self._counters)
+        counters["write_seconds"] = round(counters["write_seconds"], 3)
+        return {
+            **counters,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_buffer": self.max_buffer,
+            "batch_size": self.batch_size,
+        }
+
+def queue_from_env(name="resume_writes"):
+    return WriteBehindQueue(
+        name,
+        max_buffer=int(os.getenv("WRITE_BEHIND_BUFFER", "1000")),
+        batch_size=int(os.getenv("WRITE_BEHIND_BATCH", "100")),
+        flush_interval=float(os.getenv("WRITE_BEHIND_INTERVAL", "0.5")),
+        max_retries=int(os.getenv("WRITE_BEHIND_RETRIES", "3")),
+    )